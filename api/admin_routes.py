@@ -0,0 +1,185 @@
+# odoo_bot/api/admin_routes.py
+
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse
+from authentication.auth import get_current_active_user, set_user_disabled, users_repo
+from schemas.user import User
+from src.main import get_app_config, reload_config
+from src.reload import ConfigError
+from src.profiler import ProfilerBusy, memory_diff, sample_stacks, to_collapsed, to_speedscope
+from utils.utils import create_logger
+from utils.constants import MAIN_APP_LOG_FILENAME
+
+# Set up logger
+log_file = MAIN_APP_LOG_FILENAME
+logger = create_logger(log_file)
+
+admin_router = APIRouter()
+
+
+async def get_current_admin_user(
+        current_user: Annotated[User, Depends(get_current_active_user)],
+):
+    """
+    Ensures the current user has one of the configured admin roles.
+
+    Args:
+        current_user: The current active user.
+
+    Returns:
+        The user data if the user is an admin.
+
+    Raises:
+        HTTPException: If the user is not an admin.
+    """
+    admin_roles = get_app_config()["roles"]["admin_roles"]
+    if current_user.get("role") not in admin_roles:
+        logger.warning(f"User {current_user['username']} denied access to an admin endpoint.")
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return current_user
+
+
+def _max_seconds() -> float:
+    return float((get_app_config().get("profiler") or {}).get("max_seconds", 60))
+
+
+@admin_router.get("/profile/cpu")
+async def profile_cpu(
+        current_user: Annotated[User, Depends(get_current_admin_user)],
+        seconds: float = Query(10.0, gt=0),
+        interval_ms: float = Query(5.0, ge=1, le=1000),
+        format: str = Query("collapsed", pattern="^(collapsed|speedscope)$"),
+        include_idle: bool = False,
+):
+    """
+    Samples the Python stacks of this worker for a number of seconds.
+
+    Args:
+        current_user: The current admin user (default obtained via dependency).
+        seconds: Sampling duration, capped by profiler.max_seconds (default 10).
+        interval_ms: Time between samples in milliseconds (default 5).
+        format: "collapsed" (flamegraph.pl / speedscope text) or "speedscope" (JSON).
+        include_idle: Keep samples of threads blocked in waits and selects (default False).
+
+    Returns:
+        The profile as a downloadable file.
+
+    Raises:
+        HTTPException: 409 if a profile is already running in this worker.
+    """
+    seconds = min(seconds, _max_seconds())
+    logger.info(f"User '{current_user['username']}' started a {seconds:.1f}s CPU profile.")
+    try:
+        profile = await run_in_threadpool(sample_stacks, seconds, interval_ms / 1000.0, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"CPU profile finished: {profile['ticks']} ticks, {len(profile['samples'])} distinct stacks.")
+    if format == "speedscope":
+        return JSONResponse(to_speedscope(profile),
+                            headers={"Content-Disposition": 'attachment; filename="profile.speedscope.json"'})
+    return PlainTextResponse(to_collapsed(profile),
+                             headers={"Content-Disposition": 'attachment; filename="profile.collapsed.txt"'})
+
+
+@admin_router.get("/profile/memory")
+async def profile_memory(
+        current_user: Annotated[User, Depends(get_current_admin_user)],
+        seconds: float = Query(10.0, gt=0),
+        top: int = Query(30, ge=1, le=500),
+        frames: int = Query(10, ge=1, le=100),
+):
+    """
+    Reports the allocation sites that grew the most over a number of seconds.
+
+    Args:
+        current_user: The current admin user (default obtained via dependency).
+        seconds: Time between the two tracemalloc snapshots, capped by profiler.max_seconds (default 10).
+        top: Number of allocation sites to return (default 30).
+        frames: Traceback depth per allocation site (default 10).
+
+    Returns:
+        The snapshot diff.
+
+    Raises:
+        HTTPException: 409 if a profile is already running in this worker.
+    """
+    seconds = min(seconds, _max_seconds())
+    logger.info(f"User '{current_user['username']}' started a {seconds:.1f}s memory profile.")
+    try:
+        return await run_in_threadpool(memory_diff, seconds, top, frames)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@admin_router.post("/reload")
+async def reload(current_user: Annotated[User, Depends(get_current_admin_user)]):
+    """
+    Reloads app.yaml and prompts.yaml in this worker without a restart.
+
+    Only the worker serving this request is reloaded; with several workers,
+    enable `reload.watch` so each one picks up file changes.
+
+    Args:
+        current_user: The current admin user (default obtained via dependency).
+
+    Returns:
+        The changed sections, whether the prompts changed and the rebuilt components.
+
+    Raises:
+        HTTPException: 400 if the new configuration is invalid or needs a restart.
+    """
+    logger.info(f"User '{current_user['username']}' requested a configuration reload.")
+    try:
+        return await run_in_threadpool(reload_config, "api")
+    except ConfigError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _set_disabled(current_user: dict, username: str, disabled: bool):
+    if disabled and username == current_user["username"]:
+        raise HTTPException(status_code=400, detail="Admins cannot disable their own account")
+    user = await set_user_disabled(users_repo, username, disabled)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    logger.info(f"User '{current_user['username']}' {'disabled' if disabled else 'enabled'} user '{username}'.")
+    return {"username": user["username"], "disabled": user["disabled"]}
+
+
+@admin_router.post("/users/{username}/disable")
+async def disable_user(username: str, current_user: Annotated[User, Depends(get_current_admin_user)]):
+    """
+    Disables a user; their tokens stop working in every worker within
+    TOKEN_REVOCATION_CHECK_SECONDS.
+
+    Args:
+        username: The user to disable.
+        current_user: The current admin user (default obtained via dependency).
+
+    Returns:
+        The username and its disabled flag.
+
+    Raises:
+        HTTPException: 400 for the admin's own account, 404 if the user does not exist.
+    """
+    return await _set_disabled(current_user, username, True)
+
+
+@admin_router.post("/users/{username}/enable")
+async def enable_user(username: str, current_user: Annotated[User, Depends(get_current_admin_user)]):
+    """
+    Re-enables a disabled user.
+
+    Args:
+        username: The user to enable.
+        current_user: The current admin user (default obtained via dependency).
+
+    Returns:
+        The username and its disabled flag.
+
+    Raises:
+        HTTPException: 404 if the user does not exist.
+    """
+    return await _set_disabled(current_user, username, False)
@@ -1,11 +1,12 @@
 from typing import Annotated, Any
 import jwt
 from fastapi import APIRouter, Depends, HTTPException, status
-from authentication.auth import fake_users_db, get_password_hash, create_access_token, authenticate_user, \
-    create_refresh_token, get_current_active_user, SECRET_KEY
+from authentication.auth import users_repo, get_password_hash_async, create_access_token, \
+    authenticate_user_async, create_refresh_token, get_current_active_user, SECRET_KEY
 from utils.constants import ACCESS_TOKEN_EXPIRE_MINUTES, ALGORITHM, MAIN_APP_LOG_FILENAME
 from schemas.token import Token
 from schemas.user import User
+from src.main import get_app_config
 from datetime import timedelta
 
 from utils.utils import create_logger
@@ -20,8 +21,12 @@ async def signup(user: User):
     """
     Registers a new user and generates an access token.
 
+    New accounts always get `roles.default_role` and are enabled: a `role` or
+    `disabled` sent by the client is ignored. Admin roles are granted out of
+    band with `python -m scripts.manage_users`.
+
     Args:
-        user: The user data including username, password, email, disabled status, and role.
+        user: The user data including username, password and email.
 
     Returns:
         A dictionary with a success message and the generated access token.
@@ -31,21 +36,32 @@ async def signup(user: User):
     """
     logger.info(f"Signup attempt for username: {user.username}")
 
-    if user.username in fake_users_db:
+    if await users_repo.get_async(user.username) is not None:
         logger.warning(f"Username '{user.username}' already registered")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered",
         )
 
-    hashed_password = get_password_hash(user.password)
-    fake_users_db[user.username] = {
+    ignored = sorted({"role", "disabled"} & user.model_fields_set)
+    if ignored:
+        logger.warning(f"Signup for '{user.username}' sent {', '.join(ignored)}; ignored.")
+
+    hashed_password = await get_password_hash_async(user.password)
+    created = await users_repo.create_async({
         "username": user.username,
         "password": hashed_password,
         "email": user.email,
-        "disabled": user.disabled,
-        "role": user.role,
-    }
+        "disabled": False,
+        "role": get_app_config()["roles"]["default_role"],
+    })
+    if not created:
+        # Another request (or worker) registered the same name in the meantime
+        logger.warning(f"Username '{user.username}' already registered")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username already registered",
+        )
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -77,7 +93,7 @@ async def login_method(user: User) -> dict[str, str | Any]:
     """
     logger.info(f"Login attempt for username: {user.username}")
 
-    is_authenticated = authenticate_user(fake_users_db, user.username, user.password)
+    is_authenticated = await authenticate_user_async(users_repo, user.username, user.password)
     if not is_authenticated:
         logger.warning(f"Failed login attempt for username: {user.username}")
         raise HTTPException(
@@ -1,12 +1,17 @@
 # odoo_bot/api/chain_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from authentication.auth import get_current_active_user
-from schemas.query import Query
+from schemas.query import BatchQuery, Query
 from schemas.user import User
-from src.main import chat_once  # <-- IMPORT the new RAG core function
+from src.main import chat_batch, chat_once, get_app_config, open_chat_stream  # <-- IMPORT the new RAG core function
 from utils.utils import create_logger
-from utils.constants import MAIN_APP_LOG_FILENAME
+from utils.constants import MAIN_APP_LOG_FILENAME, BUSY_MESSAGE, BUSY_RETRY_AFTER_SECONDS
+from src.scheduler import SchedulerBusy
 import traceback
 
 # Set up logger
@@ -26,7 +31,8 @@ async def ask_question(query: Query, current_user: User = Depends(get_current_ac
         current_user: The currently authenticated user (default obtained via dependency).
 
     Returns:
-        A dictionary with the generated answer and the route taken.
+        A dictionary with the generated answer, the route taken and the
+        degradation level (0 = normal service) of the plan that produced the answer.
 
     Raises:
         HTTPException: If an error occurs during query processing.
@@ -37,7 +43,9 @@ async def ask_question(query: Query, current_user: User = Depends(get_current_ac
     logger.info(f"User '{username}' (role: {role}) asked: {query.question}")
 
     try:
-        route, answer = chat_once(
+        # Run off the event loop so concurrent requests can proceed (and coalesce)
+        route, answer, level = await run_in_threadpool(
+            chat_once,
             question=query.question,
             role=role,
             user_id=username
@@ -45,10 +53,143 @@ async def ask_question(query: Query, current_user: User = Depends(get_current_ac
 
         logger.info(f"Routed to '{route}'. Answer generated for '{username}'.")
 
-        return {"answer": answer, "route": route}
+        return {"answer": answer, "route": route, "degradation_level": level}
 
+    except SchedulerBusy as e:
+        logger.warning(f"Rejected query for user '{username}': {e}")
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE,
+                            headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)})
     except Exception as e:
         logger.error(f"Error processing query for user '{username}': {e}")
         tb = traceback.format_exc()
         logger.error(tb)
-        raise HTTPException(status_code=500, detail="An error occurred while processing your request.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="An error occurred while processing your request.")
+
+
+@chain_router.post("/ask/batch")
+async def ask_batch(query: BatchQuery, current_user: User = Depends(get_current_active_user)):
+    """
+    Answers a batch of independent questions in one request.
+
+    Retrieval and reranking are shared across the batch and the generations
+    run concurrently. A failure on one question is reported in its item and
+    does not fail the others.
+
+    Args:
+        query: The batch containing the user's questions.
+        current_user: The currently authenticated user (default obtained via dependency).
+
+    Returns:
+        A dictionary with one result per question, in input order, and the
+        degradation level the batch was answered at.
+
+    Raises:
+        HTTPException: If the batch is too large or the shared retrieval fails.
+    """
+    username = current_user.get("username", "unknown_user")
+    role = current_user.get("role", "employee")
+
+    max_questions = int((get_app_config().get("batch", {}) or {}).get("max_questions", 100))
+    if len(query.questions) > max_questions:
+        raise HTTPException(status_code=400, detail=f"A batch may contain at most {max_questions} questions.")
+
+    logger.info(f"User '{username}' (role: {role}) submitted a batch of {len(query.questions)} questions")
+
+    try:
+        results = await run_in_threadpool(chat_batch, query.questions, role, username)
+    except SchedulerBusy as e:
+        logger.warning(f"Rejected batch for user '{username}': {e}")
+        raise HTTPException(status_code=503, detail=BUSY_MESSAGE,
+                            headers={"Retry-After": str(BUSY_RETRY_AFTER_SECONDS)})
+    except Exception as e:
+        logger.error(f"Error processing batch for user '{username}': {e}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail="An error occurred while processing your request.")
+
+    failed = sum(1 for r in results if r["error"])
+    logger.info(f"Batch for '{username}' finished: {len(results) - failed} answered, {failed} failed.")
+    # One plan serves the whole batch, so every item carries the same level
+    return {"results": results, "degradation_level": results[0]["degradation_level"] if results else 0}
+
+
+def format_sse(event: str, data) -> str:
+    """
+    Formats one server-sent event.
+
+    Args:
+        event: The event name.
+        data: The JSON-serializable payload.
+
+    Returns:
+        The event in text/event-stream wire format.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@chain_router.post("/ask/stream")
+async def ask_question_stream(query: Query, request: Request,
+                              current_user: User = Depends(get_current_active_user)):
+    """
+    Streams the answer to a user's question as server-sent events.
+
+    Emits `degradation` (when enabled), `route`, `sources` and `token` events
+    followed by `done` (or `busy`/`error`).
+    Comment lines are sent as heartbeats while the pipeline is busy, and
+    generation stops as soon as the client disconnects.
+
+    Args:
+        query: The query containing the user's question.
+        request: The incoming HTTP request (used to detect disconnects).
+        current_user: The currently authenticated user (default obtained via dependency).
+
+    Returns:
+        A streaming response with media type text/event-stream.
+    """
+    username = current_user.get("username", "unknown_user")
+    role = current_user.get("role", "employee")
+    heartbeat_s = float((get_app_config().get("sse", {}) or {}).get("heartbeat_s", 15))
+
+    logger.info(f"User '{username}' (role: {role}) asked (stream): {query.question}")
+
+    async def event_source():
+        stream = open_chat_stream(question=query.question, role=role, user_id=username)
+        try:
+            while True:
+                try:
+                    event = await stream.next(timeout=heartbeat_s)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        logger.info(f"SSE client '{username}' disconnected")
+                        return
+                    yield ": heartbeat\n\n"
+                    continue
+                except StopAsyncIteration:
+                    break
+
+                if event["type"] == "degradation":
+                    yield format_sse("degradation", {"level": event["data"]})
+                elif event["type"] == "route":
+                    yield format_sse("route", {"route": event["data"]})
+                elif event["type"] == "sources":
+                    yield format_sse("sources", {"sources": event["data"]})
+                elif event["type"] == "chunk":
+                    yield format_sse("token", {"token": event["data"]})
+
+            yield format_sse("done", {})
+
+        except SchedulerBusy as e:
+            logger.warning(f"Rejected streamed query for user '{username}': {e}")
+            yield format_sse("busy", {"message": BUSY_MESSAGE, "retry_after": BUSY_RETRY_AFTER_SECONDS})
+        except Exception as e:
+            logger.error(f"Error streaming query for user '{username}': {e}")
+            logger.error(traceback.format_exc())
+            yield format_sse("error", {"message": "An error occurred while processing your request."})
+        finally:
+            # Also runs when the server cancels the response after a disconnect
+            stream.cancel()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,5 +1,8 @@
 import os
+import asyncio
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
 import jwt
@@ -10,7 +13,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta, timezone
 
-from utils.constants import AUTH_LOG_FILENAME, ALGORITHM, REFRESH_TOKEN_EXPIRY
+from utils.constants import AUTH_LOG_FILENAME, ALGORITHM, REFRESH_TOKEN_EXPIRY, BCRYPT_MAX_WORKERS, \
+    TOKEN_CACHE_MAX_SIZE, TOKEN_CACHE_TTL_SECONDS, TOKEN_REVOCATION_CHECK_SECONDS, USER_DB_PATH
+from authentication.token_cache import VerifiedTokenCache
+from authentication.user_repository import SQLiteUserRepository
 from schemas.token import TokenData
 from schemas.user import UserInDB, User
 from utils.utils import create_logger
@@ -33,8 +39,42 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 bearer_scheme = HTTPBearer()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-fake_users = {}
-fake_users_db = {}
+# Persistent user store, shared by every worker process
+users_repo = SQLiteUserRepository(os.getenv("USER_DB_PATH", USER_DB_PATH))
+
+# Bcrypt is deliberately slow (~100-300 ms); run it on a small dedicated pool so
+# a burst of logins cannot stall the event loop or starve the default executor.
+bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_MAX_WORKERS, thread_name_prefix="bcrypt")
+
+# Verified access tokens -> user data, so repeat requests skip JWT decoding and the user lookup
+token_cache = VerifiedTokenCache(max_size=TOKEN_CACHE_MAX_SIZE, ttl_seconds=TOKEN_CACHE_TTL_SECONDS)
+_revocation = {"epoch": None, "checked_at": 0.0}
+
+
+async def get_cached_user(token: str):
+    """
+    Looks up a verified token, first dropping the cache if access was revoked.
+
+    At most every TOKEN_REVOCATION_CHECK_SECONDS, the repository's auth epoch
+    is compared with the last value seen; a change made by any worker (e.g. a
+    user disabled) clears this worker's cache, so revoked users lose access
+    within that interval instead of the cache TTL.
+
+    Args:
+        token: The raw JWT.
+
+    Returns:
+        The cached user data, or None if the token must be verified.
+    """
+    now = time.monotonic()
+    if now - _revocation["checked_at"] >= TOKEN_REVOCATION_CHECK_SECONDS:
+        _revocation["checked_at"] = now
+        epoch = await users_repo.auth_epoch_async()
+        if _revocation["epoch"] is not None and epoch != _revocation["epoch"]:
+            token_cache.clear()
+            logger.info("Auth epoch changed; cleared the token cache.")
+        _revocation["epoch"] = epoch
+    return token_cache.get(token)
 
 
 def verify_password(plain_password, hashed_password):
@@ -64,33 +104,81 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-def get_user(db, username: str):
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verifies a password on the bcrypt pool without blocking the event loop.
+
+    Args:
+        plain_password: The plain text password to verify.
+        hashed_password: The hashed password to compare against.
+
+    Returns:
+        True if passwords match, False otherwise.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    """
+    Hashes a password on the bcrypt pool without blocking the event loop.
+
+    Args:
+        password: The plain text password to hash.
+
+    Returns:
+        The hashed password.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(bcrypt_executor, get_password_hash, password)
+
+
+def get_user(repo, username: str):
+    """
+    Retrieves a user from the repository by username.
+
+    Args:
+        repo: The user repository.
+        username: The username to look up.
+
+    Returns:
+        The user data if found, None otherwise.
+    """
+    logger.debug("Fetching user: %s", username)
+    user_dict = repo.get(username)
+    if user_dict is not None:
+        logger.debug("User %s found.", username)
+        return user_dict
+    logger.warning(f"User {username} not found.")
+    return None
+
+
+async def get_user_async(repo, username: str):
     """
-    Retrieves a user from the database by username.
+    Retrieves a user from the repository without blocking the event loop.
 
     Args:
-        db: The database dictionary containing user data.
+        repo: The user repository.
         username: The username to look up.
 
     Returns:
         The user data if found, None otherwise.
     """
-    logger.info(f"Fetching user: {username}")
-    if username in db:
-        user_dict = db[username]
-        # Ensure the `hashed_password` is passed in UserInDB object
-        logger.info(f"User {username} found.")
-        return user_dict  # This will map the stored data correctly to UserInDB
+    logger.debug("Fetching user: %s", username)
+    user_dict = await repo.get_async(username)
+    if user_dict is not None:
+        logger.debug("User %s found.", username)
+        return user_dict
     logger.warning(f"User {username} not found.")
     return None
 
 
-def authenticate_user(fake_db, username: str, password: str):
+def authenticate_user(repo, username: str, password: str):
     """
-    Authenticates a user against the database.
+    Authenticates a user against the repository.
 
     Args:
-        fake_db: The fake database dictionary.
+        repo: The user repository.
         username: The username to authenticate.
         password: The password to verify.
 
@@ -98,7 +186,7 @@ def authenticate_user(fake_db, username: str, password: str):
         The user data if authenticated, False otherwise.
     """
     logger.info(f"Authenticating user: {username}")
-    user = get_user(fake_db, username)
+    user = get_user(repo, username)
     if not user:
         logger.warning(f"Failed authentication for {username}: User not found.")
         return False
@@ -109,6 +197,53 @@ def authenticate_user(fake_db, username: str, password: str):
     return user
 
 
+async def authenticate_user_async(repo, username: str, password: str):
+    """
+    Authenticates a user, running the lookup and the password check off the event loop.
+
+    Args:
+        repo: The user repository.
+        username: The username to authenticate.
+        password: The password to verify.
+
+    Returns:
+        The user data if authenticated, False otherwise.
+    """
+    logger.info(f"Authenticating user: {username}")
+    user = await get_user_async(repo, username)
+    if not user:
+        logger.warning(f"Failed authentication for {username}: User not found.")
+        return False
+    if not await verify_password_async(password, user['password']):
+        logger.warning(f"Failed authentication for {username}: Incorrect password.")
+        return False
+    logger.info(f"User {username} authenticated successfully.")
+    return user
+
+
+async def set_user_disabled(repo, username: str, disabled: bool = True):
+    """
+    Enables or disables a user and drops their cached tokens.
+
+    This worker's cached tokens of the user are dropped at once; other
+    workers see the repository's auth epoch change and clear their caches
+    within TOKEN_REVOCATION_CHECK_SECONDS (see `get_cached_user`).
+
+    Args:
+        repo: The user repository.
+        username: The username to update.
+        disabled: Whether the user is disabled (default True).
+
+    Returns:
+        The updated user data if found, None otherwise.
+    """
+    user = await repo.set_disabled_async(username, disabled)
+    token_cache.invalidate_user(username)
+    if user is not None:
+        logger.info(f"User {username} {'disabled' if disabled else 'enabled'}.")
+    return user
+
+
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     """
     Creates a JWT access token.
@@ -167,9 +302,9 @@ def decode_token(token: str):
         HTTPException: If the token is invalid or expired.
     """
     try:
-        logger.info("Decoding token.")
+        logger.debug("Decoding token.")
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        logger.info("Token decoded successfully.")
+        logger.debug("Token decoded successfully.")
         return payload
     except jwt.InvalidTokenError:
         logger.error("Invalid or expired token.")
@@ -195,19 +330,24 @@ async def get_current_user(
     Raises:
         HTTPException: If the token is invalid or user is not found/disabled.
     """
-    logger.info("Fetching current user from token.")
+    logger.debug("Fetching current user from token.")
     token = credentials.credentials
+    user = await get_cached_user(token)
+    if user is not None:
+        return user
+
     data = decode_token(token)
     username = data.get("username")
     if not username:
         logger.error("Token payload does not contain a username.")
         raise HTTPException(status_code=401, detail="Invalid token payload")
 
-    user = get_user(fake_users_db, username)
+    user = await get_user_async(users_repo, username)
     if not user or user.get("disabled"):
         logger.warning(f"User {username} is inactive or not found.")
         raise HTTPException(status_code=401, detail="User inactive or not found")
-    logger.info(f"User {username} is active.")
+    logger.debug("User %s is active.", username)
+    token_cache.put(token, user, data.get("exp"))
     return user
 
 
@@ -226,9 +366,9 @@ async def get_current_active_user(
     Raises:
         HTTPException: If the user is inactive.
     """
-    logger.info(f"Checking if user {current_user['username']} is active.")
+    logger.debug("Checking if user %s is active.", current_user['username'])
     if current_user['disabled']:
         logger.warning(f"User {current_user['username']} is disabled.")
         raise HTTPException(status_code=400, detail="Inactive user")
-    logger.info(f"User {current_user['username']} is active.")
+    logger.debug("User %s is active.", current_user['username'])
     return current_user
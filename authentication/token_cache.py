@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class VerifiedTokenCache:
+    """
+    Expiry-aware LRU cache of verified access tokens and the users they resolve to.
+
+    An entry lives until the earlier of the token's own `exp` claim and the
+    cache TTL, so a cached token is never accepted after it expires. Entries
+    for a user are dropped with `invalidate_user`, e.g. when the user is disabled.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        """
+        Initializes the cache.
+
+        Args:
+            max_size: Maximum number of cached tokens (default 10000).
+            ttl_seconds: Maximum lifetime of an entry in seconds (default 300).
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> (user, expires_at)
+        self._by_user = {}  # username -> set of tokens
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str):
+        """
+        Looks up a verified token.
+
+        Args:
+            token: The raw JWT.
+
+        Returns:
+            The cached user data, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: dict, exp: float | None = None):
+        """
+        Stores a verified token.
+
+        Args:
+            token: The raw JWT.
+            user: The user data the token resolved to.
+            exp: The token's `exp` claim as a Unix timestamp (optional).
+        """
+        expires_at = time.time() + self.ttl_seconds
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        username = user.get("username")
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (user, expires_at)
+            self._by_user.setdefault(username, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, username: str):
+        """
+        Drops every cached token of a user.
+
+        Args:
+            username: The username whose tokens must be re-verified.
+        """
+        with self._lock:
+            for token in list(self._by_user.get(username, ())):
+                self._remove(token)
+
+    def clear(self):
+        """
+        Drops all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        username = entry[0].get("username")
+        tokens = self._by_user.get(username)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[username]
@@ -0,0 +1,235 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+
+class UserRepository(ABC):
+    """
+    Storage interface for user accounts.
+
+    Users are plain dictionaries with the keys username, password (the bcrypt
+    hash), email, disabled and role. Backends implement the abstract methods;
+    the `*_async` variants run the blocking call on the repository's executor
+    so async handlers never block the loop.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Initializes the repository.
+
+        Args:
+            max_workers: Size of the executor used by the async methods (default 4).
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="user-repo")
+
+    @abstractmethod
+    def get(self, username: str):
+        """
+        Fetches a user by username.
+
+        Args:
+            username: The username to look up.
+
+        Returns:
+            The user dictionary, or None if not found.
+        """
+
+    @abstractmethod
+    def create(self, user: dict) -> bool:
+        """
+        Stores a new user.
+
+        Args:
+            user: The user dictionary (with the hashed password).
+
+        Returns:
+            True if created, False if the username is already taken.
+        """
+
+    @abstractmethod
+    def set_disabled(self, username: str, disabled: bool):
+        """
+        Enables or disables a user.
+
+        Args:
+            username: The username to update.
+            disabled: Whether the user is disabled.
+
+        Returns:
+            The updated user dictionary, or None if not found.
+        """
+
+    @abstractmethod
+    def set_role(self, username: str, role: str):
+        """
+        Changes a user's role.
+
+        Not exposed through the public API: roles are granted by an operator
+        (see `scripts/manage_users.py`).
+
+        Args:
+            username: The username to update.
+            role: The new role.
+
+        Returns:
+            The updated user dictionary, or None if not found.
+        """
+
+    @abstractmethod
+    def auth_epoch(self) -> int:
+        """
+        Returns a counter that grows whenever a change revokes access (e.g. a user is disabled).
+
+        Every worker compares it with the value it last saw to know when its
+        token cache is stale.
+
+        Returns:
+            The current epoch.
+        """
+
+    def __contains__(self, username: str) -> bool:
+        return self.get(username) is not None
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def get_async(self, username: str):
+        """Async variant of `get`."""
+        return await self._run(self.get, username)
+
+    async def create_async(self, user: dict) -> bool:
+        """Async variant of `create`."""
+        return await self._run(self.create, user)
+
+    async def set_disabled_async(self, username: str, disabled: bool):
+        """Async variant of `set_disabled`."""
+        return await self._run(self.set_disabled, username, disabled)
+
+    async def set_role_async(self, username: str, role: str):
+        """Async variant of `set_role`."""
+        return await self._run(self.set_role, username, role)
+
+    async def auth_epoch_async(self) -> int:
+        """Async variant of `auth_epoch`."""
+        return await self._run(self.auth_epoch)
+
+
+class SQLiteUserRepository(UserRepository):
+    """
+    User repository backed by a SQLite file shared by all workers.
+
+    `username` is the primary key, so lookups use its unique index. Each thread
+    keeps its own connection (SQLite connections must not be shared across
+    threads), and WAL mode lets readers in other processes proceed while one
+    process writes.
+    """
+
+    def __init__(self, path: str, max_workers: int = 4):
+        """
+        Initializes the repository. The database is created on first use.
+
+        Args:
+            path: Path to the SQLite database file.
+            max_workers: Size of the executor used by the async methods (default 4).
+        """
+        super().__init__(max_workers=max_workers)
+        self.path = path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=10000")
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS users (
+                        username   TEXT PRIMARY KEY,
+                        password   TEXT NOT NULL,
+                        email      TEXT,
+                        disabled   INTEGER NOT NULL DEFAULT 0,
+                        role       TEXT NOT NULL DEFAULT 'employee',
+                        created_at TEXT NOT NULL
+                    ) WITHOUT ROWID
+                    """
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS auth_state (id INTEGER PRIMARY KEY CHECK (id = 0), epoch INTEGER NOT NULL)"
+                )
+                conn.execute("INSERT OR IGNORE INTO auth_state (id, epoch) VALUES (0, 0)")
+                self._schema_ready = True
+        self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        if row is None:
+            return None
+        return {
+            "username": row["username"],
+            "password": row["password"],
+            "email": row["email"],
+            "disabled": bool(row["disabled"]),
+            "role": row["role"],
+        }
+
+    def get(self, username: str):
+        row = self._connect().execute(
+            "SELECT username, password, email, disabled, role FROM users WHERE username = ?",
+            (username,),
+        ).fetchone()
+        return self._to_dict(row)
+
+    def create(self, user: dict) -> bool:
+        try:
+            self._connect().execute(
+                "INSERT INTO users (username, password, email, disabled, role, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    user["username"],
+                    user["password"],
+                    user.get("email"),
+                    int(bool(user.get("disabled", False))),
+                    user.get("role") or "employee",
+                    datetime.now(timezone.utc).isoformat(),
+                ),
+            )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def set_disabled(self, username: str, disabled: bool):
+        conn = self._connect()
+        with conn:  # the update and the epoch bump commit together
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE users SET disabled = ? WHERE username = ?", (int(bool(disabled)), username))
+            conn.execute("UPDATE auth_state SET epoch = epoch + 1 WHERE id = 0")
+        return self.get(username)
+
+    def set_role(self, username: str, role: str):
+        conn = self._connect()
+        with conn:  # cached tokens carry the old role, so this revokes them too
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE users SET role = ? WHERE username = ?", (role, username))
+            conn.execute("UPDATE auth_state SET epoch = epoch + 1 WHERE id = 0")
+        return self.get(username)
+
+    def auth_epoch(self) -> int:
+        row = self._connect().execute("SELECT epoch FROM auth_state WHERE id = 0").fetchone()
+        return int(row["epoch"]) if row else 0
@@ -3,12 +3,18 @@
 from fastapi import FastAPI
 from api.auth_routes import auth_router
 from api.chain_routes import chain_router
+from api.admin_routes import admin_router
 from ws.ws_routes import ws_router
-from utils.utils import create_logger
+from utils.utils import configure_logging, create_logger, shutdown_logging
+from utils.config_loader import load_config
 from utils.constants import MAIN_APP_LOG_FILENAME
-from src.main import initialize_models # <--- IMPORT THE INITIALIZER
+from fastapi.responses import JSONResponse, PlainTextResponse
+from src.main import initialize_models, readiness # <--- IMPORT THE INITIALIZER
+from src import metrics
+from authentication.auth import token_cache
 
-# Set up logging
+# Set up logging (once per process; file writes happen on a background thread)
+configure_logging(load_config()["app"].get("logging"))
 log_file = MAIN_APP_LOG_FILENAME
 logger = create_logger(log_file)
 
@@ -24,12 +30,60 @@ async def startup_event():
     """
     initialize_models()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Flushes queued log records before the worker exits.
+    """
+    shutdown_logging()
+
 logger.info("Starting up the Odoo HR Bot application...")
 
 # Include all the necessary routers
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(chain_router, prefix="/api", tags=["RAG Chains"])
 app.include_router(ws_router, tags=["WebSockets"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
+
+# Auth token cache effectiveness, read at scrape time
+metrics.register_callback("auth_token_cache_hits_total", lambda: token_cache.hits, kind="counter")
+metrics.register_callback("auth_token_cache_misses_total", lambda: token_cache.misses, kind="counter")
+metrics.register_callback("auth_token_cache_size", lambda: len(token_cache))
+
+
+@app.get("/metrics", tags=["Monitoring"], response_class=PlainTextResponse)
+async def read_metrics():
+    """
+    Exposes process metrics in the Prometheus text format.
+
+    Returns:
+        The metrics exposition text.
+    """
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/health/live", tags=["Monitoring"])
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests.
+
+    Returns:
+        A status dictionary.
+    """
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["Monitoring"])
+async def ready():
+    """
+    Readiness probe: models are loaded and warm-up has succeeded.
+
+    Returns:
+        200 with the status once ready, 503 before that (or after a failed warm-up).
+    """
+    status = readiness()
+    if not status["ready"]:
+        return JSONResponse({"status": "not_ready", **status}, status_code=503)
+    return {"status": "ready", **status}
 
 @app.get("/", tags=["Root"])
 async def read_root():
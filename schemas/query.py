@@ -1,4 +1,8 @@
+from typing import List
 from pydantic import BaseModel
 
 class Query(BaseModel):
     question: str
+
+class BatchQuery(BaseModel):
+    questions: List[str]
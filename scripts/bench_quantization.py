@@ -0,0 +1,124 @@
+"""
+Compares vector compression options by memory and recall.
+
+Uses the full-precision vectors written by the ingest (embedding.compression.
+store_path), or embeds the handbook chunks when no store exists. Queries are
+the eval-set questions (--eval, same format as scripts.debug_retriever) or a
+sample of the documents themselves (each excluded from its own results).
+
+    python -m scripts.bench_quantization --eval data/eval/retrieval.jsonl --k 10 --dims 256,512,768
+
+For every codec it reports the vector payload size, the memory saved against
+float32 and recall@k against exact full-precision search, with and without
+rescoring the top k * oversample candidates in full precision. Index overhead
+(e.g. HNSW links) is not included.
+"""
+import argparse
+import json
+import numpy as np
+from utils.config_loader import load_config
+from src.embeddings import build_embeddings
+from src.quantization import (RescoringStore, dequantize_int8, hamming_similarity, quantize_binary,
+                              quantize_int8)
+
+
+def _normalize(m):
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    return m / np.where(norms == 0, 1, norms)
+
+
+def load_vectors(app_cfg):
+    compression = app_cfg["embedding"].get("compression", {}) or {}
+    store = RescoringStore.load(compression.get("store_path", "data/vectors/full_precision"))
+    if store is not None:
+        print(f"--- Using {len(store.chunk_ids)} stored full-precision vectors ---")
+        return np.asarray(store.matrix, dtype=np.float32), None
+
+    from src.ingest import chunk, uses_layout
+    from src.loaders import walk_docs
+    print("--- No rescoring store found; embedding the handbook chunks ---")
+    ccfg = app_cfg["chunking"]
+    pieces = chunk(walk_docs(app_cfg["data"]["handbook_dir"], layout=uses_layout(ccfg)), ccfg)
+    emb = build_embeddings(app_cfg["embedding"])
+    return _normalize(np.asarray(emb.embed_documents([p.page_content for p in pieces]), dtype=np.float32)), emb
+
+
+def top_k(scores, k, exclude=None):
+    if exclude is not None:
+        scores = scores.copy()
+        scores[exclude] = -np.inf
+    k = min(k, len(scores))
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory/recall benchmark for vector compression.")
+    parser.add_argument("--eval", default=None, help="eval set whose questions are used as queries")
+    parser.add_argument("--queries", type=int, default=200, help="documents sampled as queries without --eval")
+    parser.add_argument("--k", type=int, default=10, help="recall@k")
+    parser.add_argument("--oversample", type=float, default=4, help="rescoring candidates = k * oversample")
+    parser.add_argument("--dims", default="256,512,768", help="Matryoshka dimensions to try")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app_cfg = load_config()["app"]
+    docs, emb = load_vectors(app_cfg)
+    n, d = docs.shape
+
+    if args.eval:
+        with open(args.eval, "r", encoding="utf-8") as f:
+            questions = [json.loads(line)["question"] for line in f if line.strip()]
+        emb = emb or build_embeddings(app_cfg["embedding"])
+        queries = _normalize(np.asarray(emb.embed_documents(questions), dtype=np.float32))
+        self_idx = [None] * len(queries)
+    else:
+        rng = np.random.default_rng(args.seed)
+        self_idx = rng.choice(n, size=min(args.queries, n), replace=False)
+        queries = docs[self_idx]
+        self_idx = list(self_idx)
+
+    k = args.k
+    pool = max(k, int(round(k * args.oversample)))
+    truth = [set(top_k(docs @ q, k, ex)) for q, ex in zip(queries, self_idx)]
+
+    def evaluate(score_fn):
+        plain = rescored = 0.0
+        for q, ex, exact in zip(queries, self_idx, truth):
+            scores = score_fn(q)
+            plain += len(set(top_k(scores, k, ex)) & exact) / k
+            candidates = top_k(scores, pool, ex)
+            best = candidates[np.argsort(-(docs[candidates] @ q))][:k]
+            rescored += len(set(best) & exact) / k
+        return plain / len(queries), rescored / len(queries)
+
+    codecs = [("float32", d * 4, lambda q: docs @ q)]
+    half = docs.astype(np.float16).astype(np.float32)
+    codecs.append(("float16", d * 2, lambda q: half @ q))
+    codes, low, scale = quantize_int8(docs)
+    approx = dequantize_int8(codes, low, scale)
+    codecs.append(("int8 (SQ8)", d, lambda q: approx @ q))
+    bits = quantize_binary(docs)
+    codecs.append(("binary", d // 8, lambda q: hamming_similarity(bits, quantize_binary(q[None, :])).astype(np.float32)))
+    for dims in (int(x) for x in args.dims.split(",") if x.strip()):
+        if dims >= d:
+            continue
+        head = _normalize(docs[:, :dims])
+        codecs.append((f"matryoshka {dims}", dims * 4, lambda q, h=head, m=dims: h @ (q[:m] / np.linalg.norm(q[:m]))))
+        h_codes, h_low, h_scale = quantize_int8(head)
+        h_approx = dequantize_int8(h_codes, h_low, h_scale)
+        codecs.append((f"matryoshka {dims} + int8", dims,
+                       lambda q, h=h_approx, m=dims: h @ (q[:m] / np.linalg.norm(q[:m]))))
+
+    print(f"\n--- {n} vectors x {d} dims, {len(queries)} queries, recall@{k}, rescoring top {pool} ---")
+    print(f"{'codec':<26}{'bytes/vec':>10}{'MB':>10}{'saved':>8}{'recall':>9}{'+rescore':>10}")
+    for name, nbytes, fn in codecs:
+        recall, recall_rescored = evaluate(fn)
+        print(f"{name:<26}{nbytes:>10}{nbytes * n / 1e6:>10.2f}{1 - nbytes / (d * 4):>8.0%}"
+              f"{recall:>9.3f}{recall_rescored:>10.3f}")
+    print("\nRescoring keeps the full vectors outside the index (float16: "
+          f"{d * 2 * n / 1e6:.2f} MB, memory-mapped).")
+
+
+if __name__ == "__main__":
+    main()
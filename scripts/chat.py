@@ -5,6 +5,6 @@ if __name__ == "__main__":
     parser.add_argument("--q", required=True)
     parser.add_argument("--role", default=None)
     args = parser.parse_args()
-    route, ans = chat_once(args.q, args.role)
+    route, ans, _ = chat_once(args.q, args.role)
     print(f"[route: {route}]")
     print(ans)
@@ -1,37 +1,100 @@
+"""
+Retrieval debugging and tuning.
+
+Without arguments, runs one question through the retriever and prints the
+documents it returns:
+
+    python -m scripts.debug_retriever --question "What is the policy on sick leave?"
+
+With an eval set, sweeps the retrieval parameters and prints a recall/latency
+trade-off table with the Pareto-optimal configurations marked:
+
+    python -m scripts.debug_retriever --eval data/eval/retrieval.jsonl \\
+        --k 4,7 --candidates 8,16,32 --top-n 2,4 --ef 32,64,128 --rerankers none,cross_encoder
+
+The eval set is JSON lines, one labeled question per line. A retrieved chunk is
+relevant if its chunk_id is listed, or its page is listed (and, when given, its
+`path` contains `source`):
+
+    {"question": "How many sick days do I get?", "expected_pages": [12, 13]}
+    {"question": "Who provisions my laptop?", "expected_chunks": [41], "source": "handbook.pdf"}
+"""
+import argparse
+import itertools
+import json
 import pprint
+import time
 from utils.config_loader import load_config
 from src.embeddings import build_embeddings
-from src.vectorstore import connect_milvus, get_vectorstore, make_retriever
+from src.quantization import build_rescorer, truncate
+from src.vectorstore import connect_milvus, get_vectorstore, search_by_vector
+
+
+def build_search(app_cfg):
+    """
+    Opens the collection the way the app does and returns a search function.
+
+    With `embedding.compression` enabled, the index holds truncated vectors:
+    the query is truncated the same way, `oversample` times more candidates
+    are fetched and they are rescored with the full vectors (as
+    `src.main._search` and `_rescore` do), so latencies and recall include
+    that path.
+
+    Args:
+        app_cfg: The application configuration.
+
+    Returns:
+        (embeddings, search, first_pass_k). `search(vector, n, rcfg)` takes a
+        full query embedding and returns the best `n` documents (`rcfg` may
+        carry expr and search_params); `first_pass_k(n)` is the number of
+        candidates it fetches from the index for them.
+    """
+    embeddings = build_embeddings(app_cfg["embedding"])
+    compression = app_cfg["embedding"].get("compression", {}) or {}
+    connect_milvus(app_cfg["milvus"])
+    vector_store = get_vectorstore(embeddings, app_cfg["milvus"], compression)
+    if not compression.get("enabled"):
+        return embeddings, lambda vector, n, rcfg: search_by_vector(vector_store, vector, {**rcfg, "k": n}), \
+            lambda n: n
+
+    dimensions = int(compression["dimensions"])
+    rescorer = build_rescorer(compression)
+    if rescorer is None and compression.get("rescore", True):
+        print("[WARN] Compression is enabled but no rescoring store was found; run the ingest first.")
+    oversample = float(compression.get("oversample", 4))
+
+    def first_pass_k(n):
+        return max(n, int(round(n * oversample))) if rescorer else n
+
+    def search(vector, n, rcfg):
+        docs = search_by_vector(vector_store, truncate(vector, dimensions), {**rcfg, "k": first_pass_k(n)})
+        return rescorer.rescore(vector, docs, n) if rescorer else docs[:n]
 
+    return embeddings, search, first_pass_k
 
-def test_retrieval():
+
+def test_retrieval(question: str):
     """
     Tests the retriever in isolation to see what documents it fetches for a query.
+
+    Args:
+        question: The question to retrieve documents for.
     """
     print("--- Loading Configuration ---")
     cfg = load_config()
     app_cfg = cfg["app"]
 
-    # A sample question that should have a clear answer in your handbook
-    test_question = "What is the company's policy on sick leave?"
-    print(f"--- Test Question: '{test_question}' ---")
+    print(f"--- Test Question: '{question}' ---")
 
     try:
-        print("\n--- Building Embeddings Model ---")
-        embeddings = build_embeddings(app_cfg["embedding"])
-
-        print("\n--- Connecting to Milvus ---")
-        connect_milvus(app_cfg["milvus"])
-
-        print("\n--- Getting Vector Store and Retriever ---")
-        vector_store = get_vectorstore(embeddings, app_cfg["milvus"])
+        print("\n--- Building Embeddings Model and Opening the Vector Store ---")
+        embeddings, search, _ = build_search(app_cfg)
 
         # Use the same 'candidates' number as in your main app
         candidates = int(app_cfg.get("reranker", {}).get("candidates", 4))
-        retriever = make_retriever(vector_store, {"k": candidates})
 
-        print("\n--- Invoking Retriever ---")
-        retrieved_docs = retriever.invoke(test_question)
+        print("\n--- Searching ---")
+        retrieved_docs = search(embeddings.embed_query(question), candidates, {})
 
         print(f"\n--- Found {len(retrieved_docs)} documents ---")
 
@@ -55,5 +118,231 @@ def test_retrieval():
         traceback.print_exc()
 
 
+# ---------------------------------------------------------------- sweep ---
+
+def load_eval_set(path: str):
+    """
+    Loads the labeled eval set.
+
+    Args:
+        path: Path to the JSON lines file.
+
+    Returns:
+        A list of items with question, expected_pages, expected_chunks and source.
+    """
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if not item.get("expected_pages") and not item.get("expected_chunks"):
+                raise ValueError(f"Eval item has no expected_pages or expected_chunks: {item}")
+            items.append(item)
+    return items
+
+
+def _targets(item):
+    """The labeled items a question should retrieve, as hashable keys."""
+    return {("chunk", c) for c in item.get("expected_chunks") or []} | \
+           {("page", p) for p in item.get("expected_pages") or []}
+
+
+def _matches(doc, item):
+    """The labeled targets a retrieved document covers."""
+    meta = doc.metadata or {}
+    source = item.get("source")
+    if source and source not in str(meta.get("path", meta.get("source", ""))):
+        return set()
+    hit = set()
+    if meta.get("chunk_id") in (item.get("expected_chunks") or []):
+        hit.add(("chunk", meta.get("chunk_id")))
+    if meta.get("page") in (item.get("expected_pages") or []):
+        hit.add(("page", meta.get("page")))
+    return hit
+
+
+def score(docs, item):
+    """
+    Scores one ranked list against the labels.
+
+    Args:
+        docs: The retrieved documents, best first.
+        item: The eval item.
+
+    Returns:
+        (recall, reciprocal rank): the share of targets covered by any document,
+        and 1/rank of the first relevant document (0 if none).
+    """
+    targets = _targets(item)
+    covered, rr = set(), 0.0
+    for rank, doc in enumerate(docs, start=1):
+        hit = _matches(doc, item)
+        if hit and rr == 0.0:
+            rr = 1.0 / rank
+        covered |= hit
+    return len(covered & targets) / len(targets), rr
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[max(0, -(-len(ordered) * p // 100) - 1)] if ordered else 0.0
+
+
+def _ints(text):
+    return sorted({int(x) for x in text.split(",") if x.strip()})
+
+
+def sweep(args):
+    """
+    Runs every combination of the grid against the eval set and prints the table.
+
+    Searches are cached per (ef, number of candidates) and reranking per
+    (reranker, ef, candidates); smaller top_n values reuse the longer ranking.
+
+    Args:
+        args: The parsed command-line arguments.
+    """
+    from src.reranker import build_reranker
+
+    app_cfg = load_config()["app"]
+    items = load_eval_set(args.eval)
+    print(f"--- Loaded {len(items)} eval questions from {args.eval} ---")
+
+    embeddings, search_index, first_pass_k = build_search(app_cfg)
+    base_search = app_cfg["milvus"].get("search_params", {}) or {}
+    expr = app_cfg["retriever"].get("expr", "")
+
+    print("--- Embedding questions ---")
+    vectors, embed_ms = [], []
+    for item in items:
+        t0 = time.perf_counter()
+        vectors.append(embeddings.embed_query(item["question"]))
+        embed_ms.append((time.perf_counter() - t0) * 1000)
+
+    ks, candidates, top_ns, efs = _ints(args.k), _ints(args.candidates), _ints(args.top_n), _ints(args.ef)
+    reranker_types = [r.strip() for r in args.rerankers.split(",") if r.strip()]
+
+    search_cache = {}
+
+    def search(ef, n):
+        if (ef, n) not in search_cache:
+            params = {**base_search, "params": {**(base_search.get("params") or {}), "ef": ef}}
+            results, latencies = [], []
+            for vector in vectors:
+                t0 = time.perf_counter()
+                results.append(search_index(vector, n, {"expr": expr, "search_params": params}))
+                latencies.append((time.perf_counter() - t0) * 1000)
+            search_cache[(ef, n)] = (results, latencies)
+        return search_cache[(ef, n)]
+
+    llm = None
+    rerankers = {}
+    rows = []
+    for rtype in reranker_types:
+        if rtype != "none":
+            if rtype == "llm" and llm is None:
+                from src.llm import build_llm
+                llm = build_llm(app_cfg["llm"])
+            print(f"--- Loading reranker '{rtype}' ---")
+            rerankers[rtype] = build_reranker({**(app_cfg.get("reranker") or {}), "type": rtype}, llm=llm)
+
+        # Without a reranker the retriever returns k documents; with one, `candidates` are reranked
+        for ef, n in itertools.product(efs, ks if rtype == "none" else candidates):
+            if ef < first_pass_k(n):
+                # HNSW cannot return more results than its search list (oversampled candidates included)
+                continue
+            results, search_ms = search(ef, n)
+            if rtype == "none":
+                finals = [(n, results, [0.0] * len(items))]
+            else:
+                fitting = [t for t in top_ns if t <= n]
+                if not fitting:
+                    continue
+                reranked, rerank_ms = [], []
+                longest = max(fitting)
+                for item, docs in zip(items, results):
+                    t0 = time.perf_counter()
+                    reranked.append(rerankers[rtype].rerank(item["question"], docs, top_n=longest))
+                    rerank_ms.append((time.perf_counter() - t0) * 1000)
+                finals = [(t, reranked, rerank_ms) for t in fitting]
+
+            cand_recall = sum(score(docs, item)[0] for docs, item in zip(results, items)) / len(items)
+            for top_n, ranked, rerank_ms in finals:
+                scored = [score(docs[:top_n], item) for docs, item in zip(ranked, items)]
+                totals = [e + s + r for e, s, r in zip(embed_ms, search_ms, rerank_ms)]
+                rows.append({
+                    "reranker": rtype,
+                    "ef": ef,
+                    "candidates": n,
+                    "top_n": top_n,
+                    "recall": sum(r for r, _ in scored) / len(items),
+                    "mrr": sum(rr for _, rr in scored) / len(items),
+                    "candidate_recall": cand_recall,
+                    "embed_p50_ms": _pct(embed_ms, 50),
+                    "search_p50_ms": _pct(search_ms, 50),
+                    "rerank_p50_ms": _pct(rerank_ms, 50),
+                    "total_p50_ms": _pct(totals, 50),
+                    "total_p95_ms": _pct(totals, 95),
+                })
+
+    _mark_pareto(rows)
+    _print_table(rows, args.min_recall)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nResults written to {args.out}")
+
+
+def _mark_pareto(rows):
+    """A row is Pareto-optimal if no other row is at least as good on recall, MRR and p95 latency and better on one."""
+    for row in rows:
+        row["pareto"] = not any(
+            o["recall"] >= row["recall"] and o["mrr"] >= row["mrr"] and o["total_p95_ms"] <= row["total_p95_ms"]
+            and (o["recall"] > row["recall"] or o["mrr"] > row["mrr"] or o["total_p95_ms"] < row["total_p95_ms"])
+            for o in rows
+        )
+
+
+def _print_table(rows, min_recall):
+    rows = sorted(rows, key=lambda r: (r["total_p95_ms"], -r["recall"]))
+    header = (f"{'':2}{'reranker':<14}{'ef':>5}{'cand':>6}{'top_n':>6}{'recall':>8}{'mrr':>7}{'c_rec':>7}"
+              f"{'embed':>8}{'search':>8}{'rerank':>8}{'p50':>8}{'p95':>8}")
+    print("\n--- Sweep results (latencies in ms, sorted by p95; * = Pareto-optimal) ---")
+    print(header)
+    for r in rows:
+        print(f"{'*' if r['pareto'] else ' ':2}{r['reranker']:<14}{r['ef']:>5}{r['candidates']:>6}{r['top_n']:>6}"
+              f"{r['recall']:>8.3f}{r['mrr']:>7.3f}{r['candidate_recall']:>7.3f}"
+              f"{r['embed_p50_ms']:>8.1f}{r['search_p50_ms']:>8.1f}{r['rerank_p50_ms']:>8.1f}"
+              f"{r['total_p50_ms']:>8.1f}{r['total_p95_ms']:>8.1f}")
+
+    if min_recall is not None:
+        ok = [r for r in rows if r["recall"] >= min_recall]
+        if ok:
+            best = min(ok, key=lambda r: (r["total_p95_ms"], -r["mrr"]))
+            print(f"\nCheapest configuration with recall >= {min_recall}: reranker={best['reranker']} "
+                  f"ef={best['ef']} candidates={best['candidates']} top_n={best['top_n']} "
+                  f"(recall {best['recall']:.3f}, MRR {best['mrr']:.3f}, p95 {best['total_p95_ms']:.1f} ms)")
+        else:
+            print(f"\nNo configuration reaches recall >= {min_recall}.")
+
+
 if __name__ == "__main__":
-    test_retrieval()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Debug retrieval for one question or sweep parameters over an eval set.")
+    parser.add_argument("--question", default="What is the company's policy on sick leave?",
+                        help="question to retrieve for (without --eval)")
+    parser.add_argument("--eval", default=None, help="labeled eval set (JSON lines); enables the sweep")
+    parser.add_argument("--k", default="4,7", help="retriever.k values used without a reranker")
+    parser.add_argument("--candidates", default="8,16", help="reranker.candidates values")
+    parser.add_argument("--top-n", default="4", help="reranker.top_n values")
+    parser.add_argument("--ef", default="64", help="HNSW ef values")
+    parser.add_argument("--rerankers", default="none,cross_encoder", help="reranker types: none, cross_encoder, llm")
+    parser.add_argument("--min-recall", type=float, default=None, help="report the cheapest configuration reaching this recall")
+    parser.add_argument("--out", default=None, help="also write all rows to this JSON file")
+    args = parser.parse_args()
+
+    if args.eval:
+        sweep(args)
+    else:
+        test_retrieval(args.question)
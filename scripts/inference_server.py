@@ -0,0 +1,14 @@
+from src.inference_server import run
+if __name__ == "__main__":
+    """
+    Runs the shared inference sidecar.
+
+    Loads the cross-encoder reranker and the local (huggingface) embedding model
+    once and serves every uvicorn worker over a Unix domain socket, batching
+    requests across workers. Enable inference_server in config/app.yaml.
+    """
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", default=None, help="overrides inference_server.socket")
+    args = parser.parse_args()
+    run(args.socket)
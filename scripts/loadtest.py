@@ -0,0 +1,375 @@
+"""
+Offline load test: runs the API against the local stand-ins from
+config/loadtest.yaml and drives /api/ask and /ws/{token} with simulated users.
+
+    python -m scripts.loadtest --users 20 --duration 60 --ws-fraction 0.5
+
+Reports throughput, latency percentiles, time to first token (WebSocket) and
+the CPU time used by the server process(es) during the measured window.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+import httpx
+import websockets
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+QUESTIONS = [
+    "How many days of annual leave do I get?",
+    "What is the policy on sick leave?",
+    "Can I carry over unused vacation days to next year?",
+    "How do I submit an expense reimbursement?",
+    "What is the notice period during probation?",
+    "Is remote work allowed, and how do I request it?",
+    "How is overtime compensated?",
+    "What should I do on my first day?",
+    "How do I get my laptop and VPN access set up?",
+    "When do I receive my badge after joining?",
+    "Who approves travel requests?",
+    "How does the annual performance review work?",
+]
+
+
+def percentile(values, p):
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values: The observations.
+        p: The percentile (0-100).
+
+    Returns:
+        The percentile value, or None if there are no observations.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def cpu_seconds(pid):
+    """
+    User + system CPU time of a process and its children (e.g. uvicorn workers).
+
+    Args:
+        pid: The process ID.
+
+    Returns:
+        CPU seconds, or None if it cannot be read on this platform.
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+    if psutil is not None:
+        proc = psutil.Process(pid)
+        total = 0.0
+        for p in [proc] + proc.children(recursive=True):
+            try:
+                times = p.cpu_times()
+                total += times.user + times.system
+            except psutil.NoSuchProcess:
+                pass
+        return total
+
+    if not os.path.isdir("/proc"):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+    total = 0.0
+    pids = {pid}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                if int(fields[1]) == pid:  # ppid
+                    pids.add(int(entry))
+            except OSError:
+                continue
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += (int(fields[11]) + int(fields[12])) / ticks  # utime + stime
+        except OSError:
+            continue
+    return total
+
+
+def prepare_users(n, db_path):
+    """
+    Creates the simulated users and returns an access token per user.
+
+    Args:
+        n: Number of users.
+        db_path: Path of the temporary user database.
+
+    Returns:
+        A list of access tokens.
+    """
+    from authentication.auth import create_access_token, get_password_hash
+    from authentication.user_repository import SQLiteUserRepository
+
+    repo = SQLiteUserRepository(db_path)
+    password = get_password_hash("loadtest")
+    tokens = []
+    for i in range(n):
+        username = f"loadtest{i:04d}"
+        repo.create({"username": username, "password": password, "email": f"{username}@example.com",
+                     "disabled": False, "role": "employee"})
+        tokens.append(create_access_token({"username": username}, expires_delta=timedelta(hours=6)))
+    return tokens
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, workers, env):
+    """
+    Starts uvicorn in a subprocess and waits until it answers.
+
+    Args:
+        port: The port to listen on.
+        workers: Number of uvicorn workers.
+        env: Environment for the server process.
+
+    Returns:
+        The server process.
+    """
+    cmd = [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env)
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited with code {proc.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1.0).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("Server did not become ready within 120s")
+
+
+class Results:
+    def __init__(self):
+        self.records = []  # (mode, status, latency_s, ttft_s)
+
+    def add(self, mode, status, latency, ttft=None):
+        self.records.append((mode, status, latency, ttft))
+
+
+async def ask_user(client, base_url, token, question):
+    started = time.perf_counter()
+    try:
+        resp = await client.post(f"{base_url}/api/ask", json={"question": question},
+                                 headers={"Authorization": f"Bearer {token}"})
+        status = {200: "ok", 503: "busy"}.get(resp.status_code, "error")
+    except httpx.HTTPError:
+        status = "error"
+    return status, time.perf_counter() - started, None
+
+
+async def ws_ask(ws, question):
+    started = time.perf_counter()
+    ttft = None
+    await ws.send(json.dumps({"query": question}))
+    while True:
+        frame = json.loads(await ws.recv())
+        kind = frame.get("type")
+        if kind == "token_chunk" and ttft is None:
+            ttft = time.perf_counter() - started
+        elif kind == "stream_end":
+            return "ok", time.perf_counter() - started, ttft
+        elif kind in ("busy", "error"):
+            return ("busy" if kind == "busy" else "error"), time.perf_counter() - started, ttft
+
+
+async def simulated_user(idx, args, base_url, ws_url, token, results, start_at, stop_at):
+    rng = random.Random(args.seed * 100003 + idx)
+    use_ws = rng.random() < args.ws_fraction
+    # Stagger arrivals so users do not all fire at t=0
+    await asyncio.sleep(rng.uniform(0, args.ramp_up))
+
+    async with httpx.AsyncClient(timeout=args.timeout) as client:
+        ws = None
+        try:
+            if use_ws:
+                ws = await websockets.connect(f"{ws_url}/ws/{token}", max_size=None)
+                await ws.recv()  # welcome message
+            while time.monotonic() < stop_at:
+                question = rng.choice(QUESTIONS)
+                if ws is not None:
+                    try:
+                        status, latency, ttft = await asyncio.wait_for(ws_ask(ws, question), args.timeout)
+                    except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                        if time.monotonic() >= start_at:
+                            results.add("ws", "error", args.timeout, None)
+                        break
+                    mode = "ws"
+                else:
+                    status, latency, ttft = await ask_user(client, base_url, token, question)
+                    mode = "ask"
+                if time.monotonic() >= start_at:
+                    results.add(mode, status, latency, ttft)
+                if args.think_ms > 0:
+                    await asyncio.sleep(rng.expovariate(1000.0 / args.think_ms))
+        finally:
+            if ws is not None:
+                await ws.close()
+
+
+async def run_load(args, base_url, tokens, server_pid):
+    ws_url = base_url.replace("http", "ws", 1)
+    results = Results()
+    now = time.monotonic()
+    start_at = now + args.ramp_up + args.warmup
+    stop_at = start_at + args.duration
+
+    users = [
+        asyncio.create_task(simulated_user(i, args, base_url, ws_url, tokens[i], results, start_at, stop_at))
+        for i in range(args.users)
+    ]
+    await asyncio.sleep(max(0.0, start_at - time.monotonic()))
+    cpu_before = cpu_seconds(server_pid) if server_pid else None
+    wall_before = time.monotonic()
+    await asyncio.sleep(max(0.0, stop_at - time.monotonic()))
+    cpu_after = cpu_seconds(server_pid) if server_pid else None
+    wall = time.monotonic() - wall_before
+    await asyncio.gather(*users, return_exceptions=True)
+
+    cpu = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+    return results, wall, cpu
+
+
+def summarize(results, wall, cpu):
+    """
+    Builds the report rows.
+
+    Args:
+        results: The collected results.
+        wall: Length of the measured window in seconds.
+        cpu: Server CPU seconds used in the window (or None).
+
+    Returns:
+        A dictionary with one entry per mode plus totals.
+    """
+    report = {"window_s": round(wall, 2), "modes": {}}
+    for mode in sorted({r[0] for r in results.records}):
+        rows = [r for r in results.records if r[0] == mode]
+        ok = [r for r in rows if r[1] == "ok"]
+        latencies = [r[2] for r in ok]
+        ttfts = [r[3] for r in ok if r[3] is not None]
+        entry = {
+            "requests": len(rows),
+            "ok": len(ok),
+            "busy": sum(1 for r in rows if r[1] == "busy"),
+            "errors": sum(1 for r in rows if r[1] == "error"),
+            "throughput_rps": round(len(ok) / wall, 2) if wall else None,
+        }
+        for p in (50, 95, 99):
+            v = percentile(latencies, p)
+            entry[f"p{p}_ms"] = round(v * 1000, 1) if v is not None else None
+        if ttfts:
+            for p in (50, 95, 99):
+                entry[f"ttft_p{p}_ms"] = round(percentile(ttfts, p) * 1000, 1)
+        report["modes"][mode] = entry
+
+    total_ok = sum(m["ok"] for m in report["modes"].values())
+    report["throughput_rps"] = round(total_ok / wall, 2) if wall else None
+    if cpu is not None:
+        report["server_cpu_s"] = round(cpu, 2)
+        report["server_cpu_util"] = round(cpu / wall, 3) if wall else None  # 1.0 = one core busy
+        report["server_cpu_ms_per_request"] = round(cpu * 1000 / total_ok, 2) if total_ok else None
+    return report
+
+
+def print_report(report):
+    cols = ["requests", "ok", "busy", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms",
+            "ttft_p50_ms", "ttft_p95_ms", "ttft_p99_ms"]
+    print(f"\n--- Load test results ({report['window_s']}s window) ---")
+    print("mode  " + "  ".join(f"{c:>14}" for c in cols))
+    for mode, entry in report["modes"].items():
+        cells = ["-" if entry.get(c) is None else str(entry[c]) for c in cols]
+        print(f"{mode:<5} " + "  ".join(f"{c:>14}" for c in cells))
+    print(f"\nTotal throughput: {report['throughput_rps']} req/s")
+    if "server_cpu_s" in report:
+        print(f"Server CPU: {report['server_cpu_s']}s "
+              f"({report['server_cpu_util'] * 100:.0f}% of one core, "
+              f"{report['server_cpu_ms_per_request']} ms per request)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test against local stand-ins.")
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=60, help="measured window in seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds excluded from the results")
+    parser.add_argument("--ramp-up", type=float, default=5, help="users start within this many seconds")
+    parser.add_argument("--ws-fraction", type=float, default=0.5, help="share of users using the WebSocket")
+    parser.add_argument("--think-ms", type=float, default=500, help="mean pause between questions")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="seed for question choice and think times")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--overlay", default="config/loadtest.yaml", help="config overlay for the server")
+    parser.add_argument("--url", default=None,
+                        help="target an already running server instead of starting one "
+                             "(it must share SECRET_KEY and USER_DB_PATH with this process)")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID to measure CPU of with --url")
+    parser.add_argument("--json", default=None, help="also write the report to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="hrbot-loadtest-")
+    if not args.url:
+        os.environ.setdefault("SECRET_KEY", "loadtest-secret-key")
+        os.environ["USER_DB_PATH"] = os.path.join(workdir, "users.db")
+    tokens = prepare_users(args.users, os.getenv("USER_DB_PATH", os.path.join(workdir, "users.db")))
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+        server_pid = args.server_pid
+    else:
+        env = dict(os.environ, APP_CONFIG_OVERLAY=args.overlay)
+        port = free_port()
+        print(f"--- Starting server on port {port} with {args.overlay} ---")
+        server = start_server(port, args.workers, env)
+        base_url = f"http://127.0.0.1:{port}"
+        server_pid = server.pid
+
+    try:
+        print(f"--- Running {args.users} users for {args.duration}s "
+              f"(+{args.ramp_up + args.warmup}s ramp-up and warm-up) ---")
+        results, wall, cpu = asyncio.run(run_load(args, base_url, tokens, server_pid))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = summarize(results, wall, cpu)
+    report["config"] = {k: v for k, v in vars(args).items() if k not in ("json",)}
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Operator tool for account changes that the public API does not allow.
+
+    python -m scripts.manage_users --username alice --role admin
+
+Signup always creates accounts with `roles.default_role`; admin roles are
+granted here, directly in the user database (USER_DB_PATH). Running workers
+drop their cached tokens within TOKEN_REVOCATION_CHECK_SECONDS, so the new
+role applies on the user's next request.
+"""
+import argparse
+import os
+import sys
+
+from authentication.user_repository import SQLiteUserRepository
+from utils.constants import USER_DB_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Change a user's role in the user database.")
+    parser.add_argument("--username", required=True, help="existing account to update")
+    parser.add_argument("--role", required=True, help="new role, e.g. one of roles.admin_roles")
+    parser.add_argument("--db", default=os.getenv("USER_DB_PATH", USER_DB_PATH), help="user database path")
+    args = parser.parse_args()
+    if not args.role.strip():
+        parser.error("--role must not be empty")
+
+    user = SQLiteUserRepository(args.db).set_role(args.username, args.role.strip())
+    if user is None:
+        sys.exit(f"No user named '{args.username}' in {args.db}")
+    print(f"{user['username']}: role={user['role']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,7 @@ class ChatRequest(BaseModel):
 @app.post("/chat")
 def chat(req: ChatRequest):
     try:
-        route, ans = chat_once(req.question, role=req.role, user_id=req.user_id)
+        route, ans, _ = chat_once(req.question, role=req.role, user_id=req.user_id)
         return {"route": route, "answer": ans}
     except Exception as e:
         tb = traceback.format_exc()
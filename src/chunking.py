@@ -0,0 +1,198 @@
+from __future__ import annotations
+import re
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.documents import Document
+
+# Splits a paragraph that is too long for one chunk at sentence ends
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+_BOLD_FLAG = 1 << 4  # fitz span flag
+
+
+def token_counter(encoding: str = "cl100k_base") -> Callable[[str], int]:
+    """
+    Returns a function counting the tokens of a text with a tiktoken encoding.
+
+    Args:
+        encoding: The tiktoken encoding name (default "cl100k_base", used by
+            the OpenAI embedding and chat models).
+
+    Returns:
+        The counting function.
+    """
+    import tiktoken
+    enc = tiktoken.get_encoding(encoding)
+    return lambda text: len(enc.encode_ordinary(text))
+
+
+def pdf_page_lines(page) -> List[Dict[str, Any]]:
+    """
+    Extracts the text lines of a fitz page with their font information.
+
+    Args:
+        page: The fitz page.
+
+    Returns:
+        One record per non-empty line: text, block (index of the text block
+        on the page, i.e. the paragraph), size (largest font size) and bold
+        (every span is bold).
+    """
+    lines = []
+    for b, block in enumerate(page.get_text("dict")["blocks"]):
+        if block.get("type", 0) != 0:
+            continue
+        for line in block["lines"]:
+            spans = [s for s in line["spans"] if s["text"].strip()]
+            text = "".join(s["text"] for s in line["spans"]).strip()
+            if not spans:
+                continue
+            lines.append({
+                "text": text,
+                "block": b,
+                "size": round(max(s["size"] for s in spans), 1),
+                "bold": all(s["flags"] & _BOLD_FLAG or "bold" in s["font"].lower() for s in spans),
+            })
+    return lines
+
+
+def _body_size(lines: List[Dict[str, Any]]) -> float:
+    sizes = Counter()
+    for line in lines:
+        if line.get("size"):
+            sizes[line["size"]] += len(line["text"])
+    return sizes.most_common(1)[0][0] if sizes else 0.0
+
+
+def _is_heading(line: Dict[str, Any], body_size: float, ccfg: dict) -> bool:
+    if line.get("heading") is not None:  # explicit (e.g. DOCX heading styles)
+        return bool(line["heading"])
+    text = line["text"]
+    if len(text.split()) > int(ccfg.get("max_heading_words", 12)) or not re.search(r"[A-Za-z]", text):
+        return False
+    if text.endswith((".", ",", ";")):
+        return False
+    larger = body_size and line.get("size", 0) >= body_size * float(ccfg.get("heading_size_ratio", 1.15))
+    return bool(larger or line.get("bold"))
+
+
+def _sections(docs: List[Document], ccfg: dict) -> List[Dict[str, Any]]:
+    """
+    Groups the lines of one file's pages into sections started by headings.
+
+    Returns:
+        Sections with their title and paragraphs as (page, text) pairs.
+    """
+    records = []
+    for d in docs:
+        page = d.metadata.get("page")
+        lines = d.metadata.get("lines")
+        if lines is None:  # no layout: one paragraph per blank-line separated block
+            lines = [{"text": p.strip(), "block": i} for i, p in enumerate(re.split(r"\n\s*\n", d.page_content))
+                     if p.strip()]
+        records.extend((page, line) for line in lines)
+
+    body_size = _body_size([line for _, line in records])
+    sections = [{"title": "", "paragraphs": []}]
+    last_key, last_was_heading = None, False
+    for page, line in records:
+        if _is_heading(line, body_size, ccfg):
+            if last_was_heading:  # multi-line title
+                sections[-1]["title"] += " " + line["text"]
+            else:
+                sections.append({"title": line["text"], "paragraphs": []})
+            last_was_heading, last_key = True, None
+            continue
+        key = (page, line.get("block"))
+        paragraphs = sections[-1]["paragraphs"]
+        if key == last_key and paragraphs:
+            paragraphs[-1] = (paragraphs[-1][0], paragraphs[-1][1] + " " + line["text"])
+        else:
+            paragraphs.append((page, line["text"]))
+        last_key, last_was_heading = key, False
+    return [s for s in sections if s["paragraphs"]]
+
+
+def _units(paragraphs, max_tokens: int, count: Callable[[str], int]):
+    """
+    Yields (page, text, tokens) units no larger than `max_tokens`, splitting
+    long paragraphs at sentence ends and, failing that, at word boundaries.
+    """
+    for page, text in paragraphs:
+        tokens = count(text)
+        if tokens <= max_tokens:
+            yield page, text, tokens
+            continue
+        for sentence in _SENTENCE_END.split(text):
+            n = count(sentence)
+            if n <= max_tokens:
+                yield page, sentence, n
+                continue
+            words = sentence.split()
+            step = max(1, int(len(words) * max_tokens / n))
+            for i in range(0, len(words), step):
+                piece = " ".join(words[i:i + step])
+                yield page, piece, count(piece)
+
+
+def chunk_sections(docs: List[Document], ccfg: dict, count: Optional[Callable[[str], int]] = None) -> List[Document]:
+    """
+    Splits documents into token-sized chunks that never cross a section heading.
+
+    Headings are detected from the font information attached by
+    `walk_docs(..., layout=True)` (larger or bold short lines) or taken from
+    DOCX heading styles. Paragraphs of a section are packed into chunks of at
+    most `chunk_tokens` tokens; consecutive chunks of a section share up to
+    `overlap_tokens` tokens of trailing paragraphs.
+
+    Args:
+        docs: The loaded pages/documents (PDF pages of a file must be consecutive).
+        ccfg: The chunking configuration (chunk_tokens, overlap_tokens,
+            encoding, include_title, heading_size_ratio, max_heading_words).
+        count: Token counting function (optional; defaults to the tiktoken encoding).
+
+    Returns:
+        The chunks, with source, path, page (first page), page_end and section metadata.
+    """
+    count = count or token_counter(ccfg.get("encoding", "cl100k_base"))
+    max_tokens = int(ccfg.get("chunk_tokens", 350))
+    overlap = int(ccfg.get("overlap_tokens", 40))
+    include_title = ccfg.get("include_title", True)
+
+    files: Dict[str, List[Document]] = {}
+    for d in docs:
+        files.setdefault(d.metadata.get("path", ""), []).append(d)
+
+    chunks = []
+    for path, pages in files.items():
+        base = {k: v for k, v in pages[0].metadata.items() if k not in ("lines", "page")}
+        for section in _sections(pages, ccfg):
+            title = section["title"]
+            header = f"{title}\n\n" if include_title and title else ""
+            budget = max(1, max_tokens - (count(header) if header else 0))
+            current, size = [], 0
+
+            def flush():
+                pages_used = [p for p, _, _ in current if p is not None]
+                meta = {**base, "section": title}
+                if pages_used:
+                    meta["page"], meta["page_end"] = pages_used[0], pages_used[-1]
+                text = header + "\n\n".join(t for _, t, _ in current)
+                chunks.append(Document(page_content=text, metadata=meta))
+
+            for unit in _units(section["paragraphs"], budget, count):
+                if current and size + unit[2] > budget:
+                    flush()
+                    # carry trailing paragraphs into the next chunk as overlap
+                    carried, carried_size = [], 0
+                    for prev in reversed(current):
+                        if carried_size + prev[2] > overlap or carried_size + prev[2] + unit[2] > budget:
+                            break
+                        carried.insert(0, prev)
+                        carried_size += prev[2]
+                    current, size = carried, carried_size
+                current.append(unit)
+                size += unit[2]
+            if current:
+                flush()
+    return chunks
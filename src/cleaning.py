@@ -0,0 +1,168 @@
+from __future__ import annotations
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+_DIGITS = re.compile(r"\d+")
+_SPACE = re.compile(r"\s+")
+_WORD = re.compile(r"\w+")
+_PRIME = np.uint64((1 << 32) + 15)  # smallest prime above 2**32
+
+
+def _line_key(line: str) -> str:
+    # "Page 3 of 40" and "Page 4 of 40" are the same furniture
+    return _SPACE.sub(" ", _DIGITS.sub("#", line.strip().lower()))
+
+
+def strip_boilerplate(docs: List[Document], cfg: Dict[str, Any],
+                      count: Callable[[str], int]) -> Tuple[List[Document], Dict[str, int]]:
+    """
+    Removes lines repeated across the pages of a file (headers, footers, page numbers).
+
+    A short line is boilerplate when, with digits ignored, it appears on at
+    least `min_page_fraction` of a file's pages. Files with fewer than
+    `min_pages` pages are left alone. Layout lines (metadata["lines"]) are
+    filtered along with the text; pages left empty are dropped.
+
+    Args:
+        docs: The loaded pages.
+        cfg: The `cleaning.boilerplate` configuration (min_page_fraction,
+            min_pages, max_line_chars).
+        count: Token counting function, for the report.
+
+    Returns:
+        The cleaned pages and a report (lines, tokens).
+    """
+    min_fraction = float(cfg.get("min_page_fraction", 0.5))
+    min_pages = int(cfg.get("min_pages", 3))
+    max_chars = int(cfg.get("max_line_chars", 120))
+
+    files: Dict[str, List[Document]] = defaultdict(list)
+    for d in docs:
+        files[d.metadata.get("path", "")].append(d)
+
+    report = {"lines": 0, "tokens": 0}
+    cleaned = []
+    for pages in files.values():
+        if len(pages) < min_pages:
+            cleaned.extend(pages)
+            continue
+        seen = Counter()
+        for d in pages:
+            seen.update({_line_key(l) for l in d.page_content.splitlines() if l.strip() and len(l) <= max_chars})
+        boilerplate = {key for key, n in seen.items() if n >= min_fraction * len(pages)}
+        if not boilerplate:
+            cleaned.extend(pages)
+            continue
+
+        for d in pages:
+            kept = []
+            for line in d.page_content.splitlines():
+                if line.strip() and len(line) <= max_chars and _line_key(line) in boilerplate:
+                    report["lines"] += 1
+                    report["tokens"] += count(line)
+                else:
+                    kept.append(line)
+            text = "\n".join(kept)
+            if not text.strip():
+                continue
+            meta = dict(d.metadata)
+            if meta.get("lines") is not None:
+                meta["lines"] = [l for l in meta["lines"]
+                                 if not (len(l["text"]) <= max_chars and _line_key(l["text"]) in boilerplate)]
+            cleaned.append(Document(page_content=text, metadata=meta))
+    return cleaned, report
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, with universal hashing in numpy."""
+
+    def __init__(self, num_perm: int = 128, shingle_words: int = 5, seed: int = 1):
+        """
+        Initializes the hasher.
+
+        Args:
+            num_perm: Signature length (default 128).
+            shingle_words: Words per shingle (default 5).
+            seed: Seed of the hash permutations (default 1).
+        """
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.shingle_words = shingle_words
+
+    def signature(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        n = self.shingle_words
+        shingles = {" ".join(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(x, self.a) + self.b) % _PRIME).min(axis=0)
+
+
+def dedupe_chunks(chunks: List[Document], cfg: Dict[str, Any],
+                  count: Callable[[str], int]) -> Tuple[List[Document], Dict[str, int]]:
+    """
+    Merges near-duplicate chunks, found with MinHash and LSH banding.
+
+    Chunks whose signatures collide in a band are candidates; pairs whose
+    estimated Jaccard similarity reaches `threshold` are merged. Each group
+    keeps its longest chunk, which takes over the others' page citations in
+    metadata["pages"] (every chunk gets this field, e.g. "12" or "12, 30").
+
+    Args:
+        chunks: The chunks, in document order.
+        cfg: The `cleaning.near_duplicates` configuration (threshold,
+            num_perm, bands, shingle_words).
+        count: Token counting function, for the report.
+
+    Returns:
+        The remaining chunks, in their original order, and a report
+        (chunks, tokens) of what was dropped.
+    """
+    threshold = float(cfg.get("threshold", 0.8))
+    num_perm = int(cfg.get("num_perm", 128))
+    bands = int(cfg.get("bands", 16))
+    rows = num_perm // bands
+    hasher = MinHasher(num_perm, int(cfg.get("shingle_words", 5)))
+    signatures = np.stack([hasher.signature(c.page_content) for c in chunks]) if chunks else None
+
+    parent = list(range(len(chunks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        buckets: Dict[bytes, List[int]] = defaultdict(list)
+        for i in range(len(chunks)):
+            buckets[signatures[i, band * rows:(band + 1) * rows].tobytes()].append(i)
+        for members in buckets.values():
+            for n, j in enumerate(members[1:], 1):
+                for i in members[:n]:
+                    if find(i) == find(j):
+                        break
+                    if np.mean(signatures[i] == signatures[j]) >= threshold:
+                        parent[find(j)] = find(i)
+                        break
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(chunks)):
+        groups[find(i)].append(i)
+
+    keep, report = set(), {"chunks": 0, "tokens": 0}
+    for members in groups.values():
+        best = max(members, key=lambda i: len(chunks[i].page_content))
+        pages = sorted({chunks[i].metadata["page"] for i in members if chunks[i].metadata.get("page") is not None})
+        chunks[best].metadata["pages"] = ", ".join(str(p) for p in pages)
+        keep.add(best)
+        for i in members:
+            if i != best:
+                report["chunks"] += 1
+                report["tokens"] += count(chunks[i].page_content)
+    return [c for i, c in enumerate(chunks) if i in keep], report
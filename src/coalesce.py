@@ -0,0 +1,300 @@
+from __future__ import annotations
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+
+_PUNCT_RE = re.compile(r"[\s?!.,;:]+$")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalizes a question so trivially different phrasings share a key.
+
+    Args:
+        question: The user's question.
+
+    Returns:
+        The lower-cased question with collapsed whitespace and no trailing punctuation.
+    """
+    q = _SPACE_RE.sub(" ", question.strip().lower())
+    return _PUNCT_RE.sub("", q)
+
+
+def coalesce_key(question: str, role: str) -> Tuple[str, str]:
+    """
+    Builds the key identifying requests that may share one execution.
+
+    Args:
+        question: The user's question.
+        role: The user's role (answers may differ per role).
+
+    Returns:
+        The coalescing key.
+    """
+    return normalize_question(question), role
+
+
+class _Call:
+    def __init__(self):
+        self.future: Future = Future()
+        self.finished_at: Optional[float] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution (thread-safe).
+
+    The first caller runs the function; callers arriving while it runs, or
+    within `window_s` seconds after it finished successfully, receive the same
+    result. Failures are shared with the waiting callers but never reused.
+    """
+
+    def __init__(self, window_s: float = 0.0, name: str = "once"):
+        """
+        Initializes the single-flight group.
+
+        Args:
+            window_s: How long a finished result stays shareable, in seconds (default 0).
+            name: Name used in the deduplication metrics (default "once").
+        """
+        self.window_s = max(float(window_s), 0.0)
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, _Call] = {}
+
+    def _evict(self, now: float):
+        expired = [k for k, c in self._calls.items()
+                   if c.finished_at is not None and now - c.finished_at > self.window_s]
+        for k in expired:
+            del self._calls[k]
+
+    def do(self, key, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Runs `fn` once per key, sharing the result with concurrent callers.
+
+        Args:
+            key: The coalescing key.
+            fn: The function computing the result.
+
+        Returns:
+            A tuple of the result and whether it was shared from another caller.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        metrics.inc(f"coalesce_{self.name}_requests_total")
+        if not leader:
+            metrics.inc(f"coalesce_{self.name}_shared_total")
+            return call.future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as e:
+            call.future.set_exception(e)
+            with self._lock:
+                self._calls.pop(key, None)
+            raise
+        call.future.set_result(result)
+        with self._lock:
+            if self.window_s > 0:
+                call.finished_at = time.monotonic()
+            else:
+                self._calls.pop(key, None)
+        return result, False
+
+
+class _Flight:
+    def __init__(self, stream):
+        self.stream = stream
+        self.events: List[dict] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Event()
+
+    def notify(self):
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class FlightSubscriber:
+    """
+    One consumer of a shared chat stream.
+
+    Exposes the same `next(timeout)` / `cancel()` interface as
+    `ThreadedStream`, replaying the events produced before it attached.
+    """
+
+    def __init__(self, group: "StreamFlights", key, flight: _Flight,
+                 on_complete: Optional[Callable[[str], None]] = None, admission: Optional[asyncio.Future] = None):
+        self._group = group
+        self._key = key
+        self._flight = flight
+        self._on_complete = on_complete
+        self._admission = admission
+        self._pos = 0
+        self._chunks: List[str] = []
+        self._released = False
+
+    async def next(self, timeout: Optional[float] = None):
+        """
+        Waits for the next event of the shared stream.
+
+        Args:
+            timeout: Seconds to wait before giving up (optional).
+
+        Returns:
+            The next event.
+
+        Raises:
+            asyncio.TimeoutError: If no event arrived within the timeout.
+            StopAsyncIteration: When the stream is exhausted.
+            Exception: Whatever the admission check raised (e.g. `SchedulerBusy`).
+        """
+        if self._admission is not None:
+            # A timeout leaves the admission running for the next call
+            done, _ = await asyncio.wait({self._admission}, timeout=timeout)
+            if not done:
+                raise asyncio.TimeoutError
+            admission, self._admission = self._admission, None
+            if admission.exception() is not None:
+                self.cancel()
+                raise admission.exception()
+        flight = self._flight
+        while True:
+            if self._pos < len(flight.events):
+                event = flight.events[self._pos]
+                self._pos += 1
+                if event.get("type") == "chunk":
+                    self._chunks.append(event["data"])
+                return event
+            if flight.finished:
+                self._release()
+                if flight.error is not None:
+                    raise flight.error
+                if self._on_complete is not None:
+                    callback, self._on_complete = self._on_complete, None
+                    callback("".join(self._chunks))
+                raise StopAsyncIteration
+            await asyncio.wait_for(flight.changed.wait(), timeout)
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self._group._release(self._key, self._flight)
+
+    def cancel(self):
+        """
+        Detaches from the shared stream; the stream stops once nobody listens.
+        """
+        if self._admission is not None:
+            self._admission.add_done_callback(lambda f: f.cancelled() or f.exception())  # nobody will read it
+            self._admission = None
+        self._on_complete = None
+        self._release()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.cancel()
+
+
+class StreamFlights:
+    """
+    Fans one chat stream out to every subscriber asking the same question.
+
+    Must be used from a single event loop. A finished stream stays attachable
+    for `window_s` seconds, so late arrivals get an instant replay.
+    """
+
+    def __init__(self, window_s: float = 0.0, name: str = "stream"):
+        """
+        Initializes the stream group.
+
+        Args:
+            window_s: How long a finished stream stays shareable, in seconds (default 0).
+            name: Name used in the deduplication metrics (default "stream").
+        """
+        self.window_s = max(float(window_s), 0.0)
+        self.name = name
+        self._flights: Dict[Any, _Flight] = {}
+
+    def subscribe(self, key, start: Callable[[], Any],
+                  on_complete: Optional[Callable[[str], None]] = None,
+                  admit: Optional[Callable[[], None]] = None) -> FlightSubscriber:
+        """
+        Attaches to the stream for `key`, starting it if none is in flight.
+
+        Args:
+            key: The coalescing key.
+            start: Callable returning a started `ThreadedStream`.
+            on_complete: Optional callback receiving the full answer when this
+                subscriber has consumed the whole stream.
+            admit: Optional blocking admission check (e.g. a rate limit) for a
+                subscriber joining an existing stream; it runs in the default
+                executor and its error is raised by the first `next()`. The
+                stream that is started applies its own admission.
+
+        Returns:
+            The subscriber handle.
+        """
+        metrics.inc(f"coalesce_{self.name}_requests_total")
+        flight = self._flights.get(key)
+        admission = None
+        if flight is None or (flight.finished and flight.error is not None):
+            flight = _Flight(start())
+            self._flights[key] = flight
+            asyncio.get_running_loop().create_task(self._pump(key, flight))
+        else:
+            metrics.inc(f"coalesce_{self.name}_shared_total")
+            if admit is not None:
+                admission = asyncio.get_running_loop().run_in_executor(None, admit)
+        flight.subscribers += 1
+        return FlightSubscriber(self, key, flight, on_complete, admission)
+
+    async def _pump(self, key, flight: _Flight):
+        try:
+            while True:
+                try:
+                    event = await flight.stream.next()
+                except StopAsyncIteration:
+                    break
+                flight.events.append(event)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+        finally:
+            flight.finished = True
+            flight.notify()
+            if flight.error is not None or self.window_s <= 0:
+                self._forget(key, flight)
+            else:
+                asyncio.get_running_loop().call_later(self.window_s, self._forget, key, flight)
+
+    def _forget(self, key, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _release(self, key, flight: _Flight):
+        flight.subscribers -= 1
+        if flight.subscribers <= 0 and not flight.finished:
+            # Nobody is listening any more: stop generating
+            flight.stream.cancel()
+            self._forget(key, flight)
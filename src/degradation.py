@@ -0,0 +1,145 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from . import metrics
+
+# Latency signal: exponentially weighted average of completed non-streaming request times
+LATENCY_EWMA = "chat_request_seconds_ewma"
+# Streaming signal: average time to the first token (queue wait included). A
+# stream's total duration grows with the answer length, not with the load.
+TTFT_EWMA = "chat_time_to_first_token_seconds_ewma"
+
+
+def _queue_depth() -> float:
+    return metrics.get("scheduler_queue_depth")
+
+
+def _latency() -> float:
+    return metrics.get(LATENCY_EWMA)
+
+
+def _ttft() -> float:
+    return metrics.get(TTFT_EWMA)
+
+
+class DegradationController:
+    """
+    Picks a degradation level from live load and turns it into a request plan.
+
+    Level 0 is normal service. A level is entered as soon as the scheduler
+    queue depth, the average latency of non-streaming requests or the average
+    time to first token of streams reaches its threshold, and left
+    one step at a time once load has stayed below it for `cooldown_s`, so the
+    level does not flap. Each level's settings apply on top of the lower
+    levels' (e.g. level 2 keeps level 1's disabled reranker).
+    """
+
+    def __init__(self, levels: List[Dict[str, Any]], queue_depth: List[float], latency_s: List[float],
+                 cooldown_s: float = 30.0, interval_s: float = 1.0, simple_questions: Optional[Dict] = None,
+                 signals: Optional[Dict[str, Callable[[], float]]] = None, ttft_s: Optional[List[float]] = None):
+        """
+        Initializes the controller.
+
+        Args:
+            levels: Settings of levels 1..N (reranker, top_n, history_messages,
+                max_output_tokens, tier).
+            queue_depth: Scheduler queue depth that enters each level.
+            latency_s: Average non-streaming request latency (seconds) that
+                enters each level.
+            cooldown_s: Time below a level's thresholds before stepping down (default 30).
+            interval_s: Minimum time between re-evaluations (default 1).
+            simple_questions: Route short questions to a cheaper tier at every
+                level (tier, max_words; optional).
+            signals: Overrides the queue depth, latency and TTFT readers (optional).
+            ttft_s: Average stream time to first token (seconds) that enters
+                each level (optional).
+        """
+        self.levels = levels
+        self.thresholds = {"queue_depth": queue_depth, "latency_s": latency_s, "ttft_s": ttft_s or []}
+        self.cooldown_s = cooldown_s
+        self.interval_s = interval_s
+        self.simple_questions = simple_questions or {}
+        self.signals = signals or {"queue_depth": _queue_depth, "latency_s": _latency, "ttft_s": _ttft}
+        self._level = 0
+        self._checked = 0.0
+        self._calm_since: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> Optional["DegradationController"]:
+        """
+        Builds the controller from the `degradation` configuration.
+
+        Args:
+            cfg: The degradation configuration.
+
+        Returns:
+            The controller, or None if disabled.
+        """
+        cfg = cfg or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            levels=list(cfg.get("levels") or []),
+            queue_depth=[float(x) for x in cfg.get("queue_depth") or []],
+            latency_s=[float(x) for x in cfg.get("latency_s") or []],
+            cooldown_s=float(cfg.get("cooldown_s", 30.0)),
+            interval_s=float(cfg.get("interval_s", 1.0)),
+            simple_questions=cfg.get("simple_questions"),
+            ttft_s=[float(x) for x in cfg.get("ttft_s") or []],
+        )
+
+    def _target(self) -> int:
+        target = 0
+        for name, thresholds in self.thresholds.items():
+            if not thresholds:
+                continue
+            value = self.signals[name]()
+            target = max(target, sum(1 for t in thresholds if value >= t))
+        return min(target, len(self.levels))
+
+    def level(self) -> int:
+        """
+        Returns the current level, re-evaluating the load at most every `interval_s`.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked < self.interval_s:
+                return self._level
+            self._checked = now
+            target = self._target()
+            if target > self._level:
+                self._level, self._calm_since = target, None
+            elif target < self._level:
+                if self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= self.cooldown_s:
+                    self._level, self._calm_since = self._level - 1, now
+            else:
+                self._calm_since = None
+            metrics.set_gauge("degradation_level", self._level)
+            return self._level
+
+    def plan(self, question: str = "") -> Dict[str, Any]:
+        """
+        Returns the settings for a new request at the current level.
+
+        Args:
+            question: The question, used to send short questions to the cheaper tier.
+
+        Returns:
+            A dictionary with level and any of reranker, top_n,
+            history_messages, max_output_tokens and tier.
+        """
+        level = self.level()
+        plan: Dict[str, Any] = {"level": level}
+        for settings in self.levels[:level]:
+            plan.update(settings or {})
+        simple = self.simple_questions
+        if simple.get("tier") and "tier" not in plan and len(question.split()) <= int(simple.get("max_words", 8)):
+            plan["tier"] = simple["tier"]
+        if level:
+            metrics.inc("degraded_requests_total", labels={"level": str(level)})
+        return plan
@@ -1,14 +1,19 @@
 from __future__ import annotations
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_openai import OpenAIEmbeddings
-import torch
 
-def build_embeddings(cfg: dict):
+# Provider libraries are imported inside build_embeddings so a worker only pays
+# for the one that is configured (torch alone takes seconds to import).
+
+
+def build_embeddings(cfg: dict, remote=None, http=None):
     """
     Builds an embeddings model based on the configuration.
 
     Args:
         cfg: The configuration dictionary for embeddings.
+        remote: Optional inference sidecar client; when given, a huggingface
+            model runs in the shared sidecar instead of this process.
+        http: Shared pooled HTTP clients for the openai provider (optional,
+            see `http_client.build_http_clients`).
 
     Returns:
         The embeddings model instance.
@@ -19,11 +24,20 @@ def build_embeddings(cfg: dict):
     provider = cfg.get("provider", "openai").lower()
 
     if provider == "openai":
-        return OpenAIEmbeddings(model=cfg["model"])
+        from langchain_openai import OpenAIEmbeddings
+        if http is None:
+            return OpenAIEmbeddings(model=cfg["model"])
+        return OpenAIEmbeddings(model=cfg["model"], http_client=http.client,
+                                http_async_client=http.async_client, request_timeout=http.timeout)
 
     elif provider == "huggingface":
+        if remote is not None:
+            from .inference import RemoteEmbeddings
+            return RemoteEmbeddings(remote)
+        from langchain_huggingface import HuggingFaceEmbeddings
         device = cfg.get("device", "cpu")
         if device == "auto":
+            import torch
             device = "cuda" if torch.cuda.is_available() else "cpu"
 
         return HuggingFaceEmbeddings(
@@ -35,5 +49,9 @@ def build_embeddings(cfg: dict):
                 "convert_to_numpy": True,
             },
         )
+    elif provider == "fake":
+        # Local stand-in for load tests (see config/loadtest.yaml)
+        from .fakes import FakeEmbeddings
+        return FakeEmbeddings.from_config(cfg)
     else:
         raise ValueError(f"Unsupported embeddings provider specified in config: '{provider}'")
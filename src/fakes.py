@@ -0,0 +1,262 @@
+from __future__ import annotations
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Deterministic local stand-ins for the LLM, the embeddings model and the vector
+# store, selected with `provider: fake` (see config/loadtest.yaml). They sleep
+# for seeded, configurable latencies instead of calling OpenAI or Zilliz, so
+# load tests are free and repeatable.
+
+_WORD_RE = re.compile(r"\w+")
+
+_VOCABULARY = (
+    "employee leave policy manager approval days annual sick request payroll benefits "
+    "onboarding laptop account access badge orientation training handbook remote work "
+    "hours overtime holiday notice period probation review performance expense travel "
+    "reimbursement insurance health vacation carry over calendar team hr portal form "
+    "submit deadline eligible contract salary bonus conduct security password vpn"
+).split()
+
+
+class LatencyModel:
+    """Log-normal latency: `median_ms * exp(sigma * N(0, 1))`, never below `min_ms`."""
+
+    def __init__(self, median_ms: float = 0.0, sigma: float = 0.0, min_ms: float = 0.0):
+        self.median_ms = float(median_ms)
+        self.sigma = float(sigma)
+        self.min_ms = float(min_ms)
+
+    @classmethod
+    def from_config(cls, cfg) -> "LatencyModel":
+        """
+        Builds a latency model from a number (constant milliseconds) or a mapping.
+
+        Args:
+            cfg: A number, or a mapping with median (ms), sigma and min (ms).
+
+        Returns:
+            The latency model.
+        """
+        if cfg is None:
+            return cls()
+        if isinstance(cfg, (int, float)):
+            return cls(cfg)
+        return cls(cfg.get("median", 0.0), cfg.get("sigma", 0.0), cfg.get("min", 0.0))
+
+    def sample(self, rng: random.Random) -> float:
+        """
+        Draws one latency.
+
+        Args:
+            rng: The random generator to draw from.
+
+        Returns:
+            The latency in seconds.
+        """
+        if self.median_ms <= 0:
+            return 0.0
+        ms = self.median_ms
+        if self.sigma > 0:
+            ms *= rng.lognormvariate(0.0, self.sigma)
+        return max(ms, self.min_ms) / 1000.0
+
+
+class _Seeded:
+    """Thread-safe access to one seeded random generator."""
+
+    def __init__(self, seed: int):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self, model: LatencyModel) -> float:
+        with self._lock:
+            return model.sample(self._rng)
+
+    def words(self, n: int) -> List[str]:
+        with self._lock:
+            return [self._rng.choice(_VOCABULARY) for _ in range(n)]
+
+
+class FakeLLMClient:
+    """Stand-in for `OpenAIClient` with seeded latencies and a fixed token rate."""
+
+    def __init__(self, seed: int = 0, complete_ms=None, ttft_ms=None,
+                 tokens_per_s: float = 50.0, output_tokens: int = 120):
+        """
+        Initializes the fake client.
+
+        Args:
+            seed: Seed of the latency and text generator (default 0).
+            complete_ms: Latency of `complete` and `complete_json` (number or mapping).
+            ttft_ms: Time before the first streamed token (number or mapping).
+            tokens_per_s: Streaming rate after the first token (default 50).
+            output_tokens: Number of tokens per answer (default 120).
+        """
+        self._rng = _Seeded(seed)
+        self.complete_latency = LatencyModel.from_config(complete_ms)
+        self.ttft_latency = LatencyModel.from_config(ttft_ms)
+        self.tokens_per_s = float(tokens_per_s)
+        self.output_tokens = int(output_tokens)
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "FakeLLMClient":
+        fake = cfg.get("fake", {}) or {}
+        return cls(
+            seed=fake.get("seed", 0),
+            complete_ms=fake.get("complete_ms"),
+            ttft_ms=fake.get("ttft_ms"),
+            tokens_per_s=fake.get("tokens_per_s", 50.0),
+            output_tokens=fake.get("output_tokens", 120),
+        )
+
+    @staticmethod
+    def _route(prompt: str) -> str:
+        text = prompt.lower()
+        return "onboarding" if any(w in text for w in ("onboard", "laptop", "first day", "badge")) else "hr_policy"
+
+    @staticmethod
+    def _tag(prompt: str) -> str:
+        # Combined route-and-answer prompts ask for a route tag first
+        if "[route: onboarding]" not in prompt:
+            return ""
+        return f"[route: {FakeLLMClient._route(prompt.rsplit('Question:', 1)[-1])}]\n"
+
+    def _length(self, max_tokens: Optional[int]) -> int:
+        return min(self.output_tokens, max_tokens) if max_tokens else self.output_tokens
+
+    def complete(self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        time.sleep(self._rng.latency(self.complete_latency))
+        return self._tag(prompt) + " ".join(self._rng.words(self._length(max_tokens)))
+
+    def complete_json(self, prompt: str, system: Optional[str] = None) -> Dict[str, Any]:
+        time.sleep(self._rng.latency(self.complete_latency))
+        return {"route": self._route(prompt), "confidence": 0.9, "reason": "fake router"}
+
+    def stream(self, prompt: str, system: Optional[str] = None,
+               cancel_event: Optional[threading.Event] = None, max_tokens: Optional[int] = None) -> Iterable[str]:
+        time.sleep(self._rng.latency(self.ttft_latency))
+        gap = 1.0 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+        if system and '"route"' in system:  # streamed router: JSON in token-sized pieces
+            text = json.dumps({"route": self._route(prompt), "confidence": 0.9, "reason": "fake router"})
+            for i in range(0, len(text), 4):
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                if i:
+                    time.sleep(gap)
+                yield text[i:i + 4]
+            return
+        tag = self._tag(prompt)
+        if tag:
+            yield tag
+        for i, word in enumerate(self._rng.words(self._length(max_tokens))):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            if i:
+                time.sleep(gap)
+            yield word if i == 0 else " " + word
+
+
+class FakeEmbeddings:
+    """
+    Stand-in embeddings: feature-hashed bag of words, L2-normalized.
+
+    Texts sharing words get similar vectors, so retrieval results are stable
+    and loosely meaningful without a model.
+    """
+
+    def __init__(self, dim: int = 1536, latency_ms=None, seed: int = 0):
+        """
+        Initializes the fake embeddings.
+
+        Args:
+            dim: Vector dimension (default 1536).
+            latency_ms: Latency per call (number or mapping).
+            seed: Seed of the latency generator (default 0).
+        """
+        self.dim = int(dim)
+        self.latency = LatencyModel.from_config(latency_ms)
+        self._rng = _Seeded(seed)
+
+    @classmethod
+    def from_config(cls, cfg: Dict[str, Any]) -> "FakeEmbeddings":
+        fake = cfg.get("fake", {}) or {}
+        return cls(dim=cfg.get("dim", 1536), latency_ms=fake.get("latency_ms"), seed=fake.get("seed", 0))
+
+    def _vector(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vec[h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self._rng.latency(self.latency))
+        return self._vector(text).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._rng.latency(self.latency))
+        return [self._vector(t).tolist() for t in texts]
+
+
+class FakeVectorStore:
+    """
+    Stand-in for the Milvus store: a seeded synthetic corpus searched by brute force.
+    """
+
+    def __init__(self, emb, documents: int = 1000, words_per_document: int = 120,
+                 latency_ms=None, seed: int = 0):
+        """
+        Initializes the store and embeds the synthetic corpus.
+
+        Args:
+            emb: The embeddings used to index the corpus (a `FakeEmbeddings` is fastest).
+            documents: Number of synthetic chunks (default 1000).
+            words_per_document: Length of each chunk in words (default 120).
+            latency_ms: Latency per search (number or mapping).
+            seed: Seed of the corpus and latency generator (default 0).
+        """
+        self.latency = LatencyModel.from_config(latency_ms)
+        self._rng = _Seeded(seed)
+        texts = [" ".join(self._rng.words(words_per_document)) for _ in range(int(documents))]
+        self.docs = [
+            Document(page_content=text, metadata={"source": "synthetic_handbook.pdf", "page": i // 4, "chunk_id": i})
+            for i, text in enumerate(texts)
+        ]
+        if isinstance(emb, FakeEmbeddings):
+            # Index without the simulated per-call latency
+            self.matrix = np.asarray([emb._vector(t) for t in texts], dtype=np.float32)
+        else:
+            self.matrix = np.asarray(emb.embed_documents(texts), dtype=np.float32)
+
+    @classmethod
+    def from_config(cls, emb, mcfg: Dict[str, Any]) -> "FakeVectorStore":
+        fake = mcfg.get("fake", {}) or {}
+        return cls(
+            emb,
+            documents=fake.get("documents", 1000),
+            words_per_document=fake.get("words_per_document", 120),
+            latency_ms=fake.get("latency_ms"),
+            seed=fake.get("seed", 0),
+        )
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, expr: Optional[str] = None,
+                                    **kwargs) -> List[Document]:
+        time.sleep(self._rng.latency(self.latency))
+        if not len(self.docs):
+            return []
+        scores = self.matrix @ np.asarray(embedding, dtype=np.float32)
+        k = min(int(k), len(self.docs))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [self.docs[i] for i in top[np.argsort(-scores[top])]]
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        raise NotImplementedError("The fake vector store is read-only")
@@ -0,0 +1,312 @@
+from __future__ import annotations
+import asyncio
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+
+import httpx
+
+from . import metrics
+
+_STREAMED = re.compile(rb'"stream"\s*:\s*true')
+
+
+class HedgePolicy:
+    """
+    Decides when to send a duplicate (hedged) request.
+
+    The delay is a percentile of recently observed first-byte latencies (the
+    time until response headers) of the same kind of request (URL path,
+    streamed or not), clamped to [min_delay_ms, max_delay_ms].
+    No hedge is sent until `min_samples` latencies have been seen, and at most
+    `max_ratio` of requests are hedged so a slow upstream is not doubled.
+    """
+
+    def __init__(self, percentile: float = 95, min_delay_ms: float = 300, max_delay_ms: float = 5000,
+                 min_samples: int = 50, window: int = 500, max_ratio: float = 0.1):
+        """
+        Initializes the policy.
+
+        Args:
+            percentile: Latency percentile used as the hedging delay (default 95).
+            min_delay_ms: Lower bound of the delay (default 300).
+            max_delay_ms: Upper bound of the delay (default 5000).
+            min_samples: Latencies needed before hedging starts (default 50).
+            window: Number of recent latencies kept (default 500).
+            max_ratio: Maximum fraction of requests hedged (default 0.1).
+        """
+        self.percentile = percentile
+        self.min_delay_s = min_delay_ms / 1000.0
+        self.max_delay_s = max_delay_ms / 1000.0
+        self.min_samples = min_samples
+        self.max_ratio = max_ratio
+        self.window = window
+        self._latencies: Dict[str, deque] = {}
+        self._requests = 0
+        self._hedges = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> Optional["HedgePolicy"]:
+        cfg = cfg or {}
+        if not cfg.get("enabled", False):
+            return None
+        return cls(
+            percentile=float(cfg.get("percentile", 95)),
+            min_delay_ms=float(cfg.get("min_delay_ms", 300)),
+            max_delay_ms=float(cfg.get("max_delay_ms", 5000)),
+            min_samples=int(cfg.get("min_samples", 50)),
+            max_ratio=float(cfg.get("max_ratio", 0.1)),
+        )
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        streamed = _STREAMED.search(request.content or b"") is not None
+        return f"{request.url.path}{' (stream)' if streamed else ''}"
+
+    def observe(self, key: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def delay(self, key: str) -> Optional[float]:
+        """
+        Returns the hedging delay for a new request, or None to not hedge it.
+        """
+        with self._lock:
+            self._requests += 1
+            latencies = self._latencies.get(key, ())
+            if len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+            value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))]
+        return min(max(value, self.min_delay_s), self.max_delay_s)
+
+    def allow_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges + 1 > self.max_ratio * self._requests:
+                return False
+            self._hedges += 1
+            return True
+
+
+class _DeadlineStream(httpx.SyncByteStream):
+    """Response body that fails once the exchange exceeds its total timeout."""
+
+    def __init__(self, stream, deadline: float, request: httpx.Request):
+        self.stream = stream
+        self.deadline = deadline
+        self.request = request
+
+    def __iter__(self):
+        for chunk in self.stream:
+            if time.monotonic() > self.deadline:
+                metrics.inc("http_timeouts_total", labels={"kind": "total"})
+                raise httpx.ReadTimeout("Total request timeout exceeded", request=self.request)
+            yield chunk
+
+    def close(self):
+        self.stream.close()
+
+
+class _AsyncDeadlineStream(httpx.AsyncByteStream):
+    def __init__(self, stream, deadline: float, request: httpx.Request):
+        self.stream = stream
+        self.deadline = deadline
+        self.request = request
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            if time.monotonic() > self.deadline:
+                metrics.inc("http_timeouts_total", labels={"kind": "total"})
+                raise httpx.ReadTimeout("Total request timeout exceeded", request=self.request)
+            yield chunk
+
+    async def aclose(self):
+        await self.stream.aclose()
+
+
+def _with_stream(response: httpx.Response, stream, request: httpx.Request) -> httpx.Response:
+    return httpx.Response(status_code=response.status_code, headers=response.headers, stream=stream,
+                          extensions=response.extensions, request=request)
+
+
+class HedgingTransport(httpx.BaseTransport):
+    """
+    Transport adding a total timeout and optional request hedging.
+
+    httpx timeouts are per operation; the total timeout bounds the whole
+    exchange, response body included (checked between body chunks, so a
+    stream stuck in one read is still bounded by the read timeout). With a
+    hedge policy, a duplicate request is sent when the first has not returned
+    its headers within the policy's delay; the first response wins and the
+    other is closed when it arrives.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport, total_s: Optional[float] = None,
+                 hedge: Optional[HedgePolicy] = None, max_workers: int = 200):
+        self.transport = transport
+        self.total_s = total_s
+        self.hedge = hedge
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-hedge") if hedge else None
+
+    def _send(self, request: httpx.Request, key: str) -> httpx.Response:
+        started = time.monotonic()
+        response = self.transport.handle_request(request)
+        self.hedge.observe(key, time.monotonic() - started)
+        return response
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        if self.hedge is None:
+            response = self.transport.handle_request(request)
+        else:
+            response = self._hedged(request)
+        if self.total_s:
+            deadline = started + self.total_s
+            response = _with_stream(response, _DeadlineStream(response.stream, deadline, request), request)
+        return response
+
+    def _hedged(self, request: httpx.Request) -> httpx.Response:
+        request.read()  # the body must be replayable for the duplicate
+        key = self.hedge.key(request)
+        delay = self.hedge.delay(key)
+        if delay is None:
+            return self._send(request, key)
+        primary = self._executor.submit(self._send, request, key)
+        if wait([primary], timeout=delay).done or not self.hedge.allow_hedge():
+            return primary.result()
+
+        metrics.inc("http_hedged_requests_total")
+        backup = self._executor.submit(self._send, request, key)
+        pending, winner = {primary, backup}, None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+        if winner is None:
+            return primary.result()  # both failed: raise the primary's error
+        for f in (primary, backup):
+            if f is not winner:  # close the slower response whenever it arrives
+                f.add_done_callback(lambda f: f.exception() is None and f.result().close())
+        metrics.inc("http_hedge_wins_total", labels={"winner": "hedge" if winner is backup else "primary"})
+        return winner.result()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self.transport.close()
+
+
+class AsyncHedgingTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of `HedgingTransport`; the losing request is cancelled."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, total_s: Optional[float] = None,
+                 hedge: Optional[HedgePolicy] = None):
+        self.transport = transport
+        self.total_s = total_s
+        self.hedge = hedge
+
+    async def _send(self, request: httpx.Request, key: str) -> httpx.Response:
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        self.hedge.observe(key, time.monotonic() - started)
+        return response
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.monotonic()
+        if self.hedge is None:
+            response = await self.transport.handle_async_request(request)
+        else:
+            response = await self._hedged(request)
+        if self.total_s:
+            deadline = started + self.total_s
+            response = _with_stream(response, _AsyncDeadlineStream(response.stream, deadline, request), request)
+        return response
+
+    async def _hedged(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        key = self.hedge.key(request)
+        delay = self.hedge.delay(key)
+        primary = asyncio.ensure_future(self._send(request, key))
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done or not self.hedge.allow_hedge():
+            return await primary
+
+        metrics.inc("http_hedged_requests_total")
+        backup = asyncio.ensure_future(self._send(request, key))
+        pending, winner = {primary, backup}, None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((t for t in done if t.exception() is None), None)
+        for task in pending:
+            task.cancel()
+        for task in (primary, backup):
+            if task is not winner and task.done() and not task.cancelled() and task.exception() is None:
+                await task.result().aclose()
+        if winner is None:
+            return await primary  # both failed: raise the primary's error
+        metrics.inc("http_hedge_wins_total", labels={"winner": "hedge" if winner is backup else "primary"})
+        return winner.result()
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class HTTPClients:
+    """The pooled HTTP clients shared by the OpenAI chat and embedding clients."""
+
+    def __init__(self, client: httpx.Client, async_client: httpx.AsyncClient, timeout: httpx.Timeout):
+        self.client = client
+        self.async_client = async_client
+        self.timeout = timeout
+
+
+def build_http_clients(cfg: Optional[Dict[str, Any]]) -> HTTPClients:
+    """
+    Builds the shared pooled HTTP clients from the `http` configuration.
+
+    Args:
+        cfg: The http configuration (max_connections, max_keepalive_connections,
+            keepalive_expiry_s, timeouts: connect_s, first_byte_s, total_s,
+            and hedging).
+
+    Returns:
+        The sync and async clients, with keep-alive pools, per-call timeouts
+        and optional hedging.
+    """
+    cfg = cfg or {}
+    limits = httpx.Limits(
+        max_connections=int(cfg.get("max_connections", 100)),
+        max_keepalive_connections=int(cfg.get("max_keepalive_connections", 20)),
+        keepalive_expiry=float(cfg.get("keepalive_expiry_s", 30)),
+    )
+    tcfg = cfg.get("timeouts", {}) or {}
+    # first_byte_s bounds every wait for data: the response headers and each streamed chunk
+    timeout = httpx.Timeout(
+        connect=float(tcfg.get("connect_s", 3)),
+        read=float(tcfg.get("first_byte_s", 30)),
+        write=float(tcfg.get("write_s", 10)),
+        pool=float(tcfg.get("pool_s", 5)),
+    )
+    total_s = float(tcfg["total_s"]) if tcfg.get("total_s") else None
+    hedge = HedgePolicy.from_config(cfg.get("hedging"))
+    http2 = bool(cfg.get("http2", False))
+
+    client = httpx.Client(
+        timeout=timeout,
+        limits=limits,
+        # Hedged requests run on worker threads: allow one per pooled connection, twice over
+        transport=HedgingTransport(httpx.HTTPTransport(limits=limits, http2=http2), total_s=total_s, hedge=hedge,
+                                   max_workers=2 * limits.max_connections),
+    )
+    async_client = httpx.AsyncClient(
+        timeout=timeout,
+        limits=limits,
+        transport=AsyncHedgingTransport(httpx.AsyncHTTPTransport(limits=limits, http2=http2),
+                                        total_s=total_s, hedge=hedge),
+    )
+    return HTTPClients(client, async_client, timeout)
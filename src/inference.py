@@ -0,0 +1,284 @@
+from __future__ import annotations
+import itertools
+import socket
+import struct
+import threading
+from array import array
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from . import metrics
+
+# Wire protocol shared by the inference sidecar (src/inference_server.py) and
+# the worker-side client. Every frame is
+#
+#     !I  length of the rest of the frame
+#     !B  op code (requests) or status (responses)
+#     !I  request id, echoed in the response
+#     ... payload
+#
+# Strings are sent as a count followed by length-prefixed UTF-8; vectors and
+# scores as raw float32 arrays in native byte order (the socket is local).
+OP_EMBED = 1
+OP_SCORE = 2
+OP_PING = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_LEN = struct.Struct("!I")
+_HEAD = struct.Struct("!BI")
+_PAIR = struct.Struct("!II")
+
+
+def encode_frame(code: int, request_id: int, payload: bytes = b"") -> bytes:
+    """
+    Builds one frame.
+
+    Args:
+        code: The op code or status.
+        request_id: The request id.
+        payload: The encoded payload.
+
+    Returns:
+        The frame bytes.
+    """
+    return _LEN.pack(_HEAD.size + len(payload)) + _HEAD.pack(code, request_id) + payload
+
+
+def decode_frame(body: bytes) -> Tuple[int, int, bytes]:
+    """
+    Splits a frame body (everything after the length prefix).
+
+    Args:
+        body: The frame body.
+
+    Returns:
+        (code, request id, payload).
+    """
+    code, request_id = _HEAD.unpack_from(body)
+    return code, request_id, body[_HEAD.size:]
+
+
+def pack_texts(texts: Sequence[str]) -> bytes:
+    parts = [_LEN.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(_LEN.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def unpack_texts(payload: bytes) -> List[str]:
+    (count,), offset = _LEN.unpack_from(payload), _LEN.size
+    texts = []
+    for _ in range(count):
+        (size,) = _LEN.unpack_from(payload, offset)
+        offset += _LEN.size
+        texts.append(payload[offset:offset + size].decode("utf-8"))
+        offset += size
+    return texts
+
+
+def pack_matrix(rows: Sequence[Sequence[float]]) -> bytes:
+    dim = len(rows[0]) if rows else 0
+    values = array("f")
+    for row in rows:
+        values.extend(float(x) for x in row)
+    return _PAIR.pack(len(rows), dim) + values.tobytes()
+
+
+def unpack_matrix(payload: bytes) -> List[List[float]]:
+    n, dim = _PAIR.unpack_from(payload)
+    values = array("f")
+    values.frombytes(payload[_PAIR.size:_PAIR.size + n * dim * values.itemsize])
+    return [values[i * dim:(i + 1) * dim].tolist() for i in range(n)]
+
+
+def pack_scores(scores: Sequence[float]) -> bytes:
+    return _LEN.pack(len(scores)) + array("f", (float(s) for s in scores)).tobytes()
+
+
+def unpack_scores(payload: bytes) -> List[float]:
+    (n,) = _LEN.unpack_from(payload)
+    values = array("f")
+    values.frombytes(payload[_LEN.size:_LEN.size + n * values.itemsize])
+    return values.tolist()
+
+
+def _recv_exactly(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Inference server closed the connection")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+class InferenceClient:
+    """
+    Thread-safe client for the inference sidecar.
+
+    One Unix socket connection per worker is shared by all threads: requests
+    are pipelined with ids and a reader thread hands each response to its
+    caller. The connection is (re)opened on demand.
+    """
+
+    def __init__(self, socket_path: str, timeout_s: float = 30.0):
+        """
+        Initializes the client. No connection is made until the first call.
+
+        Args:
+            socket_path: Path of the server's Unix domain socket.
+            timeout_s: Time to wait for one response (default 30).
+        """
+        self.socket_path = socket_path
+        self.timeout_s = timeout_s
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._ids = itertools.count(1)
+
+    def _connect(self) -> socket.socket:
+        if self._sock is not None:
+            return self._sock
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.socket_path)
+        self._sock = sock
+        threading.Thread(target=self._read_loop, args=(sock,), name="inference-client", daemon=True).start()
+        return sock
+
+    def _read_loop(self, sock: socket.socket):
+        try:
+            while True:
+                (length,) = _LEN.unpack(_recv_exactly(sock, _LEN.size))
+                status, request_id, payload = decode_frame(_recv_exactly(sock, length))
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                if status == STATUS_OK:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(f"Inference server error: {payload.decode('utf-8', 'replace')}"))
+        except (OSError, ConnectionError, struct.error) as e:
+            with self._lock:
+                if self._sock is sock:
+                    self._sock = None
+                pending, self._pending = self._pending, {}
+            for future in pending.values():
+                future.set_exception(ConnectionError(f"Lost connection to inference server: {e}"))
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _call(self, op: int, payload: bytes = b"") -> bytes:
+        future: Future = Future()
+        with self._lock:
+            request_id = next(self._ids) & 0xFFFFFFFF
+            self._pending[request_id] = future
+            try:
+                self._connect().sendall(encode_frame(op, request_id, payload))
+            except OSError as e:
+                self._pending.pop(request_id, None)
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                raise ConnectionError(f"Cannot reach inference server at {self.socket_path}: {e}") from e
+        try:
+            return future.result(timeout=self.timeout_s)
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def ping(self):
+        """Checks that the server is up."""
+        self._call(OP_PING)
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Embeds texts with the server's embedding model.
+
+        Args:
+            texts: The texts to embed.
+
+        Returns:
+            One vector per text.
+        """
+        if not texts:
+            return []
+        return unpack_matrix(self._call(OP_EMBED, pack_texts(texts)))
+
+    def score(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """
+        Scores (query, text) pairs with the server's cross-encoder.
+
+        Args:
+            pairs: The pairs to score.
+
+        Returns:
+            One relevance score per pair.
+        """
+        if not pairs:
+            return []
+        return unpack_scores(self._call(OP_SCORE, pack_texts([x for pair in pairs for x in pair])))
+
+
+class RemoteReranker:
+    """Cross-encoder reranker backed by the inference sidecar (same interface as `CrossEncoderReranker`)."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def rerank(self, question: str, docs: List[Document], top_n: int) -> List[Document]:
+        if not docs:
+            return docs
+        with metrics.timer("rag_stage_seconds", {"stage": "rerank"}):
+            scores = self.client.score([(question, d.page_content) for d in docs])
+        rescored = sorted(zip(docs, scores), key=lambda x: x[1], reverse=True)
+        return [d for d, _ in rescored[:top_n]]
+
+    def rerank_many(self, questions: List[str], docs_lists: List[List[Document]], top_n: int) -> List[List[Document]]:
+        pairs = [(q, d.page_content) for q, docs in zip(questions, docs_lists) for d in docs]
+        if not pairs:
+            return [list(docs) for docs in docs_lists]
+        with metrics.timer("rag_stage_seconds", {"stage": "rerank_batch"}):
+            scores = self.client.score(pairs)
+        out, offset = [], 0
+        for docs in docs_lists:
+            chunk_scores = scores[offset:offset + len(docs)]
+            offset += len(docs)
+            rescored = sorted(zip(docs, chunk_scores), key=lambda x: x[1], reverse=True)
+            out.append([d for d, _ in rescored[:top_n]])
+        return out
+
+
+class RemoteEmbeddings(Embeddings):
+    """Local embedding model hosted by the inference sidecar."""
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.client.embed(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.client.embed([text])[0]
+
+
+def build_client(cfg: Dict) -> InferenceClient:
+    """
+    Builds the sidecar client from the `inference_server` configuration.
+
+    Args:
+        cfg: The inference_server configuration (socket, timeout_s).
+
+    Returns:
+        The client.
+    """
+    return InferenceClient(cfg.get("socket", "/tmp/hrbot-inference.sock"), float(cfg.get("timeout_s", 30.0)))
@@ -0,0 +1,202 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.config_loader import load_config
+from utils.constants import INFERENCE_SERVER_LOG_FILENAME
+from utils.utils import create_logger
+from .embeddings import build_embeddings
+from .inference import (OP_EMBED, OP_PING, OP_SCORE, STATUS_ERROR, STATUS_OK, _LEN, decode_frame,
+                        encode_frame, pack_matrix, pack_scores, unpack_texts)
+from .reranker import CrossEncoderReranker, build_reranker
+
+logger = create_logger(INFERENCE_SERVER_LOG_FILENAME)
+
+
+class _Job:
+    __slots__ = ("items", "future")
+
+    def __init__(self, items: list, future: asyncio.Future):
+        self.items = items
+        self.future = future
+
+
+class Batcher:
+    """
+    Merges concurrent requests for one model into a single forward pass.
+
+    The first queued request opens a batch; requests arriving within
+    `max_wait_ms` join it until `max_batch` items are collected. The model
+    runs on its own thread so the event loop keeps accepting requests.
+    """
+
+    def __init__(self, name: str, fn: Callable[[list], list], max_batch: int = 64, max_wait_ms: float = 5.0):
+        """
+        Initializes the batcher.
+
+        Args:
+            name: The model name, for logging.
+            fn: Computes one result per input item, for a list of items.
+            max_batch: Maximum items per forward pass (default 64).
+            max_wait_ms: How long a batch stays open for more requests (default 5).
+        """
+        self.name = name
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"model-{name}")
+
+    async def submit(self, items: list) -> list:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put(_Job(items, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            size = len(jobs[0].items)
+            deadline = loop.time() + self.max_wait_s
+            while size < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    job = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                jobs.append(job)
+                size += len(job.items)
+
+            flat = [item for job in jobs for item in job.items]
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, flat)
+            except Exception as e:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+            logger.debug(f"{self.name}: {len(jobs)} requests, {len(flat)} items in "
+                         f"{(time.perf_counter() - started) * 1000:.1f} ms")
+            offset = 0
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_result(results[offset:offset + len(job.items)])
+                offset += len(job.items)
+
+
+class InferenceServer:
+    """Serves the cross-encoder and the local embedding model over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, reranker: Optional[CrossEncoderReranker] = None, embeddings=None,
+                 max_batch: int = 64, max_wait_ms: float = 5.0):
+        """
+        Initializes the server.
+
+        Args:
+            socket_path: Path of the Unix domain socket to listen on.
+            reranker: The cross-encoder reranker to host (optional).
+            embeddings: The local embeddings model to host (optional).
+            max_batch: Maximum items per forward pass (default 64).
+            max_wait_ms: How long a batch stays open for more requests (default 5).
+        """
+        self.socket_path = socket_path
+        self.batchers: Dict[int, Batcher] = {}
+        if reranker is not None:
+            self.batchers[OP_SCORE] = Batcher(
+                "reranker",
+                lambda pairs: [float(s) for s in reranker._predict_batched(pairs, batch_size=max_batch)],
+                max_batch, max_wait_ms,
+            )
+        if embeddings is not None:
+            self.batchers[OP_EMBED] = Batcher("embeddings", embeddings.embed_documents, max_batch, max_wait_ms)
+
+    async def _serve(self, body: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        op, request_id, payload = decode_frame(body)
+        try:
+            if op == OP_PING:
+                response = b""
+            elif op not in self.batchers:
+                raise ValueError(f"Operation {op} is not served by this inference server")
+            elif op == OP_SCORE:
+                texts = unpack_texts(payload)
+                response = pack_scores(await self.batchers[op].submit(list(zip(texts[::2], texts[1::2]))))
+            else:
+                response = pack_matrix(await self.batchers[op].submit(unpack_texts(payload)))
+            frame = encode_frame(STATUS_OK, request_id, response)
+        except Exception as e:
+            logger.error(f"Request {request_id} (op {op}) failed: {e}")
+            frame = encode_frame(STATUS_ERROR, request_id, str(e).encode("utf-8"))
+        async with write_lock:
+            writer.write(frame)
+            await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                (length,) = _LEN.unpack(await reader.readexactly(_LEN.size))
+                body = await reader.readexactly(length)
+                # Requests on one connection are served concurrently so they can share batches
+                task = asyncio.create_task(self._serve(body, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        for batcher in self.batchers.values():
+            asyncio.create_task(batcher.run())
+        server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"Inference server listening on {self.socket_path} "
+                    f"(models: {', '.join(b.name for b in self.batchers.values()) or 'none'})")
+        async with server:
+            await server.serve_forever()
+
+
+def run(socket_path: Optional[str] = None):
+    """
+    Loads the local models from app.yaml and serves them until interrupted.
+
+    Hosts the reranker when reranker.type is cross_encoder and the embeddings
+    when embedding.provider is huggingface.
+
+    Args:
+        socket_path: Overrides inference_server.socket (optional).
+    """
+    app_cfg: Dict[str, Any] = load_config()["app"]
+    cfg = app_cfg.get("inference_server", {}) or {}
+    socket_path = socket_path or cfg.get("socket", "/tmp/hrbot-inference.sock")
+
+    reranker_cfg = app_cfg.get("reranker", {}) or {}
+    reranker = build_reranker(reranker_cfg) if (reranker_cfg.get("type") or "").lower() == "cross_encoder" else None
+    emb_cfg = app_cfg["embedding"]
+    embeddings = build_embeddings(emb_cfg) if emb_cfg.get("provider", "").lower() == "huggingface" else None
+
+    server = InferenceServer(
+        socket_path,
+        reranker=reranker,
+        embeddings=embeddings,
+        max_batch=int(cfg.get("max_batch", 64)),
+        max_wait_ms=float(cfg.get("max_wait_ms", 5.0)),
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -1,4 +1,5 @@
 from __future__ import annotations
+import time
 from typing import List
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
@@ -6,26 +7,47 @@ from utils.config_loader import load_config
 from .embeddings import build_embeddings
 from .vectorstore import connect_milvus, get_vectorstore, create_or_update
 from .loaders import walk_docs
+from .chunking import chunk_sections, token_counter
+from .cleaning import dedupe_chunks, strip_boilerplate
+from .quantization import RescoringStore, truncate
+from .router import label_chunk_route
+
+def uses_layout(ccfg: dict) -> bool:
+    """
+    Whether the chunking strategy needs the layout from `walk_docs(..., layout=True)`.
+    """
+    return ccfg.get("strategy", "recursive") == "sections"
 
 def chunk(docs: List[Document], ccfg: dict) -> List[Document]:
     """
-    Splits documents into chunks using recursive character splitting.
+    Splits documents into chunks.
+
+    The "sections" strategy splits on detected section headings into
+    token-sized chunks (`chunking.chunk_sections`); "recursive" (the default)
+    uses recursive character splitting.
 
     Args:
         docs: The list of documents to chunk.
-        ccfg: The chunking configuration (chunk_size, chunk_overlap).
+        ccfg: The chunking configuration (strategy, chunk_size, chunk_overlap,
+            chunk_tokens, overlap_tokens, route_min_keyword_hits).
 
     Returns:
-        The list of chunked documents with added metadata.
+        The list of chunked documents with added metadata (chunk_id and the
+        route the chunk serves, used to filter retrieval by route).
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=ccfg.get("chunk_size", 700),
-        chunk_overlap=ccfg.get("chunk_overlap", 100),
-        separators=["\n\n", "\n", " ", ""]
-    )
-    chunks = splitter.split_documents(docs)
+    if uses_layout(ccfg):
+        chunks = chunk_sections(docs, ccfg)
+    else:
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=ccfg.get("chunk_size", 700),
+            chunk_overlap=ccfg.get("chunk_overlap", 100),
+            separators=["\n\n", "\n", " ", ""]
+        )
+        chunks = splitter.split_documents(docs)
+    min_hits = int(ccfg.get("route_min_keyword_hits", 2))
     for i, d in enumerate(chunks):
         d.metadata["chunk_id"] = i
+        d.metadata["route"] = label_chunk_route(d.page_content, min_hits)
     return chunks
 
 def run_ingest():
@@ -33,27 +55,57 @@ def run_ingest():
     Ingests documents into the vector store.
 
     Loads configuration, processes documents from the handbook directory,
-    chunks them, builds embeddings, connects to Milvus, and upserts chunks.
+    strips page boilerplate, chunks them, merges near-duplicate chunks,
+    builds embeddings, connects to Milvus, and upserts chunks.
     """
     cfg = load_config()
     app, prompts = cfg["app"], cfg["prompts"]
 
     # Load files (PDF/DOCX, easy to extend)
     base_dir = app["data"]["handbook_dir"]
-    raw_docs = walk_docs(base_dir)
+    raw_docs = walk_docs(base_dir, layout=uses_layout(app["chunking"]))
     if not raw_docs:
         print("No documents found in", base_dir); return
 
-    # Chunk
+    # Clean + chunk
+    started = time.perf_counter()
+    cleaning = app.get("cleaning", {}) or {}
+    count = token_counter(app["chunking"].get("encoding", "cl100k_base"))
+    boilerplate_cfg = cleaning.get("boilerplate", {}) or {}
+    if boilerplate_cfg.get("enabled", False):
+        raw_docs, stripped = strip_boilerplate(raw_docs, boilerplate_cfg, count)
+        print(f"Stripped {stripped['lines']} repeated header/footer lines (~{stripped['tokens']} tokens)")
     pieces = chunk(raw_docs, app["chunking"])
+    duplicates_cfg = cleaning.get("near_duplicates", {}) or {}
+    if duplicates_cfg.get("enabled", False):
+        before = len(pieces)
+        pieces, dropped = dedupe_chunks(pieces, duplicates_cfg, count)
+        tokens = sum(count(p.page_content) for p in pieces)
+        print(f"Merged {dropped['chunks']} near-duplicate chunks of {before} "
+              f"({dropped['tokens']} of {tokens + dropped['tokens']} embedding tokens saved)")
+    print(f"Split {len(raw_docs)} pages into {len(pieces)} chunks in {time.perf_counter() - started:.2f}s "
+          f"({app['chunking'].get('strategy', 'recursive')})")
+    onboarding = sum(1 for p in pieces if p.metadata["route"] == "onboarding")
+    print(f"Tagged {onboarding} onboarding and {len(pieces) - onboarding} hr_policy chunks")
 
     # Embeddings + Milvus
     emb = build_embeddings(app["embedding"])
+    compression = app["embedding"].get("compression", {}) or {}
     connect_milvus(app["milvus"])
-    vs = get_vectorstore(emb, app["milvus"])
+    vs = get_vectorstore(emb, app["milvus"], compression)
 
     # Upsert
-    create_or_update(vs, pieces)
+    if compression.get("enabled"):
+        # Embed once: truncated vectors go to Milvus, full ones to the rescoring store
+        full = emb.embed_documents([p.page_content for p in pieces])
+        if compression.get("rescore", True):
+            store = RescoringStore.build(pieces, full, compression.get("store_dtype", "float16"))
+            store.save(compression.get("store_path", "data/vectors/full_precision"))
+            print(f"Wrote {store.nbytes / 1e6:.1f} MB of full-precision vectors for rescoring")
+        dims = int(compression["dimensions"])
+        create_or_update(vs, pieces, vectors=[truncate(v, dims) for v in full])
+    else:
+        create_or_update(vs, pieces)
     print(f"Ingested {len(pieces)} chunks into Milvus collection '{app['milvus']['collection']}'")
 
 
@@ -1,9 +1,11 @@
 from __future__ import annotations
 import os
+import threading
+import time
 from typing import Optional, Dict, Any, Iterable
-from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
+from . import metrics
 
 
 # Pydantic model for robust JSON parsing of router output
@@ -16,7 +18,7 @@ class Route(BaseModel):
 class OpenAIClient:
     """A wrapper around LangChain's ChatOpenAI to fit the application's existing interface."""
 
-    def __init__(self, model: str, temperature: float = 0.0, max_output_tokens: int = 2048):
+    def __init__(self, model: str, temperature: float = 0.0, max_output_tokens: int = 2048, http=None):
         """
         Initializes the OpenAI client wrapper.
 
@@ -24,6 +26,8 @@ class OpenAIClient:
             model: The OpenAI model name.
             temperature: The sampling temperature (default 0.0).
             max_output_tokens: The maximum output tokens (default 2048).
+            http: Shared pooled HTTP clients and timeouts (`http_client.HTTPClients`,
+                optional; the SDK defaults are used when omitted).
 
         Raises:
             RuntimeError: If OPENAI_API_KEY is not set.
@@ -31,20 +35,30 @@ class OpenAIClient:
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is not set in the environment.")
+        from langchain_openai import ChatOpenAI
+        transport = {}
+        if http is not None:
+            transport = {"http_client": http.client, "http_async_client": http.async_client, "timeout": http.timeout}
         self.llm = ChatOpenAI(
             model=model,
             temperature=temperature,
             max_tokens=max_output_tokens,
-            api_key=api_key
+            api_key=api_key,
+            **transport,
         )
 
-    def complete(self, prompt: str, system: Optional[str] = None) -> str:
+    def _model(self, max_tokens: Optional[int]):
+        # A per-call cap below the configured max_output_tokens (e.g. under load)
+        return self.llm.bind(max_tokens=max_tokens) if max_tokens else self.llm
+
+    def complete(self, prompt: str, system: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
         """
         Generates a text completion using the LLM.
 
         Args:
             prompt: The user prompt.
             system: Optional system prompt.
+            max_tokens: Optional output token limit for this call.
 
         Returns:
             The generated response content.
@@ -53,16 +67,27 @@ class OpenAIClient:
         if system:
             messages.append(("system", system))
         messages.append(("human", prompt))
-        response = self.llm.invoke(messages)
+        try:
+            with metrics.timer("llm_request_seconds", {"op": "complete"}):
+                response = self._model(max_tokens).invoke(messages)
+        except Exception:
+            metrics.inc("llm_errors_total", labels={"op": "complete"})
+            raise
         return response.content.strip()
 
-    def stream(self, prompt: str, system: Optional[str] = None) -> Iterable[str]:
+    def stream(self, prompt: str, system: Optional[str] = None,
+               cancel_event: Optional[threading.Event] = None, max_tokens: Optional[int] = None) -> Iterable[str]:
         """
         Streams the LLM response chunk by chunk.
 
+        The upstream stream is closed as soon as `cancel_event` is set or the
+        consumer closes this generator, so no further tokens are generated.
+
         Args:
             prompt: The user prompt.
             system: Optional system prompt.
+            cancel_event: Optional event that stops the stream when set.
+            max_tokens: Optional output token limit for this call.
 
         Yields:
             Content chunks from the LLM stream.
@@ -72,8 +97,30 @@ class OpenAIClient:
             messages.append(("system", system))
         messages.append(("human", prompt))
 
-        for chunk in self.llm.stream(messages):
-            yield chunk.content
+        started = time.perf_counter()
+        first_token_at = None
+        chunks = 0
+        upstream = self._model(max_tokens).stream(messages)
+        try:
+            for chunk in upstream:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    metrics.observe("llm_time_to_first_token_seconds", first_token_at - started)
+                chunks += 1
+                yield chunk.content
+        except Exception:
+            metrics.inc("llm_errors_total", labels={"op": "stream"})
+            raise
+        finally:
+            upstream.close()
+            ended = time.perf_counter()
+            metrics.observe("llm_request_seconds", ended - started, {"op": "stream"})
+            metrics.inc("llm_output_chunks_total", chunks)
+            if first_token_at is not None and chunks > 1 and ended > first_token_at:
+                metrics.observe("llm_tokens_per_second", (chunks - 1) / (ended - first_token_at),
+                                buckets=metrics.RATE_BUCKETS)
 
     def complete_json(self, prompt: str, system: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -95,13 +142,18 @@ class OpenAIClient:
             messages.append(("system", system))
         messages.append(("human", prompt_with_format_instructions))
 
-        chain = self.llm | parser
+        try:
+            with metrics.timer("llm_request_seconds", {"op": "json"}):
+                raw_text = self.llm.invoke(messages).content
+        except Exception:
+            metrics.inc("llm_errors_total", labels={"op": "json"})
+            raise
 
+        # Parse the reply we already have instead of asking again for the raw text
         try:
-            result = chain.invoke(messages)
-            return result
+            return parser.parse(raw_text)
         except Exception as e:
-            raw_text = self.llm.invoke(messages).content
+            metrics.inc("llm_errors_total", labels={"op": "json"})
             return {
                 "route": "hr_policy",
                 "confidence": 0.0,
@@ -110,12 +162,13 @@ class OpenAIClient:
             }
 
 
-def build_llm(cfg: Dict[str, Any]):
+def build_llm(cfg: Dict[str, Any], http=None):
     """
     Builds an LLM client based on the configuration.
 
     Args:
         cfg: The LLM configuration dictionary.
+        http: Shared pooled HTTP clients (optional, see `http_client.build_http_clients`).
 
     Returns:
         The LLM client instance.
@@ -130,6 +183,11 @@ def build_llm(cfg: Dict[str, Any]):
             model=cfg["model"],
             temperature=cfg.get("temperature", 0.0),
             max_output_tokens=cfg.get("max_output_tokens", 2048),
+            http=http,
         )
+    elif provider == "fake":
+        # Local stand-in for load tests (see config/loadtest.yaml)
+        from .fakes import FakeLLMClient
+        return FakeLLMClient.from_config(cfg)
     else:
         raise ValueError(f"Unsupported LLM provider specified in config: '{provider}'")
\ No newline at end of file
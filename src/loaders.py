@@ -3,13 +3,16 @@ import os, fitz
 from typing import List
 from langchain_core.documents import Document
 from docx import Document as DocxDocument
+from .chunking import pdf_page_lines
 
-def load_pdf_with_pages(path: str) -> List[Document]:
+def load_pdf_with_pages(path: str, layout: bool = False) -> List[Document]:
     """
     Loads a PDF file and creates documents for each page with metadata.
 
     Args:
         path: The path to the PDF file.
+        layout: Also attach the page's lines with their font information
+            as metadata["lines"] (see `chunking.pdf_page_lines`).
 
     Returns:
         A list of documents, one per page with content.
@@ -24,6 +27,8 @@ def load_pdf_with_pages(path: str) -> List[Document]:
                 "path": path,
                 "page": page_num + 1  # Add page number to metadata
             }
+            if layout:
+                meta["lines"] = pdf_page_lines(page)
             documents.append(Document(page_content=text, metadata=meta))
     return documents
 
@@ -40,12 +45,31 @@ def load_docx(path: str) -> str:
     d = DocxDocument(path)
     return "\n".join([p.text for p in d.paragraphs])
 
-def walk_docs(root: str) -> List[Document]:
+def load_docx_lines(path: str) -> List[dict]:
+    """
+    Loads the paragraphs of a DOCX file as line records, marking heading styles.
+
+    Args:
+        path: The path to the DOCX file.
+
+    Returns:
+        One record (text, block, heading) per non-empty paragraph.
+    """
+    d = DocxDocument(path)
+    return [
+        {"text": p.text.strip(), "block": i,
+         "heading": (p.style.name or "").startswith(("Heading", "Title")) if p.style is not None else False}
+        for i, p in enumerate(d.paragraphs) if p.text.strip()
+    ]
+
+def walk_docs(root: str, layout: bool = False) -> List[Document]:
     """
     Walks a directory and loads supported documents (PDF, DOCX).
 
     Args:
         root: The root directory to walk.
+        layout: Attach line and font information for structure-aware
+            chunking (`chunking.chunk_sections`).
 
     Returns:
         A list of loaded documents.
@@ -56,11 +80,13 @@ def walk_docs(root: str) -> List[Document]:
             p = os.path.join(dirpath, fn)
             ext = os.path.splitext(fn)[1].lower()
             if ext == ".pdf":
-                docs.extend(load_pdf_with_pages(p))
+                docs.extend(load_pdf_with_pages(p, layout=layout))
             elif ext in (".docx",):
                 text = load_docx(p)
                 if text.strip():
                     meta = {"source": "handbook", "path": p}
+                    if layout:
+                        meta["lines"] = load_docx_lines(p)
                     docs.append(Document(page_content=text, metadata=meta))
             else:
                 continue
@@ -1,43 +1,376 @@
 # src/main.py
 from __future__ import annotations
-from utils.config_loader import load_config
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple
+from utils.config_loader import config_paths, load_config
+from utils.constants import MAX_THREAD_WORKERS, MAIN_APP_LOG_FILENAME
+from utils.utils import configure_logging, create_logger
 from .embeddings import build_embeddings
-from .vectorstore import connect_milvus, get_vectorstore, make_retriever
+from .vectorstore import connect_milvus, get_vectorstore, route_expr, search_by_vector, search_by_vectors
 from .llm import build_llm
-from .router import choose_route
-from .rag import answer_with_chain, prepare_rag_prompt
+from .router import decide_route, parse_route_tag, rule_based_route, split_route_tag
+from .rag import answer_with_chain, describe_sources, prepare_rag_prompt
 from .reranker import build_reranker
+from .streaming import ThreadedStream
+from .coalesce import SingleFlight, StreamFlights, coalesce_key
+from .scheduler import ScheduledLLMClient, build_scheduler, set_identity
+from .inference import build_client as build_inference_client
+from .http_client import build_http_clients
+from .degradation import LATENCY_EWMA, TTFT_EWMA, DegradationController
+from .reload import RESTART_SECTIONS, ConfigError, ConfigWatcher, changed_sections, validate_config
+from .quantization import build_rescorer, truncate
+from . import metrics
 from langchain.memory import ConversationBufferWindowMemory
+from langchain_core.documents import Document
+
+logger = create_logger(MAIN_APP_LOG_FILENAME)
+
+
+class _Runtime(NamedTuple):
+    """
+    The reloadable configuration and the components built from it.
+
+    Instances are immutable. `reload_config` builds a new one and swaps the
+    single `_RUNTIME` reference; each request reads that reference once and
+    passes the snapshot along, so a reload never mixes old and new settings
+    within one request.
+    """
+    app: Dict[str, Any]
+    prompts: Dict[str, Any]
+    llm: Any
+    llm_tiers: Dict[str, Any]
+    reranker: Any
+    scheduler: Any
+    degradation: DegradationController | None
+    once_flights: SingleFlight
+    stream_flights: StreamFlights
+
 
 # --- Globals for pre-loaded models and configs ---
-_APP_CONFIG = None
-_PROMPTS_CONFIG = None
-_LLM_CLIENT = None
+_RUNTIME: _Runtime | None = None
 _EMBEDDINGS = None
 _VECTOR_STORE = None
-_RERANKER = None
+_RESCORER = None
+_INDEX_DIMENSIONS = None
 _MEMORIES = {}
+_HTTP = None
+_REMOTE = None
+_RELOAD_LOCK = threading.Lock()
+_WATCHER = None
+_READY = False
+_WARMUP_ERROR = None
+
+def _timed(timings: Dict[str, float], name: str, fn, *args, **kwargs):
+    """
+    Runs one initialization step and records its wall time under `name`.
+    """
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        timings[name] = time.perf_counter() - started
+
 
 def initialize_models():
     """
     Initializes and loads all models, configurations, and components at startup.
+
+    Independent components are built concurrently: the LLM client, the
+    embeddings model, the Milvus connection and the reranker start together,
+    and the vector store is created as soon as the embeddings and connection
+    are ready. The time spent per component is logged.
     """
-    global _APP_CONFIG, _PROMPTS_CONFIG, _LLM_CLIENT, _EMBEDDINGS, _VECTOR_STORE, _RERANKER
+    global _RUNTIME, _EMBEDDINGS, _VECTOR_STORE, _RESCORER, _INDEX_DIMENSIONS, _HTTP, _REMOTE, _WATCHER
 
     print("--- Initializing Models and Configuration ---")
+    _set_ready(False)
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    cfg = _timed(timings, "config", load_config)
+    validate_config(cfg["app"], cfg["prompts"])
+    app_cfg = cfg["app"]
+
+    scheduler = build_scheduler(app_cfg.get("scheduler"))
+    degradation = DegradationController.from_config(app_cfg.get("degradation"))
+
+    inference_cfg = app_cfg.get("inference_server", {}) or {}
+    remote = _REMOTE = build_inference_client(inference_cfg) if inference_cfg.get("enabled", False) else None
+
+    # One pooled HTTP client (keep-alive, timeouts, hedging) shared by the LLM and embeddings
+    http = _HTTP = build_http_clients(app_cfg.get("http"))
+
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="init") as pool:
+        llm_future = pool.submit(_timed, timings, "llm", _build_llm_client, app_cfg, scheduler)
+        tiers_future = pool.submit(_timed, timings, "llm_tiers", _build_llm_tiers, app_cfg, scheduler)
+        emb_future = pool.submit(_timed, timings, "embeddings", build_embeddings, app_cfg["embedding"], remote, http)
+        conn_future = pool.submit(_timed, timings, "milvus_connect", connect_milvus, app_cfg["milvus"])
+        # Only the LLM reranker waits for the LLM client; the cross-encoder loads right away
+        reranker_cfg = app_cfg.get("reranker", {}) or {}
+        needs_llm = (reranker_cfg.get("type") or "").lower() == "llm"
+        reranker_future = pool.submit(
+            _timed, timings, "reranker",
+            lambda: build_reranker(reranker_cfg, llm=llm_future.result() if needs_llm else None, remote=remote),
+        )
 
-    cfg = load_config()
-    _APP_CONFIG = cfg["app"]
-    _PROMPTS_CONFIG = cfg["prompts"]
+        conn_future.result()
+        compression = app_cfg["embedding"].get("compression", {}) or {}
+        vs_future = pool.submit(_timed, timings, "vectorstore", get_vectorstore,
+                                emb_future.result(), app_cfg["milvus"], compression)
+        rescorer_future = pool.submit(_timed, timings, "rescoring_store", build_rescorer, compression)
 
-    llm_cfg = _APP_CONFIG["llm"]
-    _LLM_CLIENT = build_llm(llm_cfg)
-    _EMBEDDINGS = build_embeddings(_APP_CONFIG["embedding"])
-    connect_milvus(_APP_CONFIG["milvus"])
-    _VECTOR_STORE = get_vectorstore(_EMBEDDINGS, _APP_CONFIG["milvus"])
-    _RERANKER = build_reranker(_APP_CONFIG.get("reranker", {}), llm=_LLM_CLIENT)
+        llm_client = llm_future.result()
+        _EMBEDDINGS = emb_future.result()
+        _VECTOR_STORE = vs_future.result()
+        reranker = reranker_future.result()
+        _RESCORER = rescorer_future.result()
+        tiers = tiers_future.result()
 
-    print("--- Models and Configuration Initialized Successfully ---")
+    _INDEX_DIMENSIONS = int(compression["dimensions"]) if compression.get("enabled") else None
+    if compression.get("enabled") and compression.get("rescore", True) and _RESCORER is None:
+        logger.warning("Vector compression is enabled but no rescoring store was found; run the ingest first.")
+
+    window_s = float((app_cfg.get("coalescing", {}) or {}).get("window_ms", 0)) / 1000.0
+    _RUNTIME = _Runtime(
+        app=app_cfg, prompts=cfg["prompts"], llm=llm_client, llm_tiers=tiers, reranker=reranker,
+        scheduler=scheduler, degradation=degradation,
+        once_flights=SingleFlight(window_s, name="once"), stream_flights=StreamFlights(window_s, name="stream"),
+    )
+
+    total = time.perf_counter() - started
+    for name, seconds in timings.items():
+        metrics.set_gauge("startup_seconds", seconds, {"component": name})
+    metrics.set_gauge("startup_seconds", total, {"component": "total"})
+    breakdown = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in sorted(timings.items(), key=lambda x: -x[1]))
+    logger.info(f"Models initialized in {total:.2f}s ({breakdown})")
+
+    print(f"--- Models and Configuration Initialized Successfully in {total:.2f}s ---")
+
+    reload_cfg = app_cfg.get("reload", {}) or {}
+    if reload_cfg.get("watch", False) and _WATCHER is None:
+        _WATCHER = ConfigWatcher(config_paths(), lambda: reload_config(source="watch"),
+                                 interval_s=float(reload_cfg.get("poll_s", 2))).start()
+
+    warmup_cfg = app_cfg.get("warmup", {}) or {}
+    if warmup_cfg.get("background", True):
+        # Serve /health/live while warming up; /health/ready flips when done
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+    else:
+        warm_up()
+
+
+def _build_llm_client(app_cfg: Dict[str, Any], scheduler, overrides: Dict[str, Any] | None = None):
+    client = build_llm({**app_cfg["llm"], **(overrides or {})}, http=_HTTP)
+    return ScheduledLLMClient(client, scheduler) if scheduler else client
+
+
+def _build_llm_tiers(app_cfg: Dict[str, Any], scheduler) -> Dict[str, Any]:
+    # Cheaper models used under load or for short questions (see `degradation`)
+    return {name: _build_llm_client(app_cfg, scheduler, overrides)
+            for name, overrides in (app_cfg.get("llm_tiers") or {}).items()}
+
+
+def reload_config(source: str = "api") -> Dict[str, Any]:
+    """
+    Reloads app.yaml and prompts.yaml without restarting the worker.
+
+    The new configuration is validated and only the components whose
+    sections changed are rebuilt (the LLM clients, model tiers, reranker,
+    scheduler, degradation controller and coalescing). They are built next to
+    the running ones and published as one new runtime snapshot. Requests
+    already in progress keep the snapshot they started with, so each request
+    sees either the old or the new configuration, never a mix; the old
+    components are left to finish and are never closed. Logging settings are
+    applied in place. Conversation memories, websockets and the vector store
+    are kept. Sections listed in `reload.RESTART_SECTIONS` cannot change this
+    way.
+
+    Args:
+        source: What triggered the reload, for logs and metrics (default "api").
+
+    Returns:
+        A report with the changed sections, whether the prompts changed, the
+        rebuilt components and the time taken.
+
+    Raises:
+        ConfigError: If the new configuration is invalid or cannot be built;
+            the running configuration is left untouched.
+    """
+    global _RUNTIME
+
+    with _RELOAD_LOCK:
+        started = time.perf_counter()
+        current = _runtime()
+        try:
+            try:
+                cfg = load_config()
+            except Exception as e:
+                raise ConfigError(f"Cannot read the configuration: {e}") from e
+            app, prompts = cfg["app"], cfg["prompts"]
+            validate_config(app, prompts)
+
+            changed = changed_sections(current.app, app)
+            restart = [name for name in changed if name in RESTART_SECTIONS]
+            if restart:
+                raise ConfigError(f"Changes to {', '.join(restart)} need a restart")
+            report = {"changed": changed, "prompts_changed": prompts != current.prompts, "rebuilt": []}
+            if not changed and not report["prompts_changed"]:
+                metrics.inc("config_reloads_total", labels={"result": "unchanged", "source": source})
+                return {**report, "seconds": time.perf_counter() - started}
+
+            # --- Build the changed components next to the running ones ---
+            rebuilt = report["rebuilt"]
+            scheduler, llm_client, tiers = current.scheduler, current.llm, current.llm_tiers
+            reranker, degradation = current.reranker, current.degradation
+            once_flights, stream_flights = current.once_flights, current.stream_flights
+            try:
+                if "scheduler" in changed:
+                    scheduler = build_scheduler(app.get("scheduler"))
+                    rebuilt.append("scheduler")
+                if {"llm", "scheduler"} & set(changed):
+                    llm_client = _build_llm_client(app, scheduler)
+                    rebuilt.append("llm")
+                if {"llm", "llm_tiers", "scheduler"} & set(changed):
+                    tiers = _build_llm_tiers(app, scheduler)
+                    rebuilt.append("llm_tiers")
+                reranker_cfg = app.get("reranker", {}) or {}
+                needs_llm = (reranker_cfg.get("type") or "").lower() == "llm"
+                if "reranker" in changed or (needs_llm and "llm" in rebuilt):
+                    reranker = build_reranker(reranker_cfg, llm=llm_client if needs_llm else None, remote=_REMOTE)
+                    rebuilt.append("reranker")
+                if "degradation" in changed:
+                    degradation = DegradationController.from_config(app.get("degradation"))
+                    rebuilt.append("degradation")
+                if "coalescing" in changed:
+                    window_s = float((app.get("coalescing", {}) or {}).get("window_ms", 0)) / 1000.0
+                    once_flights = SingleFlight(window_s, name="once")
+                    stream_flights = StreamFlights(window_s, name="stream")
+                    rebuilt.append("coalescing")
+            except Exception as e:
+                raise ConfigError(f"Cannot build the new components: {type(e).__name__}: {e}") from e
+        except ConfigError as e:
+            metrics.inc("config_reloads_total", labels={"result": "rejected", "source": source})
+            logger.error(f"Configuration reload ({source}) rejected, keeping the running configuration: {e}")
+            raise
+
+        # --- Swap: requests starting from here on use the new snapshot ---
+        _RUNTIME = _Runtime(
+            app=app, prompts=prompts, llm=llm_client, llm_tiers=tiers, reranker=reranker, scheduler=scheduler,
+            degradation=degradation, once_flights=once_flights, stream_flights=stream_flights,
+        )
+
+        if "logging" in changed:
+            # Levels, format and sampling change in place (validated above); see `configure_logging`
+            configure_logging(app.get("logging"))
+            rebuilt.append("logging")
+
+        mem_cfg = app.get("memory", {}) or {}
+        if "memory" in changed and mem_cfg.get("type") == "conversation_buffer_window":
+            for memory in list(_MEMORIES.values()):
+                memory.k = mem_cfg.get("k", 5)
+
+        report["seconds"] = time.perf_counter() - started
+        metrics.inc("config_reloads_total", labels={"result": "applied", "source": source})
+        logger.info(f"Configuration reloaded ({source}) in {report['seconds']:.2f}s: "
+                    f"changed={changed}, prompts_changed={report['prompts_changed']}, rebuilt={rebuilt}")
+        return report
+
+
+def _set_ready(ready: bool, error: str | None = None):
+    global _READY, _WARMUP_ERROR
+    _READY = ready
+    _WARMUP_ERROR = error
+    metrics.set_gauge("ready", 1 if ready else 0)
+
+
+def warm_up() -> bool:
+    """
+    Exercises every component once so the first real request is not slow.
+
+    Runs one embedding, one vector search, one rerank pass and, if enabled, a
+    tiny LLM call (loading the collection, the cross-encoder and opening the
+    TLS connections). The worker is marked ready only when this succeeds; it
+    is retried `warmup.attempts` times.
+
+    Returns:
+        True if the worker is ready.
+    """
+    rt = _runtime()
+    cfg = rt.app.get("warmup", {}) or {}
+    if not cfg.get("enabled", True):
+        _set_ready(True)
+        return True
+
+    question = cfg.get("question", "What is the leave policy?")
+    attempts = max(int(cfg.get("attempts", 3)), 1)
+    error = None
+    for attempt in range(1, attempts + 1):
+        started = time.perf_counter()
+        try:
+            docs = []
+            if cfg.get("embed", True):
+                vector = _EMBEDDINGS.embed_query(question)
+                if cfg.get("search", True):
+                    docs = search_by_vector(_VECTOR_STORE, _index_vector(vector), {**rt.app["retriever"], "k": 1})
+            if cfg.get("rerank", True) and rt.reranker:
+                docs = docs or [Document(page_content="Employees accrue paid leave every month.")]
+                rt.reranker.rerank(question, docs, top_n=1)
+            if cfg.get("llm", False):
+                rt.llm.complete("Reply with OK.")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.warning(f"Warm-up attempt {attempt}/{attempts} failed: {error}")
+            if attempt < attempts:
+                time.sleep(float(cfg.get("retry_delay_s", 2.0)))
+            continue
+        elapsed = time.perf_counter() - started
+        metrics.set_gauge("warmup_seconds", elapsed)
+        logger.info(f"Warm-up finished in {elapsed:.2f}s; worker is ready.")
+        _set_ready(True)
+        return True
+
+    logger.error(f"Warm-up failed after {attempts} attempts; worker stays not ready: {error}")
+    _set_ready(False, error)
+    return False
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Reports whether this worker has finished initialization and warm-up.
+
+    Returns:
+        A dictionary with 'ready' and, after a failed warm-up, 'error'.
+    """
+    status: Dict[str, Any] = {"ready": _READY}
+    if _WARMUP_ERROR:
+        status["error"] = _WARMUP_ERROR
+    return status
+
+
+def _runtime() -> _Runtime:
+    """
+    Returns the current runtime snapshot; requests call this once and pass it on.
+
+    Raises:
+        RuntimeError: If the models have not been initialized.
+    """
+    if _RUNTIME is None:
+        raise RuntimeError("Application configuration has not been initialized.")
+    return _RUNTIME
+
+def get_app_config():
+    """
+    Retrieves the application configuration.
+
+    Returns:
+        The application configuration dictionary.
+
+    Raises:
+        RuntimeError: If configuration is not initialized.
+    """
+    return _runtime().app
 
 def get_prompts_config():
     """
@@ -49,21 +382,22 @@ def get_prompts_config():
     Raises:
         RuntimeError: If configuration is not initialized.
     """
-    if _PROMPTS_CONFIG is None:
+    if _RUNTIME is None:
         raise RuntimeError("Prompts configuration has not been initialized.")
-    return _PROMPTS_CONFIG
+    return _RUNTIME.prompts
 
-def get_memory(user_id: str = "default"):
+def get_memory(user_id: str = "default", rt: _Runtime | None = None):
     """
     Retrieves or creates conversation memory for a user.
 
     Args:
         user_id: The user identifier (default "default").
+        rt: The request's runtime snapshot (optional; the current one).
 
     Returns:
         The memory instance or None if not configured.
     """
-    mem_cfg = _APP_CONFIG.get("memory", {})
+    mem_cfg = (rt or _runtime()).app.get("memory", {})
     if mem_cfg.get("type") == "conversation_buffer_window":
         if user_id not in _MEMORIES:
             _MEMORIES[user_id] = ConversationBufferWindowMemory(
@@ -74,91 +408,639 @@ def get_memory(user_id: str = "default"):
     return None
 
 
-def chat_stream(question: str, role: str | None = None, user_id: str = "default"):
+def remember_exchange(user_id: str, question: str, answer: str):
+    """
+    Appends a question/answer pair to the user's conversation memory.
+
+    Args:
+        user_id: The user identifier.
+        question: The user's question.
+        answer: The generated answer.
+    """
+    memory = get_memory(user_id)
+    if memory:
+        memory.chat_memory.add_user_message(question)
+        memory.chat_memory.add_ai_message(answer)
+
+
+def admit_request(user_id: str, role: str, cost: int = 1, rt: _Runtime | None = None):
+    """
+    Tags the current thread's LLM calls with the user and applies their rate limit.
+
+    Args:
+        user_id: The user identifier.
+        role: The user's role.
+        cost: Number of questions being asked (default 1).
+        rt: The request's runtime snapshot (optional; the current one).
+
+    Raises:
+        SchedulerBusy: If the user is over their rate limit for too long.
+    """
+    set_identity(user_id, role)
+    scheduler = (rt or _runtime()).scheduler
+    if scheduler:
+        scheduler.admit(user_id, role, cost)
+
+
+def _coalescable(rt: _Runtime, user_id: str) -> bool:
+    """
+    Checks whether a request may share its execution with identical requests.
+
+    Only requests without conversation history qualify, since history is part
+    of the prompt and would make answers user-specific.
+
+    Args:
+        rt: The request's runtime snapshot.
+        user_id: The user identifier.
+
+    Returns:
+        True if coalescing is enabled and the user has no history.
+    """
+    if not (rt.app.get("coalescing", {}) or {}).get("enabled", False):
+        return False
+    memory = get_memory(user_id, rt)
+    return not memory or not memory.chat_memory.messages
+
+
+def _index_vector(vector: List[float]) -> List[float]:
+    """
+    Converts a full-precision query embedding to the form stored in the index.
+
+    Args:
+        vector: The full query embedding.
+
+    Returns:
+        The Matryoshka-truncated vector when compression is enabled, else `vector`.
+    """
+    return truncate(vector, _INDEX_DIMENSIONS) if _INDEX_DIMENSIONS else vector
+
+
+def _first_pass_k(rt: _Runtime, k: int) -> int:
+    """
+    Number of candidates to fetch from the (compressed) index for `k` results.
+    """
+    if _RESCORER is None:
+        return k
+    oversample = float((rt.app["embedding"].get("compression") or {}).get("oversample", 4))
+    return max(k, int(round(k * oversample)))
+
+
+def _rescore(vector: List[float], docs: list, k: int) -> list:
+    """
+    Re-ranks first-pass candidates with full-precision vectors, if enabled.
+    """
+    if _RESCORER is None:
+        return docs[:k]
+    with metrics.timer("rag_stage_seconds", {"stage": "rescore"}):
+        return _RESCORER.rescore(vector, docs, k)
+
+
+def _route_filter_expr(rt: _Runtime, decision: Dict[str, Any] | None) -> str | None:
+    """
+    Filter expression restricting the search to the chunks of the routed topic.
+
+    Args:
+        rt: The request's runtime snapshot.
+        decision: The routing decision (route, confidence), or None.
+
+    Returns:
+        The expression, or None to search the whole collection (filtering
+        disabled, no decision, or confidence below `route_filter.min_confidence`).
+    """
+    cfg = rt.app["retriever"].get("route_filter", {}) or {}
+    if not cfg.get("enabled", False) or decision is None:
+        return None
+    if decision["confidence"] < float(cfg.get("min_confidence", 0.7)):
+        metrics.inc("route_filter_total", labels={"result": "low_confidence"})
+        return None
+    return route_expr(rt.app["retriever"].get("expr", ""), decision["route"], cfg.get("field", "route"))
+
+
+def _enough_filtered(rt: _Runtime, docs: list, k: int) -> bool:
+    """
+    Whether a route-filtered search found enough chunks to skip the full search.
+    """
+    min_results = int((rt.app["retriever"].get("route_filter", {}) or {}).get("min_results", 2))
+    ok = len(docs) >= min(k, min_results)
+    metrics.inc("route_filter_total", labels={"result": "filtered" if ok else "fallback"})
+    return ok
+
+
+def _search(rt: _Runtime, vector: List[float], k: int, decision: Dict[str, Any] | None = None) -> list:
+    """
+    Searches the index, restricted to the routed chunks when possible.
+
+    Falls back to the whole collection when the filtered search finds too few
+    chunks or fails (e.g. a collection ingested before chunks were tagged).
+
+    Args:
+        rt: The request's runtime snapshot.
+        vector: The index-form query embedding.
+        k: The number of candidates.
+        decision: The routing decision (optional).
+
+    Returns:
+        The matching documents, best first.
+    """
+    rcfg = {**rt.app["retriever"], "k": k}
+    expr = _route_filter_expr(rt, decision)
+    if expr:
+        try:
+            docs = search_by_vector(_VECTOR_STORE, vector, {**rcfg, "expr": expr})
+        except Exception as e:
+            logger.warning(f"Route-filtered search failed, searching the whole collection: {e}")
+            docs = []
+        if _enough_filtered(rt, docs, k):
+            return docs
+    return search_by_vector(_VECTOR_STORE, vector, rcfg)
+
+
+def _search_many(rt: _Runtime, vectors: List[List[float]], k: int,
+                 decisions: List[Dict[str, Any] | None]) -> List[list]:
+    """
+    Batched `_search`: one multi-vector search per distinct filter, plus one
+    unfiltered search for every query that needs the fallback.
+    """
+    exprs = [_route_filter_expr(rt, d) for d in decisions]
+    groups: Dict[str | None, List[int]] = {}
+    for i, expr in enumerate(exprs):
+        groups.setdefault(expr, []).append(i)
+
+    docs_lists: List[list] = [[] for _ in vectors]
+    for expr, idx in groups.items():
+        rcfg = {**rt.app["retriever"], "k": k}
+        if expr:
+            rcfg["expr"] = expr
+        try:
+            found = search_by_vectors(_VECTOR_STORE, [vectors[i] for i in idx], rcfg)
+        except Exception as e:
+            if not expr:
+                raise
+            logger.warning(f"Route-filtered search failed, searching the whole collection: {e}")
+            found = [[] for _ in idx]
+        for i, docs in zip(idx, found):
+            docs_lists[i] = docs
+
+    retry = [i for i, expr in enumerate(exprs) if expr and not _enough_filtered(rt, docs_lists[i], k)]
+    if retry:
+        found = search_by_vectors(_VECTOR_STORE, [vectors[i] for i in retry], {**rt.app["retriever"], "k": k})
+        for i, docs in zip(retry, found):
+            docs_lists[i] = docs
+    return docs_lists
+
+
+def _decide_route(rt: _Runtime, question: str, role: str) -> Dict[str, Any]:
+    """
+    Routes a question with the configured router (see `router.decide_route`).
+
+    The streamed router only waits for the confidence when route-filtered
+    retrieval uses it.
+    """
+    streaming = (rt.app.get("router", {}) or {}).get("streaming", False)
+    need_confidence = (rt.app["retriever"].get("route_filter", {}) or {}).get("enabled", False)
+    return decide_route(rt.llm, rt.prompts["router"], question, role,
+                        streaming=streaming, need_confidence=need_confidence)
+
+
+def _combined_routing(rt: _Runtime, question: str) -> bool:
+    """
+    Whether to route and answer in one LLM call (`router.mode: combined`).
+
+    Questions matched by the keyword rule never need the LLM router, so
+    they keep the route-specific prompts in either mode.
+    """
+    mode = (rt.app.get("router", {}) or {}).get("mode", "separate")
+    return mode == "combined" and rule_based_route(question) is None
+
+
+def _plan(rt: _Runtime, question: str = "") -> Dict[str, Any]:
+    """
+    Returns the degradation plan for a new request (`{"level": 0}` when disabled).
+    """
+    return rt.degradation.plan(question) if rt.degradation else {"level": 0}
+
+
+def _answer_llm(rt: _Runtime, plan: Dict[str, Any]):
+    """
+    Returns the LLM client for the plan's model tier (the default model if none).
+    """
+    tier = plan.get("tier")
+    if tier and tier in rt.llm_tiers:
+        metrics.inc("llm_tier_requests_total", labels={"tier": tier})
+        return rt.llm_tiers[tier]
+    return rt.llm
+
+
+def _llm_kwargs(plan: Dict[str, Any]) -> Dict[str, Any]:
+    return {"max_tokens": int(plan["max_output_tokens"])} if plan.get("max_output_tokens") else {}
+
+
+def _retrieval_sizes(rt: _Runtime, plan: Dict[str, Any]):
+    """
+    Returns (use the reranker, candidates to fetch, documents to keep) for a plan.
+    """
+    rerank_cfg = rt.app.get("reranker", {}) or {}
+    k = int(rt.app["retriever"].get("k", 4))
+    use_reranker = rt.reranker is not None and plan.get("reranker", True)
+    if use_reranker:
+        candidates, keep = int(rerank_cfg.get("candidates", k)), int(rerank_cfg.get("top_n", k))
+    else:
+        candidates = keep = k
+    if plan.get("top_n"):
+        keep = min(keep, int(plan["top_n"]))
+        if not use_reranker:
+            candidates = keep
+    return use_reranker, candidates, keep
+
+
+def _retrieve_context(rt: _Runtime, question: str, decision: Dict[str, Any] | None = None,
+                      plan: Dict[str, Any] | None = None) -> list:
+    """
+    Retrieves and reranks the context documents for a question.
+
+    Embedding, vector search and reranking are timed as separate stages.
+
+    Args:
+        rt: The request's runtime snapshot.
+        question: The user's question.
+        decision: The routing decision; with `retriever.route_filter` enabled
+            the search is restricted to chunks tagged with its route.
+        plan: The degradation plan, which may skip the reranker or keep fewer
+            documents (optional).
+
+    Returns:
+        The documents to use as context, best first.
+    """
+    use_reranker, candidates, keep = _retrieval_sizes(rt, plan or {})
+
+    with metrics.timer("rag_stage_seconds", {"stage": "embed"}):
+        vector = _EMBEDDINGS.embed_query(question)
+    with metrics.timer("rag_stage_seconds", {"stage": "search"}):
+        docs = _search(rt, _index_vector(vector), _first_pass_k(rt, candidates), decision)
+    docs = _rescore(vector, docs, candidates)
+    metrics.observe("rag_retrieved_documents", len(docs), buckets=(0, 1, 2, 4, 8, 16, 32))
+
+    if use_reranker:
+        return rt.reranker.rerank(question, docs, top_n=keep)
+    return docs[:keep]
+
+
+def chat_stream(question: str, role: str | None = None, user_id: str = "default",
+                cancel_event: threading.Event | None = None, remember: bool = True,
+                runtime: _Runtime | None = None):
     """
     Streams the response to a question through the RAG pipeline.
 
+    Cancellation is cooperative: when `cancel_event` is set, or the generator is
+    closed early, the LLM stream is closed and the memory is left untouched so
+    a half-written answer never becomes part of the conversation history.
+
     Args:
         question: The user's question.
         role: The user's role (optional).
         user_id: The user identifier for memory (default "default").
+        cancel_event: Optional event that stops generation when set.
+        remember: Whether to read and update the user's memory (default True).
+        runtime: The runtime snapshot to answer with (optional; the current
+            one). `open_chat_stream` passes the snapshot it started with.
 
     Yields:
-        Events for route and response chunks.
+        Events for the degradation level (first, when `degradation` is
+        enabled), the route, the context sources and response chunks.
     """
-    # --- 1. Synchronous Setup (Retrieval, Reranking, Routing) ---
-    prompts = get_prompts_config()
-    role = role or _APP_CONFIG["roles"]["default_role"]
+    metrics.inc("chat_requests_total", labels={"mode": "stream"})
+    try:
+        yield from _chat_stream(runtime or _runtime(), question, role, user_id, cancel_event, remember)
+    except Exception:
+        metrics.inc("chat_errors_total", labels={"mode": "stream"})
+        raise
 
-    rerank_cfg = _APP_CONFIG.get("reranker", {}) or {}
-    candidates = int(rerank_cfg.get("candidates", _APP_CONFIG["retriever"].get("k", 4)))
-    retriever = make_retriever(_VECTOR_STORE, {**_APP_CONFIG["retriever"], "k": candidates})
-    docs = retriever.invoke(question)
 
-    if _RERANKER:
-        top_n = int(rerank_cfg.get("top_n", _APP_CONFIG["retriever"].get("k", 4)))
-        docs = _RERANKER.rerank(question, docs, top_n=top_n)
-    else:
-        docs = docs[:_APP_CONFIG["retriever"].get("k", 4)]
+def _chat_stream(rt: _Runtime, question: str, role: str | None, user_id: str,
+                 cancel_event: threading.Event | None, remember: bool):
+    """
+    Implements `chat_stream`; see there for the arguments and events.
+    """
+    started = time.perf_counter()
+
+    def cancelled() -> bool:
+        return cancel_event is not None and cancel_event.is_set()
 
-    route = choose_route(_LLM_CLIENT, prompts["router"], question, role)
-    yield {"type": "route", "data": route}
+    # --- 1. Synchronous Setup (Retrieval, Reranking, Routing) ---
+    prompts = rt.prompts
+    role = role or rt.app["roles"]["default_role"]
+    admit_request(user_id, role, rt=rt)
+    plan = _plan(rt, question)
+    if rt.degradation:
+        yield {"type": "degradation", "data": plan["level"]}
+
+    # In combined mode the answer call also routes, so retrieval cannot be route-filtered
+    combined = _combined_routing(rt, question)
+    decision = None if combined else _decide_route(rt, question, role)
+    docs = _retrieve_context(rt, question, decision, plan)
+
+    if cancelled():
+        _record_cancellation(0)
+        return
 
     # --- 2. Prepare Prompt and Memory ---
-    chain_key = "onboarding" if route == "onboarding" else "hr_policy"
-    memory = get_memory(user_id)
-    admin_roles = _APP_CONFIG["roles"]["admin_roles"]
+    memory = get_memory(user_id, rt) if remember else None
+    admin_roles = rt.app["roles"]["admin_roles"]
+    if combined:
+        chain_key = "combined"
+    else:
+        chain_key = "onboarding" if decision["route"] == "onboarding" else "hr_policy"
+        yield {"type": "route", "data": decision["route"]}
+        yield {"type": "sources", "data": describe_sources(docs)}
 
     final_prompt = prepare_rag_prompt(
-        prompts[chain_key], question, role, docs, admin_roles, memory=memory
+        prompts[chain_key], question, role, docs, admin_roles, memory=memory,
+        max_history=plan.get("history_messages"),
     )
 
     # --- 3. Stream the LLM Response ---
     full_response = []
-    for chunk in _LLM_CLIENT.stream(final_prompt):
-        full_response.append(chunk)
-        yield {"type": "chunk", "data": chunk}
+    try:
+        if not cancelled():
+            upstream = _answer_llm(rt, plan).stream(final_prompt, cancel_event=cancel_event, **_llm_kwargs(plan))
+            events = split_route_tag(upstream) if combined else (("chunk", c) for c in upstream)
+            for kind, chunk in events:
+                if kind == "route":
+                    # The tag is the reply's first tokens; sources follow it as in the two-call flow
+                    yield {"type": "route", "data": chunk}
+                    yield {"type": "sources", "data": describe_sources(docs)}
+                    continue
+                if not full_response:
+                    ttft = time.perf_counter() - started  # includes the scheduler queue wait
+                    metrics.observe("chat_time_to_first_token_seconds", ttft)
+                    metrics.update_ewma(TTFT_EWMA, ttft)
+                full_response.append(chunk)
+                yield {"type": "chunk", "data": chunk}
+    except GeneratorExit:
+        _record_cancellation(len(full_response))
+        raise
+    if cancelled():
+        _record_cancellation(len(full_response))
+        return
 
     # --- 4. Update Memory (After Stream is Complete) ---
+    metrics.observe("chat_request_seconds", time.perf_counter() - started, {"mode": "stream"})
+    metrics.update_ewma("stream_completed_chunks_avg", len(full_response))
     if memory:
         memory.chat_memory.add_user_message(question)
         memory.chat_memory.add_ai_message("".join(full_response))
 
 
+def _record_cancellation(streamed_chunks: int):
+    """
+    Records a cancelled stream and an estimate of the tokens it saved.
+
+    The saving is estimated from the average length (in streamed chunks,
+    roughly one token each) of the answers that ran to completion.
+
+    Args:
+        streamed_chunks: The number of chunks produced before cancellation.
+    """
+    avg = metrics.get("stream_completed_chunks_avg")
+    metrics.inc("stream_cancelled_total")
+    metrics.inc("stream_cancelled_chunks_streamed_total", streamed_chunks)
+    metrics.inc("stream_cancelled_tokens_saved_total", max(avg - streamed_chunks, 0.0))
+
+
+def open_chat_stream(question: str, role: str | None = None, user_id: str = "default"):
+    """
+    Starts `chat_stream` in a worker thread for use from async handlers.
+
+    Must be called from a running event loop. When coalescing applies, the
+    request attaches to an identical in-flight stream and receives the same
+    events. Cancelling the returned stream detaches from it; the upstream LLM
+    stream is closed once no consumer is left.
+
+    Args:
+        question: The user's question.
+        role: The user's role (optional).
+        user_id: The user identifier for memory (default "default").
+
+    Returns:
+        A started stream of chat events (`ThreadedStream` or a flight subscriber).
+    """
+    rt = _runtime()
+    role = role or rt.app["roles"]["default_role"]
+    if not _coalescable(rt, user_id):
+        return ThreadedStream(
+            lambda cancel_event: chat_stream(question, role=role, user_id=user_id, cancel_event=cancel_event,
+                                             runtime=rt)
+        ).start()
+
+    return rt.stream_flights.subscribe(
+        coalesce_key(question, role),
+        lambda: ThreadedStream(
+            lambda cancel_event: chat_stream(question, role=role, user_id=user_id,
+                                             cancel_event=cancel_event, remember=False, runtime=rt)
+        ).start(),
+        on_complete=lambda answer: remember_exchange(user_id, question, answer),
+        # Followers are rate limited like the request that started the stream
+        admit=lambda: admit_request(user_id, role, rt=rt),
+    )
+
+
 def chat_once(question: str, role: str | None = None, user_id: str = "default"):
     """"
     Processes a single question through the RAG pipeline (non-streaming).
 
+    Identical concurrent questions from users without conversation history
+    share one pipeline execution; each user's memory is still updated.
+
     Args:
         question: The user's question.
         role: The user's role (optional).
         user_id: The user identifier for memory (default "default").
 
     Returns:
-        A tuple of route and generated answer.
+        A tuple of route, generated answer and the degradation level of the
+        plan that produced it.
     """
-    prompts = get_prompts_config() # Use the getter here as well for consistency
-    role = role or _APP_CONFIG["roles"]["default_role"]
+    rt = _runtime()
+    role = role or rt.app["roles"]["default_role"]
+    metrics.inc("chat_requests_total", labels={"mode": "once"})
+    started = time.perf_counter()
+    try:
+        with metrics.timer("chat_request_seconds", {"mode": "once"}):
+            admit_request(user_id, role, rt=rt)
+            if not _coalescable(rt, user_id):
+                result = _run_chat_once(rt, question, role, memory=get_memory(user_id, rt))
+            else:
+                result, _ = rt.once_flights.do(
+                    coalesce_key(question, role),
+                    lambda: _run_chat_once(rt, question, role, memory=None),
+                )
+                remember_exchange(user_id, question, result[1])
+        metrics.update_ewma(LATENCY_EWMA, time.perf_counter() - started)
+        return result
+    except Exception:
+        metrics.inc("chat_errors_total", labels={"mode": "once"})
+        raise
 
-    # --- Use pre-loaded components ---
-    rerank_cfg = _APP_CONFIG.get("reranker", {}) or {}
-    candidates = int(rerank_cfg.get("candidates", _APP_CONFIG["retriever"].get("k", 4)))
-    top_n = int(rerank_cfg.get("top_n", _APP_CONFIG["retriever"].get("k", 4)))
 
-    retriever = make_retriever(_VECTOR_STORE, {**_APP_CONFIG["retriever"], "k": candidates})
-    docs = retriever.invoke(question)
+def _run_chat_once(rt: _Runtime, question: str, role: str, memory=None):
+    """
+    Runs the non-streaming RAG pipeline.
 
-    if _RERANKER:
-        docs = _RERANKER.rerank(question, docs, top_n=top_n)
-    else:
-        docs = docs[:_APP_CONFIG["retriever"].get("k", 4)]
+    Args:
+        rt: The request's runtime snapshot.
+        question: The user's question.
+        role: The user's role.
+        memory: Optional conversation memory to read and update.
+
+    Returns:
+        A tuple of route, generated answer and the degradation level of the
+        plan that produced it.
+    """
+    prompts = rt.prompts
+
+    admin_roles = rt.app["roles"]["admin_roles"]
+    plan = _plan(rt, question)
+    if _combined_routing(rt, question):
+        docs = _retrieve_context(rt, question, plan=plan)
+        route, answer = _answer_combined(rt, question, role, docs, memory=memory, plan=plan)
+        return route, answer, plan["level"]
 
-    # route & chain
-    route = choose_route(_LLM_CLIENT, prompts["router"], question, role)
+    # --- Route first so retrieval can be restricted to the routed chunks ---
+    decision = _decide_route(rt, question, role)
+    route = decision["route"]
+    docs = _retrieve_context(rt, question, decision, plan)
+
+    # chain
     chain_key = "onboarding" if route == "onboarding" else "hr_policy"
 
-    memory = get_memory(user_id)
-    admin_roles = _APP_CONFIG["roles"]["admin_roles"]
+    answer = answer_with_chain(_answer_llm(rt, plan), prompts[chain_key], question, role, docs, admin_roles,
+                               memory=memory, max_history=plan.get("history_messages"),
+                               max_tokens=plan.get("max_output_tokens"))
+    return route, answer, plan["level"]
+
+
+def _answer_combined(rt: _Runtime, question: str, role: str, docs: list,
+                     memory=None, plan: Dict[str, Any] | None = None):
+    """
+    Routes and answers with the single `combined` prompt (`router.mode: combined`).
+
+    Args:
+        rt: The request's runtime snapshot.
+        question: The user's question.
+        role: The user's role.
+        docs: The context documents.
+        memory: Optional conversation memory to read and update.
+        plan: The degradation plan (optional).
 
-    answer = answer_with_chain(_LLM_CLIENT, prompts[chain_key], question, role, docs, admin_roles, memory=memory)
+    Returns:
+        A tuple of the tagged route and the answer without the tag.
+    """
+    plan = plan or {}
+    # The history goes into the prompt, but memory gets the answer without its route tag
+    prompt = prepare_rag_prompt(rt.prompts["combined"], question, role, docs, rt.app["roles"]["admin_roles"],
+                                memory=memory, max_history=plan.get("history_messages"))
+    reply = _answer_llm(rt, plan).complete(prompt, **_llm_kwargs(plan))
+    route, answer = parse_route_tag(reply)
+    if route is None:
+        metrics.inc("router_tag_missing_total")
+        route = "hr_policy"
+    metrics.inc("router_decisions_total", labels={"source": "combined", "route": route})
+    if memory:
+        memory.chat_memory.add_user_message(question)
+        memory.chat_memory.add_ai_message(answer)
     return route, answer
+
+
+def chat_batch(questions: List[str], role: str | None = None, user_id: str = "default",
+               max_concurrency: int | None = None) -> List[Dict[str, Any]]:
+    """
+    Answers several independent questions with shared retrieval passes.
+
+    All questions are embedded in one `embed_documents` call, searched with a
+    single multi-vector Milvus request (one per routed partition when
+    `retriever.route_filter` is enabled, in which case the questions are
+    routed first) and reranked in one batched pass. The routing and
+    generation calls run concurrently, capped at `max_concurrency`. Batch questions do not read or write conversation memory.
+
+    Args:
+        questions: The questions to answer.
+        role: The user's role (optional).
+        user_id: The user identifier, used for scheduling (default "default").
+        max_concurrency: Maximum concurrent LLM generations (optional, from config).
+
+    Returns:
+        One dictionary per question, in input order, with 'question', 'route',
+        'answer', 'error' (None on success) and 'degradation_level' (of the
+        batch's plan).
+    """
+    if not questions:
+        return []
+    rt = _runtime()
+    prompts = rt.prompts
+    role = role or rt.app["roles"]["default_role"]
+    # Each question costs one rate-limit token, as if asked separately
+    admit_request(user_id, role, cost=len(questions), rt=rt)
+    batch_cfg = rt.app.get("batch", {}) or {}
+    max_concurrency = int(max_concurrency or batch_cfg.get("max_concurrency", MAX_THREAD_WORKERS))
+
+    # One degradation plan for the whole batch (short-question tiering does not apply)
+    plan = _plan(rt)
+    use_reranker, candidates, top_n = _retrieval_sizes(rt, plan)
+
+    workers = max(1, min(max_concurrency, len(questions)))
+
+    def route_one(question: str) -> Dict[str, Any] | None:
+        if _combined_routing(rt, question):
+            return None  # routed by its answer call
+        set_identity(user_id, role)
+        try:
+            return _decide_route(rt, question, role)
+        except Exception:
+            return None  # searched unfiltered; routed (and reported) again in answer_one
+
+    decisions: List[Dict[str, Any] | None] = [None] * len(questions)
+    if (rt.app["retriever"].get("route_filter", {}) or {}).get("enabled", False):
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            decisions = list(pool.map(route_one, questions))
+
+    # --- Shared retrieval: one embedding call, one search, one rerank pass ---
+    metrics.inc("chat_requests_total", len(questions), labels={"mode": "batch"})
+    with metrics.timer("rag_stage_seconds", {"stage": "embed_batch"}):
+        vectors = _EMBEDDINGS.embed_documents(list(questions))
+    with metrics.timer("rag_stage_seconds", {"stage": "search_batch"}):
+        docs_lists = _search_many(rt, [_index_vector(v) for v in vectors], _first_pass_k(rt, candidates), decisions)
+    docs_lists = [_rescore(v, docs, candidates) for v, docs in zip(vectors, docs_lists)]
+
+    if use_reranker:
+        docs_lists = rt.reranker.rerank_many(list(questions), docs_lists, top_n=top_n)
+    else:
+        docs_lists = [docs[:top_n] for docs in docs_lists]
+
+    admin_roles = rt.app["roles"]["admin_roles"]
+
+    def answer_one(question: str, docs: list, decision: Dict[str, Any] | None) -> Dict[str, Any]:
+        set_identity(user_id, role)
+        if decision is None and _combined_routing(rt, question):
+            route, answer = _answer_combined(rt, question, role, docs, plan=plan)
+            return {"question": question, "route": route, "answer": answer, "error": None,
+                    "degradation_level": plan["level"]}
+        decision = decision or _decide_route(rt, question, role)
+        route = decision["route"]
+        chain_key = "onboarding" if route == "onboarding" else "hr_policy"
+        answer = answer_with_chain(_answer_llm(rt, plan), prompts[chain_key], question, role, docs, admin_roles,
+                                   max_tokens=plan.get("max_output_tokens"))
+        return {"question": question, "route": route, "answer": answer, "error": None,
+                "degradation_level": plan["level"]}
+
+    # --- Concurrent generation, errors reported per item ---
+    results: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(answer_one, q, docs, d) for q, docs, d in zip(questions, docs_lists, decisions)]
+        for question, future in zip(questions, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                metrics.inc("chat_errors_total", labels={"mode": "batch"})
+                results.append({"question": question, "route": None, "answer": None, "error": str(e),
+                                "degradation_level": plan["level"]})
+    return results
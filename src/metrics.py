@@ -0,0 +1,238 @@
+from __future__ import annotations
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+# Process-wide counters, gauges and histograms. Kept deliberately tiny: a lock
+# and a few dicts keyed by (name, labels), rendered in Prometheus text format.
+_LOCK = threading.Lock()
+_COUNTERS: Dict[Tuple[str, tuple], float] = {}
+_GAUGES: Dict[Tuple[str, tuple], float] = {}
+_HISTOGRAMS: Dict[Tuple[str, tuple], "_Histogram"] = {}
+_CALLBACKS: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+PREFIX = "hrbot_"
+
+# Latency buckets in seconds, from cache hits to long generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _key(name: str, labels: Optional[Dict[str, str]]) -> Tuple[str, tuple]:
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None):
+    """
+    Increments a counter.
+
+    Args:
+        name: The counter name.
+        value: The amount to add (default 1).
+        labels: Optional label values.
+    """
+    key = _key(name, labels)
+    with _LOCK:
+        _COUNTERS[key] = _COUNTERS.get(key, 0.0) + value
+
+
+def set_gauge(name: str, value: float, labels: Optional[Dict[str, str]] = None):
+    """
+    Sets a gauge to an absolute value.
+
+    Args:
+        name: The gauge name.
+        value: The new value.
+        labels: Optional label values.
+    """
+    with _LOCK:
+        _GAUGES[_key(name, labels)] = float(value)
+
+
+def observe(name: str, value: float, labels: Optional[Dict[str, str]] = None, buckets=DEFAULT_BUCKETS):
+    """
+    Records one observation in a histogram.
+
+    Args:
+        name: The histogram name.
+        value: The observed value.
+        labels: Optional label values.
+        buckets: Upper bounds used when the histogram is first created.
+    """
+    key = _key(name, labels)
+    with _LOCK:
+        hist = _HISTOGRAMS.get(key)
+        if hist is None:
+            hist = _HISTOGRAMS[key] = _Histogram(buckets)
+        hist.observe(value)
+
+
+@contextmanager
+def timer(name: str, labels: Optional[Dict[str, str]] = None):
+    """
+    Observes the wall time of the block (in seconds), also when it raises.
+
+    Args:
+        name: The histogram name.
+        labels: Optional label values.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, labels)
+
+
+def register_callback(name: str, fn: Callable[[], float], kind: str = "gauge"):
+    """
+    Registers a value read at scrape time (for state kept elsewhere, e.g. cache counters).
+
+    Args:
+        name: The metric name.
+        fn: Callable returning the current value.
+        kind: "gauge" or "counter" (default "gauge").
+    """
+    with _LOCK:
+        _CALLBACKS[name] = (kind, fn)
+
+
+def update_ewma(name: str, value: float, alpha: float = 0.1) -> float:
+    """
+    Folds a sample into an exponentially weighted moving average gauge.
+
+    Args:
+        name: The gauge name.
+        value: The new sample.
+        alpha: The smoothing factor (default 0.1).
+
+    Returns:
+        The updated average.
+    """
+    key = _key(name, None)
+    with _LOCK:
+        prev = _GAUGES.get(key)
+        avg = float(value) if prev is None else prev + alpha * (float(value) - prev)
+        _GAUGES[key] = avg
+        return avg
+
+
+def get(name: str, default: float = 0.0, labels: Optional[Dict[str, str]] = None) -> float:
+    """
+    Reads a counter or gauge.
+
+    Args:
+        name: The metric name.
+        default: Value returned when the metric has never been recorded.
+        labels: Optional label values.
+
+    Returns:
+        The current value.
+    """
+    key = _key(name, labels)
+    with _LOCK:
+        if key in _COUNTERS:
+            return _COUNTERS[key]
+        return _GAUGES.get(key, default)
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    """
+    Returns a copy of all metrics, keyed by the rendered series name.
+
+    Returns:
+        A dictionary with 'counters', 'gauges' and 'histograms' (count and sum).
+    """
+    with _LOCK:
+        return {
+            "counters": {_series(n, l): v for (n, l), v in _COUNTERS.items()},
+            "gauges": {_series(n, l): v for (n, l), v in _GAUGES.items()},
+            "histograms": {_series(n, l): {"count": h.count, "sum": h.sum}
+                           for (n, l), h in _HISTOGRAMS.items()},
+        }
+
+
+def _fmt_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " "))
+                    for k, v in items)
+    return "{" + body + "}"
+
+
+def _series(name: str, labels: tuple) -> str:
+    return name + _fmt_labels(labels)
+
+
+def _fmt_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def render_prometheus() -> str:
+    """
+    Renders every metric in the Prometheus text exposition format (0.0.4).
+
+    Returns:
+        The exposition text.
+    """
+    with _LOCK:
+        counters = dict(_COUNTERS)
+        gauges = dict(_GAUGES)
+        histograms = {k: (h.buckets, list(h.counts), h.sum, h.count) for k, h in _HISTOGRAMS.items()}
+        callbacks = dict(_CALLBACKS)
+
+    lines = []
+
+    def emit_simple(kind: str, series: Dict[Tuple[str, tuple], float]):
+        by_name: Dict[str, list] = {}
+        for (name, labels), value in series.items():
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                lines.append(f"{PREFIX}{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+    emit_simple("counter", counters)
+    emit_simple("gauge", gauges)
+
+    for name, (kind, fn) in sorted(callbacks.items()):
+        try:
+            value = fn()
+        except Exception:
+            continue
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        lines.append(f"{PREFIX}{name} {_fmt_value(value)}")
+
+    by_name: Dict[str, list] = {}
+    for (name, labels), hist in histograms.items():
+        by_name.setdefault(name, []).append((labels, hist))
+    for name in sorted(by_name):
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        for labels, (buckets, counts, total, count) in sorted(by_name[name], key=lambda x: x[0]):
+            cumulative = 0
+            for bound, c in zip(list(buckets) + [float("inf")], counts):
+                cumulative += c
+                lines.append(f"{PREFIX}{name}_bucket{_fmt_labels(labels, (('le', _fmt_value(bound)),))} {cumulative}")
+            lines.append(f"{PREFIX}{name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{PREFIX}{name}_count{_fmt_labels(labels)} {count}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,240 @@
+from __future__ import annotations
+import os
+import sys
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Nothing here runs until a profile is requested: sampling happens on a
+# short-lived thread that reads `sys._current_frames()`, so the rest of the
+# process pays no tracing cost while the profiler is idle.
+_ACTIVE = threading.Lock()
+
+# Leaf frames of threads parked in a blocking call; dropped unless idle samples
+# are requested, otherwise executor and listener threads dominate the profile.
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+    ("base_events.py", "_run_once"),
+}
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+Frame = Tuple[str, str, int]  # (function, file, first line)
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _stack(frame) -> Tuple[Frame, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    stack.reverse()  # root first
+    return tuple(stack)
+
+
+def _is_idle(stack: Tuple[Frame, ...]) -> bool:
+    if not stack:
+        return True
+    name, filename, _ = stack[-1]
+    return (os.path.basename(filename), name) in _IDLE_LEAVES
+
+
+def sample_stacks(duration_s: float, interval_s: float = 0.005,
+                  include_idle: bool = False) -> Dict[str, Any]:
+    """
+    Samples the Python stacks of every thread in the process.
+
+    Args:
+        duration_s: How long to sample, in seconds.
+        interval_s: Time between samples, in seconds (default 0.005).
+        include_idle: Whether to keep samples of threads parked in a blocking call (default False).
+
+    Returns:
+        A dictionary with 'samples' (a Counter of (thread name, stack) pairs),
+        'duration_s', 'interval_s' and 'ticks' (number of sampling rounds).
+
+    Raises:
+        ProfilerBusy: If another profile is already running.
+    """
+    if not _ACTIVE.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    try:
+        own = threading.get_ident()
+        samples: Counter = Counter()
+        ticks = 0
+        started = time.perf_counter()
+        deadline = started + duration_s
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if not include_idle and _is_idle(stack):
+                    continue
+                samples[(names.get(ident, str(ident)), stack)] += 1
+            ticks += 1
+            time.sleep(max(0.0, interval_s - (time.perf_counter() - now)))
+        return {
+            "samples": samples,
+            "duration_s": time.perf_counter() - started,
+            "interval_s": interval_s,
+            "ticks": ticks,
+        }
+    finally:
+        _ACTIVE.release()
+
+
+def _frame_label(frame: Frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({_short_path(filename)}:{line})"
+
+
+def _short_path(filename: str) -> str:
+    for marker in ("site-packages" + os.sep, "dist-packages" + os.sep):
+        idx = filename.rfind(marker)
+        if idx != -1:
+            return filename[idx + len(marker):]
+    for prefix in (os.getcwd() + os.sep, _STDLIB):
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def to_collapsed(profile: Dict[str, Any]) -> str:
+    """
+    Renders samples in the collapsed-stack format used by flamegraph.pl and speedscope.
+
+    Args:
+        profile: The result of `sample_stacks`.
+
+    Returns:
+        One line per distinct stack: 'thread;root;...;leaf count'.
+    """
+    lines = []
+    for (thread, stack), count in profile["samples"].most_common():
+        path = ";".join([thread.replace(";", "_")] + [_frame_label(f).replace(";", "_") for f in stack])
+        lines.append(f"{path} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(profile: Dict[str, Any], name: str = "hrbot") -> Dict[str, Any]:
+    """
+    Renders samples as a speedscope file with one sampled profile per thread.
+
+    Args:
+        profile: The result of `sample_stacks`.
+        name: The profile name shown in speedscope (default "hrbot").
+
+    Returns:
+        The speedscope JSON document.
+    """
+    frames: List[Dict[str, Any]] = []
+    index: Dict[Frame, int] = {}
+    by_thread: Dict[str, Tuple[list, list]] = {}
+    interval = profile["interval_s"]
+
+    for (thread, stack), count in profile["samples"].items():
+        ids = []
+        for frame in stack:
+            idx = index.get(frame)
+            if idx is None:
+                idx = index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": _short_path(frame[1]), "line": frame[2]})
+            ids.append(idx)
+        samples, weights = by_thread.setdefault(thread, ([], []))
+        samples.append(ids)
+        weights.append(count * interval)
+
+    profiles = []
+    for thread, (samples, weights) in sorted(by_thread.items()):
+        profiles.append({
+            "type": "sampled",
+            "name": thread,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        })
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "hrbot-profiler",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def memory_diff(duration_s: float, top: int = 30, frames: int = 10) -> Dict[str, Any]:
+    """
+    Compares two `tracemalloc` snapshots taken `duration_s` seconds apart.
+
+    Tracing is started for the duration of the call only (and left running if
+    it was already on), since it slows every allocation while active.
+
+    Args:
+        duration_s: Time between the two snapshots, in seconds.
+        top: Number of allocation sites to return (default 30).
+        frames: Traceback depth recorded per allocation (default 10).
+
+    Returns:
+        A dictionary with the totals and the `top` sites sorted by growth.
+
+    Raises:
+        ProfilerBusy: If another profile is already running.
+    """
+    if not _ACTIVE.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running in this worker")
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        if not was_tracing:
+            tracemalloc.start(frames)
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        time.sleep(duration_s)
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        stats = after.compare_to(before, "traceback")
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+        _ACTIVE.release()
+
+    sites = []
+    for stat in stats[:top]:
+        sites.append({
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff,
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+            "traceback": [f"{_short_path(f.filename)}:{f.lineno}" for f in stat.traceback],
+        })
+    return {
+        "duration_s": duration_s,
+        "growth_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+        "traced_current_kb": round(current / 1024, 1),
+        "traced_peak_kb": round(peak / 1024, 1),
+        "top": sites,
+    }
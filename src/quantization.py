@@ -0,0 +1,202 @@
+from __future__ import annotations
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+def truncate(vector: Sequence[float], dimensions: int) -> List[float]:
+    """
+    Matryoshka truncation: keeps the first `dimensions` components and re-normalizes.
+
+    Only meaningful for models trained for it (e.g. text-embedding-3-*), where
+    it is equivalent to requesting fewer `dimensions` from the API.
+
+    Args:
+        vector: The full embedding.
+        dimensions: The number of leading components to keep.
+
+    Returns:
+        The truncated, L2-normalized vector.
+    """
+    head = np.asarray(vector[:dimensions], dtype=np.float32)
+    norm = np.linalg.norm(head)
+    return (head / norm if norm else head).tolist()
+
+
+class CompressedEmbeddings(Embeddings):
+    """Wraps an embeddings model so the vector store indexes truncated vectors."""
+
+    def __init__(self, base, dimensions: int):
+        """
+        Initializes the wrapper.
+
+        Args:
+            base: The full-precision embeddings model.
+            dimensions: The number of dimensions stored in the index.
+        """
+        self.base = base
+        self.dimensions = int(dimensions)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [truncate(v, self.dimensions) for v in self.base.embed_documents(texts)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return truncate(self.base.embed_query(text), self.dimensions)
+
+
+class RescoringStore:
+    """
+    Full-precision document vectors kept beside the compressed index.
+
+    Written at ingest as `<path>.npy` (the vectors) and `<path>.json` (their
+    chunk ids). Candidates from the compressed first-pass search are
+    re-ranked by exact cosine similarity against these vectors.
+    """
+
+    def __init__(self, chunk_ids: List[Any], matrix: np.ndarray):
+        self.chunk_ids = list(chunk_ids)
+        self.matrix = matrix
+        self._rows = {cid: i for i, cid in enumerate(self.chunk_ids)}
+
+    @classmethod
+    def build(cls, docs: List[Document], vectors: Sequence[Sequence[float]], dtype: str = "float16") -> "RescoringStore":
+        """
+        Builds the store from the ingested chunks and their full embeddings.
+
+        Args:
+            docs: The chunks (with a `chunk_id` in their metadata).
+            vectors: The full-precision embeddings, in the same order.
+            dtype: Storage type, "float16" (default) or "float32".
+
+        Returns:
+            The store.
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = (matrix / np.where(norms == 0, 1, norms)).astype(dtype)
+        return cls([d.metadata.get("chunk_id") for d in docs], matrix)
+
+    def save(self, path: str):
+        """
+        Writes `<path>.npy` and `<path>.json`.
+
+        Args:
+            path: The path prefix.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.save(path + ".npy", self.matrix)
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump({"chunk_ids": self.chunk_ids, "dtype": str(self.matrix.dtype)}, f)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RescoringStore"]:
+        """
+        Loads a store written by `save` (memory-mapped).
+
+        Args:
+            path: The path prefix.
+
+        Returns:
+            The store, or None if it does not exist.
+        """
+        if not (os.path.exists(path + ".npy") and os.path.exists(path + ".json")):
+            return None
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(meta["chunk_ids"], np.load(path + ".npy", mmap_mode="r"))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.matrix.nbytes)
+
+    def rescore(self, query: Sequence[float], docs: List[Document], k: int) -> List[Document]:
+        """
+        Re-ranks first-pass candidates by exact similarity to the full query vector.
+
+        Candidates without a stored vector keep their first-pass order after the
+        rescored ones.
+
+        Args:
+            query: The full-precision query embedding.
+            docs: The first-pass candidates.
+            k: The number of documents to return.
+
+        Returns:
+            The best `k` documents.
+        """
+        rows, known, unknown = [], [], []
+        for doc in docs:
+            row = self._rows.get(doc.metadata.get("chunk_id"))
+            if row is None:
+                unknown.append(doc)
+            else:
+                rows.append(row)
+                known.append(doc)
+        if rows:
+            q = np.asarray(query, dtype=np.float32)
+            scores = np.asarray(self.matrix[rows], dtype=np.float32) @ q
+            known = [known[i] for i in np.argsort(-scores)]
+        return (known + unknown)[:k]
+
+
+def build_rescorer(cfg: Dict[str, Any]) -> Optional[RescoringStore]:
+    """
+    Loads the rescoring store configured under `embedding.compression`.
+
+    Args:
+        cfg: The compression configuration.
+
+    Returns:
+        The store, or None if compression or rescoring is disabled or the
+        store has not been written yet (run the ingest first).
+    """
+    if not cfg.get("enabled", False) or not cfg.get("rescore", True):
+        return None
+    return RescoringStore.load(cfg.get("store_path", "data/vectors/full_precision"))
+
+
+# --- First-pass codecs compared by scripts/bench_quantization.py ---
+
+def quantize_int8(matrix: np.ndarray):
+    """
+    Per-dimension scalar quantization to uint8 (what Milvus SQ8 indexes do).
+
+    Args:
+        matrix: The float vectors, one per row.
+
+    Returns:
+        (codes, low, scale) such that matrix ~= codes * scale + low.
+    """
+    low = matrix.min(axis=0)
+    scale = (matrix.max(axis=0) - low) / 255.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint((matrix - low) / scale), 0, 255).astype(np.uint8)
+    return codes, low, scale
+
+
+def dequantize_int8(codes: np.ndarray, low: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    return codes.astype(np.float32) * scale + low
+
+
+def quantize_binary(matrix: np.ndarray) -> np.ndarray:
+    """
+    Sign binarization: one bit per dimension, packed 8 per byte.
+
+    Args:
+        matrix: The float vectors, one per row.
+
+    Returns:
+        The packed bits (uint8, d/8 bytes per vector).
+    """
+    return np.packbits(matrix > 0, axis=1)
+
+
+def hamming_similarity(packed: np.ndarray, query_packed: np.ndarray) -> np.ndarray:
+    """
+    Number of matching bits between each packed row and the packed query.
+    """
+    return -np.unpackbits(np.bitwise_xor(packed, query_packed), axis=1).sum(axis=1)
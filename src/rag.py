@@ -15,13 +15,36 @@ def format_context(docs: List[Document]) -> str:
     """
     lines = []
     for i, d in enumerate(docs):
-        page = d.metadata.get("page", "N/A")
-        source_info = f"Source [{i}] (Page: {page})"
+        page = d.metadata.get("pages") or d.metadata.get("page", "N/A")
+        section = d.metadata.get("section")
+        source_info = f"Source [{i}] (Page: {page}, Section: {section})" if section else f"Source [{i}] (Page: {page})"
         lines.append(f"{source_info}\n{d.page_content}")
     return "\n\n".join(lines)
 
+def describe_sources(docs: List[Document]) -> List[dict]:
+    """
+    Summarizes the documents used as context for client-side citations.
+
+    Args:
+        docs: The list of documents.
+
+    Returns:
+        A list of dictionaries with the source index, page(s), section and chunk id.
+    """
+    return [
+        {
+            "index": i,
+            "source": d.metadata.get("source"),
+            "page": d.metadata.get("page"),
+            "pages": d.metadata.get("pages"),
+            "section": d.metadata.get("section"),
+            "chunk_id": d.metadata.get("chunk_id"),
+        }
+        for i, d in enumerate(docs)
+    ]
+
 def prepare_rag_prompt(chain_prompt: str, question: str, role: str,
-                       docs: list, admin_roles: list[str], memory=None) -> str:
+                       docs: list, admin_roles: list[str], memory=None, max_history: int | None = None) -> str:
     """
     Prepares the full prompt for the RAG chain, including context and history.
 
@@ -32,6 +55,7 @@ def prepare_rag_prompt(chain_prompt: str, question: str, role: str,
         docs: The retrieved documents.
         admin_roles: List of admin roles.
         memory: Optional conversation memory.
+        max_history: Maximum number of history messages to include (optional, all by default).
 
     Returns:
         The prepared prompt string.
@@ -40,6 +64,8 @@ def prepare_rag_prompt(chain_prompt: str, question: str, role: str,
     history_text = ""
     if memory:
         hist = memory.load_memory_variables({}).get("history", [])
+        if max_history is not None:
+            hist = hist[-max_history:] if max_history > 0 else []
         if hist:
             history_text = "\n".join([f"{m.type}: {m.content}" for m in hist])
 
@@ -54,7 +80,8 @@ def prepare_rag_prompt(chain_prompt: str, question: str, role: str,
     )
 
 def answer_with_chain(llm, chain_prompt: str, question: str, role: str,
-                      docs: list, admin_roles: list[str], memory=None):
+                      docs: list, admin_roles: list[str], memory=None,
+                      max_history: int | None = None, max_tokens: int | None = None):
     """
     Generates an answer using the RAG chain.
 
@@ -66,12 +93,14 @@ def answer_with_chain(llm, chain_prompt: str, question: str, role: str,
         docs: The retrieved documents.
         admin_roles: List of admin roles.
         memory: Optional conversation memory.
+        max_history: Maximum number of history messages in the prompt (optional).
+        max_tokens: Maximum answer length in tokens (optional, the model's default).
 
     Returns:
         The generated answer.
     """
-    prompt = prepare_rag_prompt(chain_prompt, question, role, docs, admin_roles, memory)
-    answer = llm.complete(prompt)
+    prompt = prepare_rag_prompt(chain_prompt, question, role, docs, admin_roles, memory, max_history=max_history)
+    answer = llm.complete(prompt, max_tokens=max_tokens) if max_tokens else llm.complete(prompt)
 
     if memory:
         memory.chat_memory.add_user_message(question)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.config_loader import resolve_path
+from .prompts import render_prompt
+
+# Sections whose components hold connections or data built for them (the
+# embedding model must match the ingested collection); changing them needs a restart.
+# `logging` is reconfigured in place, except `logging.console` (see `configure_logging`)
+RESTART_SECTIONS = ("embedding", "milvus", "inference_server", "http")
+
+_CHAIN_PROMPTS = ("onboarding", "hr_policy")
+_SAMPLE = {"question": "q", "role": "employee", "context": "", "admin_roles": []}
+
+
+class ConfigError(ValueError):
+    """Raised when a new configuration cannot be applied."""
+
+
+def changed_sections(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """
+    Lists the top-level sections that differ between two configurations.
+
+    Args:
+        old: The current configuration.
+        new: The new configuration.
+
+    Returns:
+        The names of the added, removed or changed sections, sorted.
+    """
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+def _render(name: str, template: Any, **values):
+    if not isinstance(template, str):
+        raise ConfigError(f"Prompt '{name}' must be a string")
+    try:
+        render_prompt(template, **values)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ConfigError(f"Prompt '{name}' does not render: {e!r}") from e
+
+
+def validate_config(app: Dict[str, Any], prompts: Dict[str, Any]):
+    """
+    Checks a loaded configuration before any component is built from it.
+
+    Prompts are rendered with sample values, so a missing placeholder or an
+    unescaped brace is caught here rather than on the first request.
+
+    Args:
+        app: The application configuration.
+        prompts: The prompts configuration.
+
+    Raises:
+        ConfigError: If a required setting is missing or invalid.
+    """
+    if not isinstance(app, dict) or not isinstance(prompts, dict):
+        raise ConfigError("app.yaml and prompts.yaml must contain mappings")
+    for section in ("llm", "embedding", "milvus", "retriever", "roles"):
+        if not isinstance(app.get(section), dict):
+            raise ConfigError(f"Missing section '{section}' in app.yaml")
+    if not app["llm"].get("provider"):
+        raise ConfigError("llm.provider is required")
+    try:
+        k = int(app["retriever"].get("k", 4))
+    except (TypeError, ValueError):
+        k = 0
+    if k < 1:
+        raise ConfigError("retriever.k must be a positive integer")
+    roles = app["roles"]
+    if not roles.get("default_role") or not isinstance(roles.get("admin_roles"), list):
+        raise ConfigError("roles.default_role and roles.admin_roles (a list) are required")
+
+    mode = (app.get("router", {}) or {}).get("mode", "separate")
+    if mode not in ("separate", "combined"):
+        raise ConfigError(f"router.mode must be 'separate' or 'combined', not '{mode}'")
+    router = prompts.get("router")
+    if not isinstance(router, dict):
+        raise ConfigError("Missing prompt 'router' (system and user)")
+    for part in ("system", "user"):
+        _render(f"router.{part}", router.get(part), question="q", role="employee")
+    for name in _CHAIN_PROMPTS + (("combined",) if mode == "combined" else ()):
+        _render(name, prompts.get(name), **_SAMPLE)
+
+    tiers = app.get("llm_tiers") or {}
+    degradation = app.get("degradation", {}) or {}
+    wanted = [level.get("tier") for level in degradation.get("levels") or [] if level]
+    wanted.append((degradation.get("simple_questions") or {}).get("tier"))
+    missing = sorted({t for t in wanted if t and t not in tiers})
+    if missing:
+        raise ConfigError(f"degradation refers to undefined llm_tiers: {', '.join(missing)}")
+
+    log_cfg = app.get("logging") or {}
+    levels = [log_cfg.get("level", "INFO"), *(log_cfg.get("levels") or {}).values()]
+    unknown = sorted({str(level) for level in levels
+                      if not isinstance(level, int) and not isinstance(logging.getLevelName(level), int)})
+    if unknown:
+        raise ConfigError(f"logging refers to unknown levels: {', '.join(unknown)}")
+
+
+class ConfigWatcher:
+    """
+    Polls the configuration files and calls back when one of them changes.
+
+    Polling the modification times needs no extra dependency and works on
+    mounted volumes (e.g. Kubernetes ConfigMaps) where inotify is unreliable.
+    A change is reported once the files have been stable for one interval, so
+    an editor's partial write is not picked up.
+    """
+
+    def __init__(self, paths: List[str], on_change: Callable[[], Any], interval_s: float = 2.0):
+        """
+        Initializes the watcher.
+
+        Args:
+            paths: Files to watch, relative to the project root.
+            on_change: Called (from the watcher thread) after a change.
+            interval_s: Polling interval in seconds (default 2).
+        """
+        self.paths = [resolve_path(p) for p in paths]
+        self.on_change = on_change
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _stamp(self):
+        stamps = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamps.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def _run(self):
+        seen = self._stamp()
+        pending = None
+        while not self._stop.wait(self.interval_s):
+            current = self._stamp()
+            if current == seen:
+                pending = None
+                continue
+            if current != pending:  # still being written: wait one more interval
+                pending = current
+                continue
+            seen, pending = current, None
+            try:
+                self.on_change()
+            except Exception:
+                pass  # reported by the callback; keep watching
+
+    def start(self) -> "ConfigWatcher":
+        self._thread = threading.Thread(target=self._run, name="config-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
@@ -1,6 +1,7 @@
 from __future__ import annotations
 from typing import List, Dict, Any
 import math
+from . import metrics
 
 # Types
 from langchain_core.documents import Document
@@ -34,10 +35,39 @@ class CrossEncoderReranker:
             return docs
         pairs = [(question, d.page_content) for d in docs]
         # batch predict to avoid OOM on big candidate sets
-        scores = self._predict_batched(pairs, batch_size=64)
+        with metrics.timer("rag_stage_seconds", {"stage": "rerank"}):
+            scores = self._predict_batched(pairs, batch_size=64)
         rescored = sorted(zip(docs, scores), key=lambda x: x[1], reverse=True)
         return [d for d, _ in rescored[:top_n]]
 
+    def rerank_many(self, questions: List[str], docs_lists: List[List[Document]], top_n: int) -> List[List[Document]]:
+        """
+        Reranks the candidates of several questions in one batched pass.
+
+        All (question, text) pairs are scored together so the cross-encoder
+        sees full batches instead of one small batch per question.
+
+        Args:
+            questions: The query questions.
+            docs_lists: The candidate documents for each question.
+            top_n: The number of top documents to return per question.
+
+        Returns:
+            The top reranked documents for each question.
+        """
+        pairs = [(q, d.page_content) for q, docs in zip(questions, docs_lists) for d in docs]
+        if not pairs:
+            return [list(docs) for docs in docs_lists]
+        with metrics.timer("rag_stage_seconds", {"stage": "rerank_batch"}):
+            scores = self._predict_batched(pairs, batch_size=64)
+        out, offset = [], 0
+        for docs in docs_lists:
+            chunk_scores = scores[offset:offset + len(docs)]
+            offset += len(docs)
+            rescored = sorted(zip(docs, chunk_scores), key=lambda x: x[1], reverse=True)
+            out.append([d for d, _ in rescored[:top_n]])
+        return out
+
     def _predict_batched(self, pairs, batch_size: int = 64):
         """
         Predicts scores in batches to avoid OOM.
@@ -80,6 +110,22 @@ class LLMReranker:
         """
         if not docs:
             return docs
+        with metrics.timer("rag_stage_seconds", {"stage": "rerank"}):
+            scored = self._score(question, docs)
+        rescored = sorted(scored, key=lambda x: x[1], reverse=True)
+        return [d for d, _ in rescored[:top_n]]
+
+    def _score(self, question: str, docs: List[Document]):
+        """
+        Scores each document with one LLM call.
+
+        Args:
+            question: The query question.
+            docs: The documents to score.
+
+        Returns:
+            List of (document, score) pairs.
+        """
         scored = []
         # one LLM call per doc (simple, reliable). For speed you could also pack multiple in one prompt.
         for d in docs:
@@ -98,17 +144,32 @@ class LLMReranker:
             except Exception:
                 score = 0.0
             scored.append((d, float(score)))
-        rescored = sorted(scored, key=lambda x: x[1], reverse=True)
-        return [d for d, _ in rescored[:top_n]]
+        return scored
+
+    def rerank_many(self, questions: List[str], docs_lists: List[List[Document]], top_n: int) -> List[List[Document]]:
+        """
+        Reranks the candidates of several questions.
+
+        Args:
+            questions: The query questions.
+            docs_lists: The candidate documents for each question.
+            top_n: The number of top documents to return per question.
+
+        Returns:
+            The top reranked documents for each question.
+        """
+        return [self.rerank(q, docs, top_n=top_n) for q, docs in zip(questions, docs_lists)]
 
 # -------- Factory --------
-def build_reranker(cfg: Dict[str, Any], llm=None):
+def build_reranker(cfg: Dict[str, Any], llm=None, remote=None):
     """
     Builds a reranker based on configuration.
 
     Args:
         cfg: The reranker configuration.
         llm: Optional LLM client for LLM reranker.
+        remote: Optional inference sidecar client; when given, the cross-encoder
+            runs in the shared sidecar instead of this process.
 
     Returns:
         The reranker instance or None.
@@ -118,6 +179,9 @@ def build_reranker(cfg: Dict[str, Any], llm=None):
     """
     rtype = (cfg.get("type") or "none").lower()
     if rtype == "cross_encoder":
+        if remote is not None:
+            from .inference import RemoteReranker
+            return RemoteReranker(remote)
         model = cfg.get("model", "cross-encoder/ms-marco-MiniLM-L-6-v2")
         return CrossEncoderReranker(model_name=model)
     if rtype == "llm":
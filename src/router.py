@@ -1,6 +1,7 @@
 from __future__ import annotations
-from typing import Dict
+from typing import Any, Dict, Iterable, Iterator, Tuple
 from .prompts import render_router
+from . import metrics
 import re, json
 
 KEYWORDS_ONBOARDING = [
@@ -52,6 +53,138 @@ def llm_route(llm, router_prompts: Dict[str, str], question: str, role: str):
             "confidence": conf, "reason": reason, "raw": res}
 
 
+_JSON_ROUTE = re.compile(r'"route"\s*:\s*"([^"]*)"')
+_JSON_CONFIDENCE = re.compile(r'"confidence"\s*:\s*"?(-?\d+(?:\.\d+)?)"?\s*[,}]')
+_JSON_AFTER_CONFIDENCE = re.compile(r'"reason"|}')
+
+
+class StreamingRouteParser:
+    """
+    Incremental parser for the router's JSON, fed with streamed chunks.
+
+    Only the fields needed for the decision are parsed: `route` and, if
+    requested, `confidence`. The free-text `reason` is never waited for.
+    """
+
+    def __init__(self, need_confidence: bool = True):
+        """
+        Initializes the parser.
+
+        Args:
+            need_confidence: Wait for the confidence after the route (default True).
+        """
+        self.need_confidence = need_confidence
+        self.text = ""
+        self.route: str | None = None
+        self.confidence: float | None = None
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Adds a chunk of the reply.
+
+        Args:
+            chunk: The streamed text.
+
+        Returns:
+            True once the decision is complete and generation can stop.
+        """
+        self.text += chunk
+        if self.route is None:
+            m = _JSON_ROUTE.search(self.text)
+            if m:
+                self.route = m.group(1).strip().lower()
+        if self.confidence is None:
+            m = _JSON_CONFIDENCE.search(self.text)
+            if m:
+                self.confidence = float(m.group(1))
+        if self.route is None:
+            return False
+        if not self.need_confidence or self.confidence is not None:
+            return True
+        # The model skipped the confidence: stop once it has moved past it
+        return bool(_JSON_AFTER_CONFIDENCE.search(self.text[self.text.index('"route"'):]))
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Returns the decision parsed so far.
+
+        Malformed replies are salvaged without another LLM call: a route name
+        anywhere in the text is used (at confidence 0), else hr_policy.
+        """
+        route, conf = self.route, self.confidence
+        if route not in {"hr_policy", "onboarding"}:
+            found = re.search(r"\b(onboarding|hr_policy)\b", self.text, re.IGNORECASE)
+            route, conf = (found.group(1).lower() if found else "hr_policy"), 0.0
+        return {"route": route, "confidence": conf if conf is not None else 0.0}
+
+
+def llm_route_streaming(llm, router_prompts: Dict[str, str], question: str, role: str,
+                        need_confidence: bool = True):
+    """
+    Routes using the streamed LLM reply, stopping as soon as the decision is known.
+
+    Args:
+        llm: The LLM client.
+        router_prompts: The router prompts dictionary.
+        question: The user's question.
+        role: The user's role.
+        need_confidence: Wait for the confidence after the route (default True).
+
+    Returns:
+        A dictionary with route, confidence, reason, and raw response.
+    """
+    system, user = render_router(router_prompts["system"], router_prompts["user"],
+                                 question=question, role=role)
+    parser = StreamingRouteParser(need_confidence)
+    stream = llm.stream(user, system=system)
+    early = False
+    try:
+        for chunk in stream:
+            if parser.feed(chunk):
+                early = True
+                break
+    finally:
+        stream.close()  # stops generation upstream
+
+    out = parser.result()
+    if parser.route not in {"hr_policy", "onboarding"}:
+        result = "malformed"
+    else:
+        result = "early_stop" if early else "complete"
+    metrics.inc("router_stream_total", labels={"result": result})
+    return {**out, "reason": result, "raw": parser.text}
+
+
+def decide_route(llm, router_prompts: Dict[str, str], question: str, role: str,
+                 streaming: bool = False, need_confidence: bool = True) -> Dict[str, Any]:
+    """
+    Chooses a route with its confidence, preferring rule-based then LLM.
+
+    Args:
+        llm: The LLM client.
+        router_prompts: The router prompts dictionary.
+        question: The user's question.
+        role: The user's role.
+        streaming: Use the streamed router, which stops generating once the
+            route is known (default False).
+        need_confidence: With `streaming`, also wait for the confidence (default True).
+
+    Returns:
+        A dictionary with route, confidence (1.0 for keyword matches) and source.
+    """
+    rb = rule_based_route(question)
+    if rb:
+        metrics.inc("router_decisions_total", labels={"source": "rule", "route": rb})
+        return {"route": rb, "confidence": 1.0, "source": "rule"}
+    with metrics.timer("rag_stage_seconds", {"stage": "route"}):
+        if streaming:
+            out = llm_route_streaming(llm, router_prompts, question, role, need_confidence)
+        else:
+            out = llm_route(llm, router_prompts, question, role)
+    metrics.inc("router_decisions_total", labels={"source": "llm", "route": out["route"]})
+    return {"route": out["route"], "confidence": out["confidence"], "source": "llm"}
+
+
 def choose_route(llm, router_prompts: Dict[str, str], question: str, role: str) -> str:
     """
     Chooses a route, preferring rule-based then LLM.
@@ -65,7 +198,95 @@ def choose_route(llm, router_prompts: Dict[str, str], question: str, role: str)
     Returns:
         The chosen route.
     """
-    rb = rule_based_route(question)
-    if rb: return rb
-    out = llm_route(llm, router_prompts, question, role)
-    return out["route"]
\ No newline at end of file
+    return decide_route(llm, router_prompts, question, role)["route"]
+
+
+def label_chunk_route(text: str, min_keyword_hits: int = 2) -> str:
+    """
+    Tags a document chunk with the route whose questions it answers.
+
+    A chunk is labeled onboarding when it mentions at least `min_keyword_hits`
+    distinct onboarding keywords; a single passing mention (e.g. "access")
+    is common in policy text and does not count.
+
+    Args:
+        text: The chunk text.
+        min_keyword_hits: Distinct onboarding keywords required (default 2).
+
+    Returns:
+        "onboarding" or "hr_policy".
+    """
+    t = text.lower()
+    hits = sum(1 for k in KEYWORDS_ONBOARDING if k in t)
+    return "onboarding" if hits >= min_keyword_hits else "hr_policy"
+
+
+# --- Combined mode: the answer starts with a route tag, e.g. "[route: onboarding]" ---
+ROUTE_TAG = re.compile(r"^\s*\[route:\s*(onboarding|hr_policy)\s*\]\s*", re.IGNORECASE)
+ROUTE_TAG_MAX_CHARS = 40  # give up looking for the tag after this much text
+
+
+def parse_route_tag(text: str):
+    """
+    Splits the route tag off the front of a combined route-and-answer reply.
+
+    Args:
+        text: The reply, or its beginning.
+
+    Returns:
+        A tuple of the route (None when the text has no tag) and the rest of the text.
+    """
+    m = ROUTE_TAG.match(text)
+    if not m:
+        return None, text
+    return m.group(1).lower(), text[m.end():]
+
+
+def _may_be_tag(text: str) -> bool:
+    s = text.lstrip().lower()
+    return "[route:".startswith(s) or (s.startswith("[route:") and "]" not in s)
+
+
+def split_route_tag(chunks: Iterable[str], default_route: str = "hr_policy") -> Iterator[Tuple[str, str]]:
+    """
+    Parses the route tag off the front of a streamed combined reply.
+
+    Chunks are buffered only until the tag is complete, so answer tokens are
+    passed on as soon as they arrive. A reply without a tag is routed to
+    `default_route` and forwarded unchanged.
+
+    Args:
+        chunks: The streamed reply.
+        default_route: The route used when no tag is found (default "hr_policy").
+
+    Yields:
+        ("route", route) once, before any ("chunk", text) pair.
+    """
+    buffer = ""
+    routed = False
+    try:
+        for chunk in chunks:
+            if routed:
+                yield "chunk", chunk
+                continue
+            buffer += chunk
+            route, rest = parse_route_tag(buffer)
+            if route is None:
+                if len(buffer) < ROUTE_TAG_MAX_CHARS and _may_be_tag(buffer):
+                    continue  # wait for the rest of the tag
+                metrics.inc("router_tag_missing_total")
+                route, rest = default_route, buffer
+            routed = True
+            metrics.inc("router_decisions_total", labels={"source": "combined", "route": route})
+            yield "route", route
+            if rest:
+                yield "chunk", rest
+        if not routed:
+            metrics.inc("router_tag_missing_total")
+            yield "route", default_route
+            if buffer:
+                yield "chunk", buffer
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
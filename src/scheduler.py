@@ -0,0 +1,285 @@
+from __future__ import annotations
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Optional
+
+from . import metrics
+
+# (user_id, role) of the request being served; set once per request so the
+# LLM wrapper can schedule calls without threading identity through every layer.
+_IDENTITY: contextvars.ContextVar = contextvars.ContextVar("llm_request_identity", default=("anonymous", "employee"))
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a request cannot be admitted within the maximum queue wait."""
+
+
+def set_identity(user_id: str, role: str):
+    """
+    Records who the current request belongs to.
+
+    Args:
+        user_id: The user identifier.
+        role: The user's role.
+    """
+    _IDENTITY.set((user_id or "anonymous", role or "employee"))
+
+
+class TokenBucket:
+    """Per-user request rate limiter (`rate` tokens per second, up to `burst`)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, now: float, cost: float = 1) -> float:
+        """
+        Takes `cost` tokens, possibly going into debt.
+
+        Args:
+            now: The current monotonic time.
+            cost: Number of tokens to take (default 1).
+
+        Returns:
+            Seconds to wait before the reserved token is actually available.
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= cost
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate if self.rate > 0 else float("inf")
+
+    def refund(self, cost: float = 1):
+        self.tokens += cost
+
+    def full(self, now: float) -> bool:
+        """Whether the bucket has refilled to `burst`, i.e. is the same as a new one."""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class _Waiter:
+    __slots__ = ("finish", "seq", "start", "abandoned")
+
+    def __init__(self, start: float, finish: float, seq: int):
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+        self.abandoned = False
+
+    def __lt__(self, other):
+        return (self.finish, self.seq) < (other.finish, other.seq)
+
+
+class FairScheduler:
+    """
+    Admission control and weighted fair queuing for LLM-bound work.
+
+    - `admit` charges the user's token bucket once per request.
+    - `slot` bounds the number of concurrent LLM calls. Waiting calls are
+      served in order of their virtual finish tag (weighted fair queuing):
+      every user's tag advances by 1/weight(role) per call, so a user
+      flooding the queue only delays themselves.
+    Both raise `SchedulerBusy` instead of waiting longer than `max_queue_wait_s`.
+    Users whose bucket has refilled and who have nothing queued are forgotten
+    every `EVICT_INTERVAL_S`, so the per-user state does not grow with every
+    user ever seen.
+    """
+
+    EVICT_INTERVAL_S = 60.0
+
+    def __init__(self, max_concurrency: int = 16, max_queue_wait_s: float = 10.0,
+                 user_rate_per_s: float = 1.0, user_burst: float = 10.0,
+                 role_weights: Optional[Dict[str, float]] = None):
+        """
+        Initializes the scheduler.
+
+        Args:
+            max_concurrency: Maximum concurrent LLM calls in this worker (default 16).
+            max_queue_wait_s: Longest a request may wait before being rejected (default 10).
+            user_rate_per_s: Sustained requests per second per user (default 1).
+            user_burst: Requests a user may make back to back (default 10).
+            role_weights: Share of LLM capacity per role (default 1.0 for all).
+        """
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.max_queue_wait_s = float(max_queue_wait_s)
+        self.user_rate_per_s = float(user_rate_per_s)
+        self.user_burst = float(user_burst)
+        self.role_weights = role_weights or {}
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._finish_tags: Dict[str, float] = {}
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._active = 0
+        self._evicted_at = time.monotonic()
+
+    def admit(self, user_id: str, role: str, cost: float = 1):
+        """
+        Applies the user's rate limit to a new request, waiting if briefly over it.
+
+        Args:
+            user_id: The user identifier.
+            role: The user's role.
+            cost: Number of questions the request asks (default 1).
+
+        Raises:
+            SchedulerBusy: If the user is over their rate for longer than the queue wait.
+        """
+        with self._cond:
+            self._evict_idle()
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                bucket = self._buckets[user_id] = TokenBucket(self.user_rate_per_s, self.user_burst)
+            delay = bucket.reserve(time.monotonic(), cost)
+            if delay > self.max_queue_wait_s:
+                bucket.refund(cost)
+                metrics.inc("scheduler_rate_limited_total")
+                raise SchedulerBusy(f"Too many requests from user '{user_id}'")
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self, user_id: str, role: str):
+        """
+        Holds one LLM concurrency slot for the duration of the block.
+
+        Args:
+            user_id: The user identifier.
+            role: The user's role.
+
+        Raises:
+            SchedulerBusy: If no slot became free within the queue wait.
+        """
+        self._acquire(user_id, role)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _acquire(self, user_id: str, role: str):
+        enqueued = time.monotonic()
+        deadline = enqueued + self.max_queue_wait_s
+        weight = float(self.role_weights.get(role, 1.0)) or 1.0
+        with self._cond:
+            self._evict_idle()
+            start = max(self._virtual_time, self._finish_tags.get(user_id, 0.0))
+            waiter = _Waiter(start, start + 1.0 / weight, next(self._seq))
+            self._finish_tags[user_id] = waiter.finish
+            heapq.heappush(self._queue, waiter)
+            self._publish_depth()
+            while True:
+                self._drop_abandoned()
+                if self._queue[0] is waiter and self._active < self.max_concurrency:
+                    heapq.heappop(self._queue)
+                    self._active += 1
+                    self._virtual_time = max(self._virtual_time, waiter.start)
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    waiter.abandoned = True
+                    self._drop_abandoned()
+                    self._publish_depth()
+                    self._cond.notify_all()
+                    metrics.inc("scheduler_rejected_total")
+                    raise SchedulerBusy("The assistant is busy, no LLM capacity became available in time")
+                self._cond.wait(remaining)
+            self._publish_depth()
+            # Wake the next waiter in case there is spare capacity
+            self._cond.notify_all()
+        metrics.inc("scheduler_admitted_total")
+        metrics.observe("scheduler_queue_wait_seconds", time.monotonic() - enqueued)
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            metrics.set_gauge("scheduler_active", self._active)
+            self._cond.notify_all()
+
+    def _evict_idle(self):
+        # A full bucket and a finish tag at or below the virtual time behave
+        # exactly like missing entries, so dropping them changes no decision
+        now = time.monotonic()
+        if now - self._evicted_at < self.EVICT_INTERVAL_S:
+            return
+        self._evicted_at = now
+        if not self._queue and self._finish_tags:
+            # Nothing is waiting, so no tag orders anything: catch up (the idle reset of fair queuing)
+            self._virtual_time = max(self._virtual_time, max(self._finish_tags.values()))
+        for user_id in set(self._buckets) | set(self._finish_tags):
+            bucket = self._buckets.get(user_id)
+            if bucket is not None and not bucket.full(now):
+                continue
+            if self._finish_tags.get(user_id, 0.0) > self._virtual_time:
+                continue
+            self._buckets.pop(user_id, None)
+            self._finish_tags.pop(user_id, None)
+        metrics.set_gauge("scheduler_tracked_users", len(set(self._buckets) | set(self._finish_tags)))
+
+    def _drop_abandoned(self):
+        while self._queue and self._queue[0].abandoned:
+            heapq.heappop(self._queue)
+
+    def _publish_depth(self):
+        metrics.set_gauge("scheduler_queue_depth", sum(1 for w in self._queue if not w.abandoned))
+        metrics.set_gauge("scheduler_active", self._active)
+
+
+class ScheduledLLMClient:
+    """Wraps an LLM client so every call goes through the scheduler."""
+
+    def __init__(self, client, scheduler: FairScheduler):
+        """
+        Initializes the wrapper.
+
+        Args:
+            client: The underlying LLM client (e.g. `OpenAIClient`).
+            scheduler: The scheduler guarding LLM capacity.
+        """
+        self.client = client
+        self.scheduler = scheduler
+
+    def complete(self, *args, **kwargs) -> str:
+        with self.scheduler.slot(*_IDENTITY.get()):
+            return self.client.complete(*args, **kwargs)
+
+    def complete_json(self, *args, **kwargs) -> Dict[str, Any]:
+        with self.scheduler.slot(*_IDENTITY.get()):
+            return self.client.complete_json(*args, **kwargs)
+
+    def stream(self, *args, **kwargs) -> Iterable[str]:
+        # The slot is held until the stream is exhausted or closed
+        with self.scheduler.slot(*_IDENTITY.get()):
+            yield from self.client.stream(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def build_scheduler(cfg: Optional[Dict[str, Any]]) -> Optional[FairScheduler]:
+    """
+    Builds the LLM scheduler from configuration.
+
+    Args:
+        cfg: The scheduler configuration (optional).
+
+    Returns:
+        The scheduler, or None if disabled.
+    """
+    cfg = cfg or {}
+    if not cfg.get("enabled", True):
+        return None
+    return FairScheduler(
+        max_concurrency=cfg.get("max_concurrency", 16),
+        max_queue_wait_s=cfg.get("max_queue_wait_s", 10.0),
+        user_rate_per_s=cfg.get("user_rate_per_s", 1.0),
+        user_burst=cfg.get("user_burst", 10),
+        role_weights=cfg.get("role_weights"),
+    )
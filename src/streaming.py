@@ -0,0 +1,129 @@
+from __future__ import annotations
+import asyncio
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+_END = object()
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class ThreadedStream:
+    """
+    Runs a blocking event generator in a worker thread and exposes it to async code.
+
+    The generator is created by `factory(cancel_event)`. Calling `cancel()` (or
+    leaving an `async with` block) sets the event; the producer stops at the
+    next event boundary and closes the generator so upstream resources, such as
+    an open LLM stream, are released instead of being drained to the end.
+    """
+
+    def __init__(self, factory: Callable[[threading.Event], Iterator[Any]]):
+        """
+        Initializes the stream.
+
+        Args:
+            factory: Callable building the event generator from a cancel event.
+        """
+        self._factory = factory
+        self.cancel_event = threading.Event()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._getter: Optional[asyncio.Task] = None
+        self._finished = False
+
+    def start(self) -> "ThreadedStream":
+        """
+        Starts the producer thread.
+
+        Returns:
+            The stream itself, for chaining.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._loop.run_in_executor(None, self._produce)
+        return self
+
+    def _push(self, item):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed; nobody is listening any more.
+            pass
+
+    def _produce(self):
+        gen = self._factory(self.cancel_event)
+        try:
+            for item in gen:
+                if self.cancel_event.is_set():
+                    break
+                self._push(item)
+        except BaseException as e:
+            self._push(_Failure(e))
+        finally:
+            gen.close()
+            self._push(_END)
+
+    async def next(self, timeout: Optional[float] = None):
+        """
+        Waits for the next event.
+
+        A timeout does not lose events: the pending read is kept and resumed
+        by the following call. A read dropped by `cancel()` while waiting ends
+        the stream.
+
+        Args:
+            timeout: Seconds to wait before giving up (optional).
+
+        Returns:
+            The next event.
+
+        Raises:
+            asyncio.TimeoutError: If no event arrived within the timeout.
+            StopAsyncIteration: When the stream is exhausted.
+        """
+        if self._finished:
+            raise StopAsyncIteration
+        # Keep a local reference: cancel() may drop the shared one while we wait
+        getter = self._getter
+        if getter is None:
+            getter = self._getter = asyncio.ensure_future(self._queue.get())
+        done, _ = await asyncio.wait({getter}, timeout=timeout)
+        if not done:
+            raise asyncio.TimeoutError
+        if self._getter is getter:
+            self._getter = None
+        if getter.cancelled():
+            self._finished = True
+            raise StopAsyncIteration
+        item = getter.result()
+        if item is _END:
+            self._finished = True
+            raise StopAsyncIteration
+        if isinstance(item, _Failure):
+            self._finished = True
+            raise item.error
+        return item
+
+    def cancel(self):
+        """
+        Asks the producer to stop and drops any pending read.
+        """
+        self.cancel_event.set()
+        if self._getter is not None and not self._getter.done():
+            self._getter.cancel()
+        self._getter = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.next()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.cancel()
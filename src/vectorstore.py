@@ -2,10 +2,8 @@
 from __future__ import annotations
 import os
 from uuid import uuid4
-from typing import List
-from pymilvus import connections
+from typing import Any, Dict, List
 from langchain_core.documents import Document
-from langchain_milvus import Milvus
 
 def connect_milvus(mcfg: dict):
     """
@@ -17,6 +15,9 @@ def connect_milvus(mcfg: dict):
     Raises:
         RuntimeError: If Zilliz credentials are missing.
     """
+    if mcfg.get("provider") == "fake":
+        return
+    from pymilvus import connections
     alias = mcfg.get("alias", "default")
     if mcfg.get("use_zilliz", False):
         zid = os.getenv("ZILLIZ_ID")
@@ -31,13 +32,15 @@ def connect_milvus(mcfg: dict):
         port = mcfg.get("port", "19530")
         connections.connect(alias=alias, host=host, port=port, secure=mcfg.get("secure", False))
 
-def get_vectorstore(emb, mcfg: dict):
+def get_vectorstore(emb, mcfg: dict, compression: dict | None = None):
     """
     Creates or gets a Milvus vector store instance.
 
     Args:
         emb: The embeddings function.
         mcfg: The Milvus configuration.
+        compression: The `embedding.compression` configuration (optional). When
+            enabled, the collection stores Matryoshka-truncated vectors.
 
     Returns:
         The Milvus vector store.
@@ -45,6 +48,15 @@ def get_vectorstore(emb, mcfg: dict):
     Raises:
         RuntimeError: If Zilliz credentials are missing.
     """
+    if compression and compression.get("enabled"):
+        from .quantization import CompressedEmbeddings
+        emb = CompressedEmbeddings(emb, compression["dimensions"])
+
+    if mcfg.get("provider") == "fake":
+        # Local stand-in for load tests (see config/loadtest.yaml)
+        from .fakes import FakeVectorStore
+        return FakeVectorStore.from_config(emb, mcfg)
+
     if mcfg.get("use_zilliz", False):
         zid = os.getenv("ZILLIZ_ID")
         region = os.getenv("ZILLIZ_REGION")
@@ -60,37 +72,151 @@ def get_vectorstore(emb, mcfg: dict):
             "secure": mcfg.get("secure", False),
         }
 
+    # Optional partition key: Milvus hashes chunks into partitions by this scalar
+    # field and prunes to the matching partitions for `field == value` filters.
+    # Only applies when the collection is created, so set it before the first ingest.
+    extra = {}
+    if mcfg.get("partition_key_field"):
+        extra["partition_key_field"] = mcfg["partition_key_field"]
+        if mcfg.get("num_partitions"):
+            extra["num_partitions"] = int(mcfg["num_partitions"])
+
+    from langchain_milvus import Milvus
     return Milvus(
         embedding_function=emb,
         connection_args=connection_args,   # <- no 'alias' here
         collection_name=mcfg["collection"],
         index_params=mcfg["index_params"],
         search_params=mcfg["search_params"],
+        **extra,
     )
 
-def make_retriever(vs, rcfg: dict):
+def route_expr(expr: str | None, route: str, field: str = "route") -> str:
+    """
+    Restricts a Milvus filter expression to chunks tagged with a route.
+
+    Args:
+        expr: The base filter expression (may be empty).
+        route: The route label to keep.
+        field: The scalar field holding the label (default "route").
+
+    Returns:
+        The combined expression.
+    """
+    clause = f'{field} == "{route}"'
+    return f"({expr}) and {clause}" if expr else clause
+
+def make_retriever(vs, rcfg: dict, route: str | None = None):
     """
     Creates a retriever from the vector store.
 
     Args:
         vs: The vector store.
         rcfg: The retriever configuration.
+        route: Only search chunks tagged with this route (optional; the
+            field is `route_filter.field`).
 
     Returns:
         The retriever instance.
     """
     kw = {"k": rcfg.get("k", 4)}
     expr = rcfg.get("expr", "")
+    if route:
+        expr = route_expr(expr, route, (rcfg.get("route_filter") or {}).get("field", "route"))
     if expr: kw["expr"] = expr
     return vs.as_retriever(search_kwargs=kw)
 
-def create_or_update(vs, docs: List[Document]):
+def search_by_vector(vs, vector: List[float], rcfg: dict) -> List[Document]:
+    """
+    Searches the collection with an already computed query embedding.
+
+    Args:
+        vs: The vector store.
+        vector: The query embedding.
+        rcfg: The retriever configuration (k, expr and optionally search_params,
+            which overrides the collection's search parameters, e.g. HNSW ef).
+
+    Returns:
+        The matching documents, best match first.
+    """
+    kwargs = {}
+    if rcfg.get("search_params"):
+        kwargs["param"] = rcfg["search_params"]
+    return vs.similarity_search_by_vector(vector, k=rcfg.get("k", 4), expr=rcfg.get("expr", "") or None, **kwargs)
+
+def _collection_access(vs) -> Dict[str, Any] | None:
+    """
+    Returns the pymilvus collection behind a LangChain Milvus store, or None.
+
+    The LangChain store has no public multi-vector search, so this is the one
+    place that reads its private attributes (col, _vector_field, _text_field,
+    fields, search_params). A store without them, e.g. another langchain
+    version or a stand-in, gets None and is searched one vector at a time.
+    """
+    col = getattr(vs, "col", None)
+    vector_field = getattr(vs, "_vector_field", None)
+    text_field = getattr(vs, "_text_field", None)
+    fields = getattr(vs, "fields", None)
+    if col is None or not callable(getattr(col, "search", None)) or not vector_field or not text_field or not fields:
+        return None
+    return {
+        "col": col,
+        "vector_field": vector_field,
+        "text_field": text_field,
+        "output_fields": [f for f in fields if f != vector_field],
+        "search_params": getattr(vs, "search_params", None),
+    }
+
+def search_by_vectors(vs, vectors: List[List[float]], rcfg: dict) -> List[List[Document]]:
+    """
+    Searches the collection for several query vectors in one request.
+
+    Uses a single multi-vector Milvus search when the underlying collection is
+    reachable and falls back to `search_by_vector` per vector otherwise.
+
+    Args:
+        vs: The vector store.
+        vectors: The query embeddings.
+        rcfg: The retriever configuration (k, expr and optionally search_params,
+            as in `search_by_vector`).
+
+    Returns:
+        One list of documents per query vector, best match first.
+    """
+    if not vectors:
+        return []
+    access = _collection_access(vs)
+    if access is None:
+        return [search_by_vector(vs, v, rcfg) for v in vectors]
+
+    output_fields = access["output_fields"]
+    results = access["col"].search(
+        data=vectors,
+        anns_field=access["vector_field"],
+        param=rcfg.get("search_params") or access["search_params"],
+        limit=rcfg.get("k", 4),
+        expr=rcfg.get("expr", "") or None,
+        output_fields=output_fields,
+    )
+    batches = []
+    for hits in results:
+        docs = []
+        for hit in hits:
+            meta = {f: hit.entity.get(f) for f in output_fields}
+            text = meta.pop(access["text_field"], "")
+            docs.append(Document(page_content=text, metadata=meta))
+        batches.append(docs)
+    return batches
+
+def create_or_update(vs, docs: List[Document], vectors: List[List[float]] | None = None):
     """
     Upserts documents into the vector store with explicit IDs.
 
     Args:
         vs: The vector store.
         docs: The documents to upsert.
+        vectors: Precomputed embeddings for the documents (optional); the
+            store embeds the texts itself when omitted.
     """
     if not docs:
         return
@@ -107,4 +233,7 @@ def create_or_update(vs, docs: List[Document]):
         ids.append(f"chunk-{cid}")
 
     # Insert with explicit IDs (required when auto_id=False)
-    vs.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+    if vectors is not None:
+        vs.add_embeddings(texts=texts, embeddings=vectors, metadatas=metadatas, ids=ids)
+    else:
+        vs.add_texts(texts=texts, metadatas=metadatas, ids=ids)
@@ -1,12 +1,25 @@
 from __future__ import annotations
 import os
 import yaml
-from typing import Any, Dict
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 # Load .env AS EARLY AS POSSIBLE
 load_dotenv(override=False)
 
+def resolve_path(path: str) -> str:
+    """
+    Resolves a path relative to the project root.
+
+    Args:
+        path: The relative path.
+
+    Returns:
+        The normalized absolute path.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.normpath(os.path.join(base_dir, "..", path))  # Normalize path to handle ".." correctly
+
 def load_yaml(path: str) -> Dict[str, Any]:
     """
     Loads a YAML file from the given path relative to the config loader.
@@ -17,19 +30,51 @@ def load_yaml(path: str) -> Dict[str, Any]:
     Returns:
         The loaded YAML data as a dictionary.
     """
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    config_path = os.path.join(base_dir, "..", path)
-    config_path = os.path.normpath(config_path)  # Normalize path to handle ".." correctly
-    with open(config_path, "r", encoding="utf-8") as f:
+    with open(resolve_path(path), "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
 
+def config_paths() -> List[str]:
+    """
+    Lists the files `load_config` reads, relative to the project root.
+
+    Returns:
+        app.yaml, the APP_CONFIG_OVERLAY file if set, and prompts.yaml.
+    """
+    overlay = os.getenv("APP_CONFIG_OVERLAY")
+    return [os.path.join("config", "app.yaml")] + ([overlay] if overlay else []) + [os.path.join("config", "prompts.yaml")]
+
+def merge_config(base: Dict[str, Any], overlay: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recursively merges an overlay into a configuration (the overlay wins).
+
+    Args:
+        base: The base configuration.
+        overlay: The values to override.
+
+    Returns:
+        A new merged dictionary.
+    """
+    merged = dict(base)
+    for key, value in (overlay or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
 def load_config() -> Dict[str, Any]:
     """
     Loads the application and prompts configurations from YAML files.
 
+    If APP_CONFIG_OVERLAY names a YAML file (relative to the project root),
+    it is merged over app.yaml, e.g. config/loadtest.yaml for load tests.
+
     Returns:
         A dictionary containing 'app' and 'prompts' configurations.
     """
     app = load_yaml(os.path.join("config", "app.yaml"))
+    overlay = os.getenv("APP_CONFIG_OVERLAY")
+    if overlay:
+        app = merge_config(app, load_yaml(overlay))
     prompts = load_yaml(os.path.join("config", "prompts.yaml"))
     return {"app": app, "prompts": prompts}
\ No newline at end of file
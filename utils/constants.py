@@ -4,6 +4,7 @@ AUTH_LOG_FILENAME = "auth_operations.logs"
 ZILLIZ_OPERATIONS_LOG_FILENAME="zilliz_operations.log"
 MAIN_APP_LOG_FILENAME= "main_application.log"
 VECTOR_DB_LOG_FILENAME = "vector_store_operations.log"
+INFERENCE_SERVER_LOG_FILENAME = "inference_server.log"
 
 GEMINI_MODEL = "gemini-2.0-flash"
 LOG_DIR = "logs"
@@ -12,4 +13,11 @@ CHUNK_SIZE = 500
 CHUNK_OVERLAP =75
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRY = 7
-MAX_THREAD_WORKERS = 10
\ No newline at end of file
+MAX_THREAD_WORKERS = 10
+BCRYPT_MAX_WORKERS = 4
+TOKEN_CACHE_MAX_SIZE = 10000
+TOKEN_CACHE_TTL_SECONDS = 300
+TOKEN_REVOCATION_CHECK_SECONDS = 1.0
+USER_DB_PATH = "data/users.db"
+BUSY_MESSAGE = "The assistant is busy right now. Please try again in a moment."
+BUSY_RETRY_AFTER_SECONDS = 5
\ No newline at end of file
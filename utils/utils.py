@@ -1,34 +1,169 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
 
-from utils.constants import LOG_DIR
+from utils.constants import LOG_DIR, MAIN_APP_LOG_FILENAME
+
+# Records are put on this queue by the calling thread and written to disk by
+# a single background listener, so request handlers never wait on file I/O.
+_LOG_QUEUE = queue.SimpleQueue()
+_LISTENER = None
+_ROUTER = None
+_QUEUE_HANDLER = None
+_SAMPLER = None
+_LOCK = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    """Keeps only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class _FileRouter(logging.Handler):
+    """
+    Writes each record to the log file registered for its logger.
+
+    Loggers without a registered file (third-party or `logging.getLogger(__name__)`
+    callers) go to the main application log.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.files = {}
+        self.handlers = {}
+
+    def register(self, name, path):
+        self.files[name] = path
+
+    def emit(self, record):
+        path = self.files.get(record.name) or self.files.get(None)
+        handler = self.handlers.get(path)
+        if handler is None:
+            handler = self.handlers[path] = logging.FileHandler(path)
+            handler.setFormatter(self.formatter)
+        handler.handle(record)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        for handler in self.handlers.values():
+            handler.setFormatter(fmt)
+
+    def close(self):
+        for handler in self.handlers.values():
+            handler.close()
+        super().close()
+
+
+def configure_logging(cfg=None):
+    """
+    Configures the queue-based logging pipeline; safe to call more than once.
+
+    The first call installs a QueueHandler on the root logger and starts a
+    QueueListener that owns the file and console handlers. Later calls only
+    update the format, levels and sampling rate.
+
+    Args:
+        cfg: The `logging` block of app.yaml (optional). Supported keys:
+            level, format ("text" or "json"), console, debug_sample_rate and
+            levels (a mapping of logger name to level).
+    """
+    global _LISTENER, _ROUTER, _QUEUE_HANDLER, _SAMPLER
+    cfg = cfg or {}
+    with _LOCK:
+        if _LISTENER is None:
+            if not os.path.exists(LOG_DIR):
+                os.makedirs(LOG_DIR)
+
+            _ROUTER = _FileRouter()
+            _ROUTER.register(None, os.path.join(LOG_DIR, MAIN_APP_LOG_FILENAME))
+            handlers = [_ROUTER]
+            if cfg.get("console", True):
+                handlers.append(logging.StreamHandler())
+
+            _SAMPLER = DebugSampler()
+            _QUEUE_HANDLER = logging.handlers.QueueHandler(_LOG_QUEUE)
+            _QUEUE_HANDLER.addFilter(_SAMPLER)
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(_QUEUE_HANDLER)
+
+            _LISTENER = logging.handlers.QueueListener(_LOG_QUEUE, *handlers, respect_handler_level=True)
+            _LISTENER.start()
+            atexit.register(shutdown_logging)
+
+        if cfg.get("format", "text") == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+        for handler in _LISTENER.handlers:
+            handler.setFormatter(formatter)
+
+        _SAMPLER.rate = float(cfg.get("debug_sample_rate", 1.0))
+        logging.getLogger().setLevel(cfg.get("level", "INFO"))
+        for name, level in (cfg.get("levels") or {}).items():
+            logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging():
+    """
+    Stops the background listener after flushing queued records.
+    """
+    global _LISTENER
+    with _LOCK:
+        if _LISTENER is not None:
+            _LISTENER.stop()
+            for handler in _LISTENER.handlers:
+                handler.close()
+            _LISTENER = None
 
 
 def create_logger(log_file):
     """
-    Creates and configures a logger with file and stream handlers.
+    Returns the logger that writes to the given log file.
+
+    Logging is configured with defaults on first use; the application applies
+    its configuration once at startup via `configure_logging`.
 
     Args:
         log_file: The log file name (will be placed in LOG_DIR).
 
     Returns:
-        The configured logger instance.
-    """
-    log_dir = LOG_DIR
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-        logging.info(f"Created directory: {log_dir}")
-
-    log_file = os.path.join(log_dir, log_file)
-
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-
-    logger = logging.getLogger()
-    return logger
\ No newline at end of file
+        The named logger instance (named after the file, without extension).
+    """
+    if _LISTENER is None:
+        configure_logging()
+
+    name = os.path.splitext(os.path.basename(log_file))[0]
+    _ROUTER.register(name, os.path.join(LOG_DIR, log_file))
+    return logging.getLogger(name)
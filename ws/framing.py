@@ -0,0 +1,164 @@
+from __future__ import annotations
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional speed-up, falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary encoding
+    msgpack = None
+
+
+class FrameEncoder:
+    """Encodes outgoing websocket events as JSON text frames."""
+
+    name = "json"
+    binary = False
+
+    def encode(self, event: Dict[str, Any]) -> str | bytes:
+        """
+        Encodes an event into a frame payload.
+
+        Args:
+            event: The event dictionary to send.
+
+        Returns:
+            The encoded frame payload.
+        """
+        return json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+
+
+class OrjsonFrameEncoder(FrameEncoder):
+    """JSON text frames encoded with orjson."""
+
+    name = "orjson"
+
+    def encode(self, event: Dict[str, Any]) -> str | bytes:
+        return orjson.dumps(event).decode("utf-8")
+
+
+class MsgpackFrameEncoder(FrameEncoder):
+    """Compact binary frames encoded with MessagePack."""
+
+    name = "msgpack"
+    binary = True
+
+    def encode(self, event: Dict[str, Any]) -> str | bytes:
+        return msgpack.packb(event, use_bin_type=True)
+
+
+def available_encodings() -> List[str]:
+    """
+    Lists the frame encodings supported by this server.
+
+    Returns:
+        The names of the usable encodings.
+    """
+    names = ["json"]
+    if orjson is not None:
+        names.append("orjson")
+    if msgpack is not None:
+        names.append("msgpack")
+    return names
+
+
+def get_encoder(requested: Optional[str], default: str = "json") -> FrameEncoder:
+    """
+    Picks the frame encoder for a connection.
+
+    The client's requested encoding wins when it is available, otherwise the
+    server default is used, and plain JSON is the last resort.
+
+    Args:
+        requested: The encoding asked for by the client (optional).
+        default: The server-wide default encoding (default "json").
+
+    Returns:
+        The frame encoder instance.
+    """
+    available = available_encodings()
+    for name in (requested, default):
+        name = (name or "").lower()
+        if name not in available:
+            continue
+        if name == "orjson":
+            return OrjsonFrameEncoder()
+        if name == "msgpack":
+            return MsgpackFrameEncoder()
+        return FrameEncoder()
+    return FrameEncoder()
+
+
+class TokenCoalescer:
+    """
+    Buffers streamed tokens so several of them can share one websocket frame.
+
+    The first token of an answer is always released immediately so the
+    time-to-first-token is not affected; later tokens are held until either
+    `flush_ms` milliseconds have passed since the last flush or `flush_bytes`
+    bytes are buffered.
+    """
+
+    def __init__(self, flush_ms: float = 40, flush_bytes: int = 512):
+        """
+        Initializes the coalescer.
+
+        Args:
+            flush_ms: Maximum time to hold buffered tokens, in milliseconds (default 40).
+            flush_bytes: Buffer size that triggers a flush, in bytes (default 512).
+        """
+        self.flush_s = max(float(flush_ms), 0.0) / 1000.0
+        self.flush_bytes = max(int(flush_bytes), 0)
+        self._parts: List[str] = []
+        self._size = 0
+        self._first_sent = False
+        self._last_flush = time.monotonic()
+
+    def add(self, token: str) -> bool:
+        """
+        Buffers a token.
+
+        Args:
+            token: The token text.
+
+        Returns:
+            True if the buffer should be flushed now.
+        """
+        if not token:
+            return False
+        self._parts.append(token)
+        self._size += len(token.encode("utf-8"))
+        if not self._first_sent:
+            return True
+        return self._size >= self.flush_bytes or self.time_until_flush() == 0.0
+
+    def time_until_flush(self) -> Optional[float]:
+        """
+        Returns how long buffered tokens may still wait.
+
+        Returns:
+            Seconds until the next time-based flush, or None if the buffer is empty.
+        """
+        if not self._parts:
+            return None
+        return max(self.flush_s - (time.monotonic() - self._last_flush), 0.0)
+
+    def flush(self) -> str:
+        """
+        Drains the buffer.
+
+        Returns:
+            The concatenated buffered text (empty if nothing was buffered).
+        """
+        text = "".join(self._parts)
+        self._parts.clear()
+        self._size = 0
+        self._last_flush = time.monotonic()
+        if text:
+            self._first_sent = True
+        return text
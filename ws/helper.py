@@ -1,6 +1,6 @@
 import jwt
 from fastapi import HTTPException, status
-from authentication.auth import fake_users_db, SECRET_KEY  # Assuming you're using an in-memory DB
+from authentication.auth import get_cached_user, users_repo, token_cache, SECRET_KEY
 from utils.constants import ALGORITHM
 
 async def get_current_user_from_token(token: str):
@@ -16,6 +16,10 @@ async def get_current_user_from_token(token: str):
     Raises:
         HTTPException: If token is invalid, expired, user not found, or disabled.
     """
+    user = await get_cached_user(token)
+    if user is not None:
+        return user
+
     try:
         # Decode the JWT token using the SECRET_KEY
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -27,7 +31,7 @@ async def get_current_user_from_token(token: str):
                 detail="Token is missing the username"
             )
 
-        user = fake_users_db.get(username)
+        user = await users_repo.get_async(username)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,6 +44,7 @@ async def get_current_user_from_token(token: str):
                 detail="User is disabled"
             )
 
+        token_cache.put(token, user, payload.get("exp"))
         return user
 
     except jwt.ExpiredSignatureError:
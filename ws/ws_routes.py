@@ -1,6 +1,10 @@
+import asyncio
 import json
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from src.main import chat_stream, get_prompts_config  # <-- IMPORT the getter function
+from src.main import open_chat_stream, get_app_config, get_prompts_config  # <-- IMPORT the getter functions
+from ws.framing import TokenCoalescer, get_encoder
+from src.scheduler import SchedulerBusy
+from utils.constants import BUSY_MESSAGE, BUSY_RETRY_AFTER_SECONDS
 from ws.helper import get_current_user_from_token
 import logging
 
@@ -8,14 +12,31 @@ logger = logging.getLogger(__name__)
 ws_router = APIRouter()
 
 
+async def send_event(websocket: WebSocket, encoder, event: dict):
+    """
+    Encodes an event with the connection's encoder and sends it as one frame.
+
+    Args:
+        websocket: The WebSocket connection.
+        encoder: The frame encoder negotiated for the connection.
+        event: The event dictionary to send.
+    """
+    payload = encoder.encode(event)
+    if encoder.binary:
+        await websocket.send_bytes(payload)
+    else:
+        await websocket.send_text(payload)
+
+
 @ws_router.websocket("/ws/{token}")
-async def websocket_endpoint(websocket: WebSocket, token: str):
+async def websocket_endpoint(websocket: WebSocket, token: str, encoding: str | None = None):
     """
     Handles WebSocket connections for chat streaming.
 
     Args:
         websocket: The WebSocket connection.
         token: The authentication token.
+        encoding: Optional frame encoding requested by the client ("json", "orjson" or "msgpack").
     """
     try:
         user = await get_current_user_from_token(token)
@@ -30,56 +51,132 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
     username = user.get("username", "unknown_user")
     role = user.get("role", "employee")
 
+    ws_cfg = get_app_config().get("websocket", {}) or {}
+    encoder = get_encoder(encoding, default=ws_cfg.get("encoding", "json"))
+
     try:
         # Use the getter function to access the config at runtime
         prompts = get_prompts_config()
         welcome_message = prompts.get("welcome_message")
         if welcome_message:
-            await websocket.send_text(json.dumps({
+            await send_event(websocket, encoder, {
                 "type": "final_answer",
                 "answer": welcome_message.strip(),
                 "route": "system_welcome"
-            }))
+            })
     except Exception as e:
         logger.error(f"Failed to send welcome message to {username}: {e}")
     # ----------------------------------------------------
 
+    current: asyncio.Task | None = None
     try:
         while True:
             data = await websocket.receive_text()
             message_data = json.loads(data)
             query = message_data.get("query")
+            is_cancel = message_data.get("type") == "cancel"
 
-            if not query:
+            if not query and not is_cancel:
                 continue
 
-            try:
-                # Iterate through the streaming generator
-                for event in chat_stream(question=query, role=role, user_id=username):
-                    if event["type"] == "route":
-                        # Optionally send route info to client
-                        await websocket.send_text(json.dumps({
-                            "type": "route_info",
-                            "route": event["data"]
-                        }))
-                    elif event["type"] == "chunk":
-                        # Send each token as it arrives
-                        await websocket.send_text(json.dumps({
-                            "type": "token_chunk",
-                            "token": event["data"]
-                        }))
-
-                # Signal the end of the stream
-                await websocket.send_text(json.dumps({"type": "stream_end"}))
-
-            except Exception as e:
-                logger.error(f"Error in chat_stream for websocket user '{username}': {e}")
-                await websocket.send_text(json.dumps({
-                    "type": "error",
-                    "message": "Sorry, I encountered an error. Please try again."
-                }))
+            # A new query (or an explicit cancel) supersedes the answer still being streamed
+            if current is not None and not current.done():
+                current.cancel()
+                try:
+                    await current
+                except asyncio.CancelledError:
+                    pass
+                await send_event(websocket, encoder, {"type": "stream_cancelled"})
+
+            if is_cancel:
+                continue
+
+            current = asyncio.create_task(
+                stream_answer(websocket, encoder, ws_cfg, query, role, username)
+            )
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for user: {username}")
     except Exception as e:
         logger.error(f"An unexpected error occurred in the websocket for {username}: {e}")
+    finally:
+        # Stop generating for a client that is no longer listening
+        if current is not None and not current.done():
+            current.cancel()
+
+
+async def stream_answer(websocket: WebSocket, encoder, ws_cfg: dict, query: str, role: str, username: str):
+    """
+    Streams one answer to the client, coalescing tokens into frames.
+
+    Cancelling the task closes the underlying chat stream, which in turn
+    closes the upstream LLM stream.
+
+    Args:
+        websocket: The WebSocket connection.
+        encoder: The frame encoder negotiated for the connection.
+        ws_cfg: The websocket configuration block.
+        query: The user's question.
+        role: The user's role.
+        username: The user identifier.
+    """
+    coalescer = TokenCoalescer(
+        flush_ms=ws_cfg.get("coalesce_ms", 40),
+        flush_bytes=ws_cfg.get("coalesce_bytes", 512),
+    )
+    stream = open_chat_stream(question=query, role=role, user_id=username)
+    try:
+        while True:
+            try:
+                event = await stream.next(timeout=coalescer.time_until_flush())
+            except asyncio.TimeoutError:
+                # Tokens have waited long enough; send what we have
+                await send_event(websocket, encoder, {"type": "token_chunk", "token": coalescer.flush()})
+                continue
+            except StopAsyncIteration:
+                break
+
+            if event["type"] == "degradation":
+                await send_event(websocket, encoder, {"type": "degradation_info", "level": event["data"]})
+            elif event["type"] == "route":
+                # Optionally send route info to client
+                await send_event(websocket, encoder, {
+                    "type": "route_info",
+                    "route": event["data"]
+                })
+            elif event["type"] == "chunk":
+                # Several tokens share one frame; the first one goes out immediately
+                if coalescer.add(event["data"]):
+                    await send_event(websocket, encoder, {
+                        "type": "token_chunk",
+                        "token": coalescer.flush()
+                    })
+
+        remainder = coalescer.flush()
+        if remainder:
+            await send_event(websocket, encoder, {"type": "token_chunk", "token": remainder})
+
+        # Signal the end of the stream
+        await send_event(websocket, encoder, {"type": "stream_end"})
+
+    except asyncio.CancelledError:
+        logger.info(f"Stream cancelled for websocket user '{username}'")
+        raise
+    except SchedulerBusy as e:
+        logger.warning(f"Rejected websocket query for user '{username}': {e}")
+        await send_event(websocket, encoder, {
+            "type": "busy",
+            "message": BUSY_MESSAGE,
+            "retry_after": BUSY_RETRY_AFTER_SECONDS
+        })
+    except Exception as e:
+        logger.error(f"Error in chat_stream for websocket user '{username}': {e}")
+        try:
+            await send_event(websocket, encoder, {
+                "type": "error",
+                "message": "Sorry, I encountered an error. Please try again."
+            })
+        except Exception:
+            pass
+    finally:
+        stream.cancel()